@@ -0,0 +1,83 @@
+"""
+Alembic Environment
+===================
+Runs migrations against settings.database_url with the async engine
+"""
+
+import asyncio
+from logging.config import fileConfig
+
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from config import settings
+from database.models import Base, PARTITION_NAME
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Models metadata for autogenerate
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Leave monthly partitions and the archive schema out of autogenerate"""
+    if type_ == "schema":
+        return name in (None, "public")
+    if type_ == "table":
+        return not PARTITION_NAME.match(name)
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emit migration SQL to stdout without connecting"""
+    context.configure(
+        url=settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    """Run migrations on an open connection"""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    """Connect with a throwaway engine and run migrations"""
+    connectable = create_async_engine(
+        settings.database_url,
+        poolclass=pool.NullPool
+    )
+    
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    """Run migrations against the live database"""
+    asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,131 @@
+"""Baseline schema, as created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 00:12:49.141926
+
+Databases created before migrations were introduced already have this
+schema: mark them with `alembic stamp 0001` instead of upgrading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('admins',
+    sa.Column('admin_id', sa.BigInteger(), nullable=False),
+    sa.Column('telegram_username', sa.String(length=255), nullable=True),
+    sa.Column('full_name', sa.String(length=255), nullable=True),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('permissions', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('added_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('added_by', sa.BigInteger(), nullable=True),
+    sa.ForeignKeyConstraint(['added_by'], ['admins.admin_id'], ),
+    sa.PrimaryKeyConstraint('admin_id')
+    )
+    op.create_table('daily_stats',
+    sa.Column('stat_date', sa.DateTime(), nullable=False),
+    sa.Column('total_orders', sa.Integer(), nullable=False),
+    sa.Column('completed_orders', sa.Integer(), nullable=False),
+    sa.Column('cancelled_orders', sa.Integer(), nullable=False),
+    sa.Column('total_revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('average_rating', sa.Numeric(precision=3, scale=2), nullable=True),
+    sa.Column('new_users', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('stat_date')
+    )
+    op.create_table('pricing',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('service_type', sa.String(length=20), sa.CheckConstraint("service_type IN ('carpet', 'sofa')"), nullable=False),
+    sa.Column('price_per_m2', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('base_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('size_multipliers', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('effective_from', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('effective_until', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('telegram_username', sa.String(length=255), nullable=True),
+    sa.Column('first_name', sa.String(length=255), nullable=True),
+    sa.Column('last_name', sa.String(length=255), nullable=True),
+    sa.Column('language_preference', sa.String(length=2), sa.CheckConstraint("language_preference IN ('ru', 'uz')"), nullable=True),
+    sa.Column('phone_number', sa.String(length=20), nullable=True),
+    sa.Column('is_blocked', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_interaction', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('orders',
+    sa.Column('order_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('order_number', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('service_type', sa.String(length=20), sa.CheckConstraint("service_type IN ('carpet', 'sofa')"), nullable=False),
+    sa.Column('language', sa.String(length=2), sa.CheckConstraint("language IN ('ru', 'uz')"), nullable=False),
+    sa.Column('items_count', sa.Integer(), sa.CheckConstraint('items_count >= 1 AND items_count <= 10'), nullable=False),
+    sa.Column('items_details', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('total_area_m2', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('customer_name', sa.String(length=255), nullable=False),
+    sa.Column('phone_number', sa.String(length=20), nullable=False),
+    sa.Column('address_type', sa.String(length=20), sa.CheckConstraint("address_type IN ('manual', 'location')"), nullable=False),
+    sa.Column('address_text', sa.Text(), nullable=True),
+    sa.Column('latitude', sa.Numeric(precision=10, scale=8), nullable=True),
+    sa.Column('longitude', sa.Numeric(precision=11, scale=8), nullable=True),
+    sa.Column('price_per_unit', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('total_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('discount_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('final_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('customer_comment', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), sa.CheckConstraint("status IN ('pending', 'accepted', 'in_progress', 'completed', 'cancelled')"), nullable=False),
+    sa.Column('accepted_by', sa.BigInteger(), nullable=True),
+    sa.Column('completed_by', sa.BigInteger(), nullable=True),
+    sa.Column('cancelled_by', sa.BigInteger(), nullable=True),
+    sa.Column('cancellation_reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('accepted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('in_progress_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('rating', sa.Integer(), sa.CheckConstraint('rating >= 1 AND rating <= 5'), nullable=True),
+    sa.Column('feedback_comment', sa.Text(), nullable=True),
+    sa.Column('feedback_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('admin_notes', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['accepted_by'], ['admins.admin_id'], ),
+    sa.ForeignKeyConstraint(['completed_by'], ['admins.admin_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('order_id'),
+    sa.UniqueConstraint('order_number')
+    )
+    op.create_table('order_status_history',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('old_status', sa.String(length=20), nullable=True),
+    sa.Column('new_status', sa.String(length=20), nullable=False),
+    sa.Column('changed_by', sa.BigInteger(), nullable=True),
+    sa.Column('changed_by_type', sa.String(length=10), sa.CheckConstraint("changed_by_type IN ('user', 'admin', 'system')"), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_status_history')
+    op.drop_table('orders')
+    op.drop_table('users')
+    op.drop_table('pricing')
+    op.drop_table('daily_stats')
+    op.drop_table('admins')
@@ -0,0 +1,37 @@
+"""Conversation state table for the Postgres FSM storage
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:30:00.000000
+
+Databases stamped with 0001 predate fsm_states, so it is created here
+rather than in the baseline.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('fsm_states',
+    sa.Column('storage_key', sa.String(length=255), nullable=False),
+    sa.Column('state', sa.String(length=255), nullable=True),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('storage_key')
+    )
+    op.create_index(op.f('ix_fsm_states_updated_at'), 'fsm_states', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_fsm_states_updated_at'), table_name='fsm_states')
+    op.drop_table('fsm_states')
@@ -0,0 +1,73 @@
+"""Order number sequence and indexes for the hot order queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:40:00.000000
+
+Indexes are built CONCURRENTLY so a live orders table is not locked
+against writes while they are created.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # order_number had no default, so inserts without it failed
+    op.execute(sa.schema.CreateSequence(sa.Sequence('orders_order_number_seq')))
+    op.execute(
+        "SELECT setval('orders_order_number_seq', "
+        "COALESCE((SELECT MAX(order_number) FROM orders), 0) + 1, false)"
+    )
+    op.execute("ALTER SEQUENCE orders_order_number_seq OWNED BY orders.order_number")
+    op.alter_column(
+        'orders', 'order_number',
+        server_default=sa.text("nextval('orders_order_number_seq')")
+    )
+    
+    with op.get_context().autocommit_block():
+        # "My orders": WHERE user_id = ? ORDER BY created_at DESC LIMIT n
+        op.create_index(
+            'ix_orders_user_id_created_at', 'orders',
+            ['user_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Admin lists and reports: WHERE status = ? ORDER BY created_at
+        op.create_index(
+            'ix_orders_status_created_at', 'orders',
+            ['status', 'created_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        # Status history lookups and ON DELETE CASCADE from orders
+        op.create_index(
+            'ix_order_status_history_order_id', 'order_status_history',
+            ['order_id'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_order_status_history_order_id', table_name='order_status_history',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            'ix_orders_status_created_at', table_name='orders',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            'ix_orders_user_id_created_at', table_name='orders',
+            postgresql_concurrently=True, if_exists=True
+        )
+    
+    op.alter_column('orders', 'order_number', server_default=None)
+    op.execute(sa.schema.DropSequence(sa.Sequence('orders_order_number_seq')))
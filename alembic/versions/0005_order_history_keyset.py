@@ -0,0 +1,49 @@
+"""Order history index for keyset pagination
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 01:00:00.000000
+
+Adds order_id to the per-user history index so pages keyed on
+(created_at, order_id) are read straight from the index. The old
+index is a prefix of the new one and is dropped.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # "My orders" pages: WHERE user_id = ? AND (created_at, order_id) < (?, ?)
+        # ORDER BY created_at DESC, order_id DESC LIMIT n
+        op.create_index(
+            'ix_orders_user_id_created_at_order_id', 'orders',
+            ['user_id', sa.text('created_at DESC'), sa.text('order_id DESC')],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'ix_orders_user_id_created_at', table_name='orders',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_orders_user_id_created_at', 'orders',
+            ['user_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'ix_orders_user_id_created_at_order_id', table_name='orders',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,95 @@
+"""Daily stats rollups per service and operator
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 02:00:00.000000
+
+daily_stats was never written, so it is recreated with service and
+operator dimensions and additive counters (rating_sum / rating_count
+instead of average_rating), then backfilled from orders and users.
+From here on the repository keeps it up to date.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL = """
+INSERT INTO daily_stats (
+    stat_date, service_type, admin_id, total_orders, accepted_orders,
+    completed_orders, cancelled_orders, total_revenue, rating_sum,
+    rating_count, new_users
+)
+SELECT day, service_type, admin_id, sum(created), sum(accepted),
+       sum(completed), sum(cancelled), sum(revenue), sum(rating),
+       sum(rated), sum(joined)
+FROM (
+    SELECT created_at::date AS day, service_type, 0::bigint AS admin_id,
+           1 AS created, 0 AS accepted, 0 AS completed, 0 AS cancelled,
+           0 AS revenue, 0 AS rating, 0 AS rated, 0 AS joined
+    FROM orders
+    UNION ALL
+    SELECT accepted_at::date, service_type, coalesce(accepted_by, 0),
+           0, 1, 0, 0, 0, 0, 0, 0
+    FROM orders WHERE accepted_at IS NOT NULL
+    UNION ALL
+    SELECT completed_at::date, service_type, coalesce(completed_by, 0),
+           0, 0, 1, 0, coalesce(final_cost, 0), 0, 0, 0
+    FROM orders WHERE status = 'completed' AND completed_at IS NOT NULL
+    UNION ALL
+    SELECT cancelled_at::date, service_type, coalesce(cancelled_by, 0),
+           0, 0, 0, 1, 0, 0, 0, 0
+    FROM orders WHERE status = 'cancelled' AND cancelled_at IS NOT NULL
+    UNION ALL
+    SELECT feedback_at::date, service_type, coalesce(accepted_by, 0),
+           0, 0, 0, 0, 0, rating, 1, 0
+    FROM orders WHERE rating IS NOT NULL AND feedback_at IS NOT NULL
+    UNION ALL
+    SELECT created_at::date, '', 0, 0, 0, 0, 0, 0, 0, 0, 1
+    FROM users
+) AS events
+GROUP BY day, service_type, admin_id
+"""
+
+
+def upgrade() -> None:
+    op.drop_table('daily_stats')
+    op.create_table('daily_stats',
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('service_type', sa.String(length=20), nullable=False),
+    sa.Column('admin_id', sa.BigInteger(), nullable=False),
+    sa.Column('total_orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('accepted_orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed_orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('cancelled_orders', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('total_revenue', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False),
+    sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('new_users', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('stat_date', 'service_type', 'admin_id')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_stats')
+    op.create_table('daily_stats',
+    sa.Column('stat_date', sa.DateTime(), nullable=False),
+    sa.Column('total_orders', sa.Integer(), nullable=False),
+    sa.Column('completed_orders', sa.Integer(), nullable=False),
+    sa.Column('cancelled_orders', sa.Integer(), nullable=False),
+    sa.Column('total_revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('average_rating', sa.Numeric(precision=3, scale=2), nullable=True),
+    sa.Column('new_users', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('stat_date')
+    )
@@ -0,0 +1,228 @@
+"""Monthly range partitions for orders and order_status_history
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 03:00:00.000000
+
+orders is partitioned by created_at, order_status_history by
+changed_at, one partition per calendar month (UTC) named
+<table>_yYYYYmMM. Existing rows are copied into partitions from the
+oldest month on, and partitions up to three months ahead are created;
+later ones are created by the bot (database/partitions.py).
+
+Primary and unique keys of a partitioned table must contain the
+partition key, so they become (order_id, created_at), (order_number,
+created_at) and (id, changed_at). For the same reason
+order_status_history.order_id can no longer be a foreign key - history
+rows are only written by the statement that changes the order.
+
+Both tables are rewritten under an exclusive lock - run it in a
+maintenance window on a large database.
+
+"""
+from datetime import datetime, timezone
+from typing import List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+
+def _next_month(month: datetime) -> datetime:
+    """First day of the following month"""
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _create_partitions(table: str, column: str, source: str) -> None:
+    """Create partitions from the oldest row of source to MONTHS_AHEAD ahead"""
+    now = datetime.now(timezone.utc)
+    oldest = op.get_bind().execute(sa.text(f"SELECT min({column}) FROM {source}")).scalar()
+    start = min(oldest or now, now).astimezone(timezone.utc)
+    month = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    
+    while month <= last:
+        upper = _next_month(month)
+        op.execute(
+            f"CREATE TABLE {table}_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+
+def _order_columns() -> list:
+    """Columns of orders, same order as before partitioning"""
+    return [
+        sa.Column('order_id', sa.Integer(), server_default=sa.text("nextval('orders_order_id_seq')"), nullable=False),
+        sa.Column('order_number', sa.Integer(), server_default=sa.text("nextval('orders_order_number_seq')"), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('service_type', sa.String(length=20), sa.CheckConstraint("service_type IN ('carpet', 'sofa')"), nullable=False),
+        sa.Column('language', sa.String(length=2), sa.CheckConstraint("language IN ('ru', 'uz')"), nullable=False),
+        sa.Column('items_count', sa.Integer(), sa.CheckConstraint('items_count >= 1 AND items_count <= 10'), nullable=False),
+        sa.Column('items_details', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('total_area_m2', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('customer_name', sa.String(length=255), nullable=False),
+        sa.Column('phone_number', sa.String(length=20), nullable=False),
+        sa.Column('address_type', sa.String(length=20), sa.CheckConstraint("address_type IN ('manual', 'location')"), nullable=False),
+        sa.Column('address_text', sa.Text(), nullable=True),
+        sa.Column('latitude', sa.Numeric(precision=10, scale=8), nullable=True),
+        sa.Column('longitude', sa.Numeric(precision=11, scale=8), nullable=True),
+        sa.Column('price_per_unit', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('total_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('discount_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('final_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('customer_comment', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), sa.CheckConstraint("status IN ('pending', 'accepted', 'in_progress', 'completed', 'cancelled')"), nullable=False),
+        sa.Column('accepted_by', sa.BigInteger(), nullable=True),
+        sa.Column('completed_by', sa.BigInteger(), nullable=True),
+        sa.Column('cancelled_by', sa.BigInteger(), nullable=True),
+        sa.Column('cancellation_reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('accepted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('in_progress_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('rating', sa.Integer(), sa.CheckConstraint('rating >= 1 AND rating <= 5'), nullable=True),
+        sa.Column('feedback_comment', sa.Text(), nullable=True),
+        sa.Column('feedback_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('admin_notes', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['accepted_by'], ['admins.admin_id'], ),
+        sa.ForeignKeyConstraint(['completed_by'], ['admins.admin_id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    ]
+
+
+def _history_columns() -> list:
+    """Columns of order_status_history"""
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_status_history_id_seq')"), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('old_status', sa.String(length=20), nullable=True),
+        sa.Column('new_status', sa.String(length=20), nullable=False),
+        sa.Column('changed_by', sa.BigInteger(), nullable=True),
+        sa.Column('changed_by_type', sa.String(length=10), sa.CheckConstraint("changed_by_type IN ('user', 'admin', 'system')"), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    ]
+
+
+def _set_sequence_owners(owned: bool) -> None:
+    """Detach sequences before dropping a table, re-attach to the new one"""
+    for sequence, column in (
+        ('orders_order_id_seq', 'orders.order_id'),
+        ('orders_order_number_seq', 'orders.order_number'),
+        ('order_status_history_id_seq', 'order_status_history.id'),
+    ):
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {column if owned else 'NONE'}")
+
+
+def _drop_keys(table: str) -> None:
+    """Drop constraints and indexes of a renamed table, freeing their names"""
+    bind = op.get_bind()
+    constraints = bind.execute(sa.text(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = CAST(:table AS regclass) AND conparentid = 0 "
+        "ORDER BY contype = 'p'"
+    ), {"table": table}).scalars().all()
+    for name in constraints:
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+    indexes = bind.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": table}).scalars().all()
+    for name in indexes:
+        op.drop_index(name, table_name=table)
+
+
+def _copy_rows(table: str, columns: list, where: str = "") -> None:
+    """Copy rows from the renamed old table"""
+    names = ", ".join(column.name for column in columns if isinstance(column, sa.Column))
+    op.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM {table}_old {where}")
+
+
+def _create_indexes() -> None:
+    """Secondary indexes, built after the copy"""
+    # "My orders" pages: WHERE user_id = ? ORDER BY created_at DESC, order_id DESC
+    op.create_index(
+        'ix_orders_user_id_created_at_order_id', 'orders',
+        ['user_id', sa.text('created_at DESC'), sa.text('order_id DESC')]
+    )
+    # Admin lists and reports: WHERE status = ? ORDER BY created_at
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at'])
+    op.create_index('ix_order_status_history_order_id', 'order_status_history', ['order_id'])
+
+
+def upgrade() -> None:
+    _set_sequence_owners(False)
+    op.rename_table('orders', 'orders_old')
+    op.rename_table('order_status_history', 'order_status_history_old')
+    _drop_keys('order_status_history_old')
+    _drop_keys('orders_old')
+    
+    order_columns = _order_columns()
+    op.create_table('orders',
+    *order_columns,
+    sa.PrimaryKeyConstraint('order_id', 'created_at'),
+    sa.UniqueConstraint('order_number', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    history_columns = _history_columns()
+    op.create_table('order_status_history',
+    *history_columns,
+    sa.PrimaryKeyConstraint('id', 'changed_at'),
+    postgresql_partition_by='RANGE (changed_at)'
+    )
+    _create_partitions('orders', 'created_at', 'orders_old')
+    _create_partitions('order_status_history', 'changed_at', 'order_status_history_old')
+    
+    _copy_rows('orders', order_columns)
+    _copy_rows('order_status_history', history_columns)
+    op.drop_table('order_status_history_old')
+    op.drop_table('orders_old')
+    
+    _create_indexes()
+    _set_sequence_owners(True)
+
+
+def downgrade() -> None:
+    _set_sequence_owners(False)
+    op.rename_table('orders', 'orders_old')
+    op.rename_table('order_status_history', 'order_status_history_old')
+    _drop_keys('order_status_history_old')
+    _drop_keys('orders_old')
+    
+    # Rows of partitions moved to the archive schema are not restored
+    order_columns = _order_columns()
+    op.create_table('orders',
+    *order_columns,
+    sa.PrimaryKeyConstraint('order_id'),
+    sa.UniqueConstraint('order_number')
+    )
+    history_columns = _history_columns()
+    op.create_table('order_status_history',
+    *history_columns,
+    sa.ForeignKeyConstraint(['order_id'], ['orders.order_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _copy_rows('orders', order_columns)
+    # History of archived orders would violate the foreign key
+    _copy_rows(
+        'order_status_history', history_columns,
+        "WHERE order_id IN (SELECT order_id FROM orders)"
+    )
+    op.drop_table('order_status_history_old')
+    op.drop_table('orders_old')
+    
+    _create_indexes()
+    _set_sequence_owners(True)
@@ -6,14 +6,36 @@ Initializes and runs the Telegram bot with aiogram 3.x
 
 import asyncio
 import logging
+import secrets
 import sys
+from typing import Optional
+from aiohttp import web
 from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from config import settings
-from database.database import init_db, dispose_engine
-from middlewares import DatabaseMiddleware, UserStateMiddleware
+from database.database import init_db, dispose_engine, warm_pool
+from database.fsm_storage import ExpiringStorage, create_storage
+from middlewares import (
+    DatabaseMiddleware,
+    UserStateMiddleware,
+    UpdateSchedulerMiddleware,
+    CachedFSMContextMiddleware,
+    MessageCleanupMiddleware,
+    UserActivityMiddleware
+)
+from services.admin_notifications import send_to_admins, wait_pending_notifications
+from services.draft_sweeper import create_draft_sweeper
+from services.partition_maintainer import partition_maintainer
+from services.message_manager import message_manager
+from services.message_registry import create_message_registry
+from services.outbound import OutboundQueue
+from services.outbox import outbox_dispatcher
+from services.user_buffer import user_buffer
+from utils.metrics import metrics
 
 # Import all handler routers
 from handlers.start import router as start_router
@@ -40,13 +62,31 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def on_startup(bot: Bot):
+async def on_startup(
+    bot: Bot,
+    dispatcher: Optional[Dispatcher] = None,
+    worker_index: Optional[int] = None
+):
     """
     Execute on bot startup
     
+    Workers started by supervisor.py skip database initialization,
+    expired conversation purging, abandoned draft sweeping, partition
+    maintenance and admin notices - the supervisor runs them once for all workers
+    
     Args:
         bot: Bot instance
+        dispatcher: Dispatcher owning the FSM storage
+        worker_index: Worker number in multi-process mode
     """
+    metrics.start_reporter(settings.metrics_log_interval)
+    
+    if worker_index is not None:
+        await warm_pool()
+        outbox_dispatcher.start(bot)
+        logger.info(f"✅ Worker {worker_index} started")
+        return
+    
     logger.info("🚀 Starting bot...")
     
     # Initialize database
@@ -56,58 +96,140 @@ async def on_startup(bot: Bot):
         logger.error(f"❌ Failed to initialize database: {e}")
         sys.exit(1)
     
+    # Deliver notifications queued with order changes
+    outbox_dispatcher.start(bot)
+    
+    # Create next months' partitions, archive the expired ones
+    partition_maintainer.start()
+    
+    # Drop conversations idle longer than FSM_TTL_HOURS
+    if dispatcher and isinstance(dispatcher.storage, ExpiringStorage):
+        dispatcher.storage.start_purger(settings.fsm_purge_interval)
+        
+        # Remind about and clear conversations idle for DRAFT_* settings
+        dispatcher["draft_sweeper"] = create_draft_sweeper(dispatcher.storage)
+        dispatcher["draft_sweeper"].start(bot)
+    
     # Notify admins that bot started
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text="✅ <b>Бот запущен и готов к работе!</b>",
-                parse_mode=ParseMode.HTML
-            )
-        except Exception as e:
-            logger.warning(f"Could not notify admin {admin_id}: {e}")
+    await send_to_admins(bot, "✅ <b>Бот запущен и готов к работе!</b>")
     
     logger.info("✅ Bot started successfully")
     logger.info(f"Configured admins: {settings.admin_ids}")
 
 
-async def on_shutdown(bot: Bot):
+async def on_shutdown(
+    bot: Bot,
+    dispatcher: Optional[Dispatcher] = None,
+    worker_index: Optional[int] = None
+):
     """
     Execute on bot shutdown
     
     Args:
         bot: Bot instance
+        dispatcher: Dispatcher owning the FSM storage
+        worker_index: Worker number in multi-process mode
     """
     logger.info("🛑 Shutting down bot...")
     
+    # Let admin notifications started by handlers go out
+    await outbox_dispatcher.stop()
+    if dispatcher and dispatcher.get("draft_sweeper"):
+        await dispatcher["draft_sweeper"].stop()
+    await partition_maintainer.stop()
+    await wait_pending_notifications()
+    await message_manager.flush_all()
+    await user_buffer.close()
+    
+    if dispatcher and isinstance(dispatcher.storage, ExpiringStorage):
+        await dispatcher.storage.stop_purger()
+    
     # Dispose database engine
     await dispose_engine()
     
+    await metrics.stop_reporter()
+    
+    if worker_index is not None:
+        logger.info(f"✅ Worker {worker_index} stopped")
+        return
+    
     # Notify admins
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text="🛑 <b>Бот остановлен</b>",
-                parse_mode=ParseMode.HTML
-            )
-        except:
-            pass
+    await send_to_admins(bot, "🛑 <b>Бот остановлен</b>")
     
     logger.info("✅ Bot shutdown complete")
 
 
-async def main():
-    """Main function to run the bot"""
+def create_bot(rate_share: float = 1.0) -> Bot:
+    """
+    Build bot whose API calls go through the outbound queue
     
-    # Initialize bot with default properties
+    Args:
+        rate_share: Part of the global send rate this process may use
+        
+    Returns:
+        Bot instance
+    """
     bot = Bot(
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    bot.session.middleware(OutboundQueue(
+        global_rate=settings.outbound_global_rate * rate_share,
+        chat_rate=settings.outbound_chat_rate,
+        chat_burst=settings.outbound_chat_burst,
+        group_per_minute=settings.outbound_group_per_minute,
+        max_retries=settings.outbound_max_retries
+    ))
+    return bot
+
+
+def process_rate_share() -> float:
+    """
+    Part of the global send rate of one process in multi-process mode
     
-    # Initialize dispatcher
-    dp = Dispatcher()
+    The supervisor sends too (outbox, draft reminders, admin notices),
+    so the rate is split between the workers and the supervisor.
+    
+    Returns:
+        Fraction of OUTBOUND_GLOBAL_RATE
+    """
+    return 1 / (settings.worker_count + 1)
+
+
+def create_dispatcher(storage: Optional[BaseStorage] = None) -> Dispatcher:
+    """
+    Build dispatcher with middlewares, routers and lifecycle hooks
+    
+    Shared by polling, webhook and worker modes
+    
+    Args:
+        storage: FSM storage (FSM_STORAGE backend when not given)
+    
+    Returns:
+        Configured dispatcher
+    """
+    dp = Dispatcher(storage=storage or create_storage(), disable_fsm=True)
+    
+    # Bound concurrency and serialize updates per chat
+    dp.update.outer_middleware(UpdateSchedulerMiddleware(settings.update_concurrency_limit))
+    
+    # Queued message deletions go out as one call when the update is done
+    dp.update.outer_middleware(MessageCleanupMiddleware())
+    
+    # users.last_interaction is refreshed in batches by user_buffer
+    dp.update.outer_middleware(UserActivityMiddleware())
+    
+    # FSM state is read once and written once per update. Registered after
+    # the scheduler so the read-modify-write runs under the per-chat queue
+    dp.fsm = CachedFSMContextMiddleware(
+        storage=dp.fsm.storage,
+        events_isolation=dp.fsm.events_isolation,
+        strategy=dp.fsm.strategy
+    )
+    dp.update.outer_middleware(dp.fsm)
+    
+    # Wizard message IDs are kept next to the conversation state
+    message_manager.registry = create_message_registry(dp.fsm.storage)
     
     # Register middlewares (order matters!)
     dp.message.middleware(DatabaseMiddleware())
@@ -131,10 +253,138 @@ async def main():
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     
-    # Start polling
+    return dp
+
+
+async def run_polling(bot: Bot, dp: Dispatcher) -> None:
+    """
+    Receive updates with long polling
+    
+    Args:
+        bot: Bot instance
+        dp: Configured dispatcher
+    """
+    # getUpdates is rejected while a webhook is registered
+    await bot.delete_webhook()
+    
+    logger.info("Starting polling...")
+    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Serve current runtime metrics as JSON"""
+    return web.json_response(metrics.snapshot())
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """
+    Receive updates on an embedded aiohttp server
+    
+    Args:
+        bot: Bot instance
+        dp: Configured dispatcher
+    """
+    if not settings.webhook_base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+    
+    secret_token = settings.webhook_secret or secrets.token_urlsafe(32)
+    
+    async def register_webhook(bot: Bot):
+        """Point Telegram at this server"""
+        await bot.set_webhook(
+            url=settings.webhook_url,
+            secret_token=secret_token,
+            max_connections=settings.webhook_max_connections,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook set to {settings.webhook_url}")
+    
+    dp.startup.register(register_webhook)
+    
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token
+    ).register(app, path=settings.webhook_path)
+    app.router.add_get("/metrics", handle_metrics)
+    setup_application(app, dp, bot=bot)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    
+    try:
+        await site.start()
+        logger.info(f"Listening for webhook updates on {settings.webhook_host}:{settings.webhook_port}")
+        await asyncio.Event().wait()
+    finally:
+        # Runs dispatcher shutdown hooks
+        await runner.cleanup()
+
+
+async def run_worker(worker_index: int, secret_token: str) -> None:
+    """
+    Run one worker process of the multi-process mode
+    
+    Receives updates forwarded by supervisor.py on a local port. Each
+    worker has its own Telegram session and DB pool, FSM state lives
+    in PostgreSQL so every worker sees the same conversations.
+    
+    Args:
+        worker_index: Worker number
+        secret_token: Token the supervisor signs forwarded updates with
+    """
+    # Workers send in parallel, each keeps to its share of the global limit
+    bot = create_bot(rate_share=process_rate_share())
+    
+    # Workers share conversations, so in-process storage is never used
+    dp = create_dispatcher(storage=create_storage("postgres"))
+    dp["worker_index"] = worker_index
+    
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token
+    ).register(app, path="/update")
+    app.router.add_get("/metrics", handle_metrics)
+    setup_application(app, dp, bot=bot)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host="127.0.0.1", port=settings.worker_base_port + worker_index)
+    
+    try:
+        await site.start()
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+
+
+def worker_main(worker_index: int, secret_token: str) -> None:
+    """Process entry point for supervisor.py workers"""
+    try:
+        asyncio.run(run_worker(worker_index, secret_token))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+async def main():
+    """Main function to run the bot"""
+    
+    # Initialize bot with default properties
+    bot = create_bot()
+    
+    # Initialize dispatcher
+    dp = create_dispatcher()
+    
     try:
-        logger.info("Starting polling...")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if settings.bot_mode == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            await run_polling(bot, dp)
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
@@ -4,7 +4,7 @@ Configuration Module
 Loads and validates environment variables using Pydantic Settings
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
 
@@ -29,6 +29,19 @@ class Settings(BaseSettings):
     db_user: str = Field(default="postgres")
     db_password: str = Field(...)
     
+    # Database Connection Pool (per process)
+    db_pool_size: int = Field(default=10, description="Connections kept open")
+    db_max_overflow: int = Field(default=5, description="Extra connections allowed under load")
+    db_pool_recycle: int = Field(default=1800, description="Seconds before a connection is replaced")
+    db_pool_timeout: float = Field(default=10.0, description="Seconds to wait for a free connection")
+    db_statement_cache_size: int = Field(default=100, description="Prepared statements cached per connection (0 disables)")
+    
+    # Read Replica (optional, same user and password as the primary)
+    db_replica_host: Optional[str] = Field(default=None, description="Replica host, read-only queries go to the primary if unset")
+    db_replica_port: Optional[int] = Field(default=None, description="Replica port (DB_PORT if unset)")
+    db_replica_name: Optional[str] = Field(default=None, description="Replica database name (DB_NAME if unset)")
+    db_replica_window: float = Field(default=10, description="Seconds a user reads from the primary after a write")
+    
     # Contact Information
     contact_phone: str = Field(default="+998901234567")
     office_address: str = Field(default="Tashkent, Mirabad district")
@@ -44,6 +57,70 @@ class Settings(BaseSettings):
     sofa_price_corner: int = Field(default=90000)
     sofa_price_armchair: int = Field(default=30000)
     
+    # Update Delivery
+    bot_mode: str = Field(default="polling", description="polling or webhook")
+    webhook_base_url: str = Field(default="", description="Public HTTPS URL of the webhook server")
+    webhook_path: str = Field(default="/webhook")
+    webhook_secret: str = Field(default="", description="Secret token Telegram sends with every update")
+    webhook_host: str = Field(default="0.0.0.0")
+    webhook_port: int = Field(default=8080)
+    webhook_max_connections: int = Field(default=40, description="Simultaneous HTTPS connections from Telegram (1-100)")
+    
+    # Update Processing
+    update_concurrency_limit: int = Field(default=50, description="Max updates handled at the same time")
+    metrics_log_interval: int = Field(default=300, description="Seconds between metrics log reports (0 disables)")
+    
+    # Outbound Telegram Calls
+    outbound_global_rate: float = Field(default=30, description="Messages per second to all chats together")
+    outbound_chat_rate: float = Field(default=1, description="Messages per second to one private chat")
+    outbound_chat_burst: int = Field(default=5, description="Messages one private chat may get at once")
+    outbound_group_per_minute: int = Field(default=20, description="Messages per minute to one group")
+    outbound_max_retries: int = Field(default=3, description="Retries after 429 or 5xx responses")
+    admin_fanout_concurrency: int = Field(default=10, description="Admin notifications sent at the same time")
+    message_delete_delay: float = Field(default=0.3, description="Seconds message deletions are collected into one call")
+    message_registry: str = Field(default="fsm", description="Wizard message registry: memory or fsm (next to FSM state)")
+    message_registry_max_chats: int = Field(default=100000, description="Chats whose wizard message is kept in memory")
+    
+    # User Profile Writes
+    user_write_delay: float = Field(default=1.0, description="Seconds user profile and activity changes are collected into one write")
+    user_write_batch: int = Field(default=500, description="Pending users that trigger a write before the delay")
+    user_write_max_attempts: int = Field(default=5, description="Failed writes before a user's pending changes are dropped")
+    
+    # Notification Outbox
+    outbox_batch_size: int = Field(default=20, description="Notifications delivered per batch")
+    outbox_poll_interval: float = Field(default=5, description="Seconds between outbox polls when idle")
+    outbox_max_attempts: int = Field(default=8, description="Delivery attempts before a notification is dead")
+    outbox_retention_days: int = Field(default=7, description="Days delivered notifications are kept")
+    
+    # Order Cache
+    order_cache_size: int = Field(default=5000, description="Orders kept in memory by each process")
+    order_cache_ttl: float = Field(default=5, description="Seconds an active order is served from memory")
+    order_cache_final_ttl: float = Field(default=60, description="Seconds a completed or cancelled order is served from memory")
+    
+    # Table Partitions
+    partition_months_ahead: int = Field(default=3, description="Monthly partitions created ahead of the current month")
+    partition_keep_months: int = Field(default=24, description="Full months kept attached before archiving, 0 keeps everything")
+    partition_maintenance_interval: int = Field(default=3600, description="Seconds between partition creation and archival runs")
+    partition_map_refresh: float = Field(default=300, description="Seconds order ID ranges of partitions are reused")
+    
+    # Statistics
+    stats_cache_ttl: float = Field(default=60, description="Seconds a rendered /stats report is reused")
+    
+    # FSM Storage
+    fsm_storage: str = Field(default="postgres", description="Conversation state backend: memory or postgres")
+    fsm_ttl_hours: int = Field(default=72, description="Hours an idle conversation is kept")
+    fsm_purge_interval: int = Field(default=3600, description="Seconds between expired conversation purges (0 disables)")
+    
+    # Abandoned Drafts
+    draft_reminder_minutes: int = Field(default=60, description="Minutes an unfinished order waits for a reminder (0 disables)")
+    draft_ttl_hours: int = Field(default=24, description="Hours an idle customer conversation is kept before it is cleared")
+    draft_sweep_interval: float = Field(default=60, description="Seconds between idle conversation sweeps")
+    draft_sweep_batch: int = Field(default=100, description="Conversations checked per sweep batch")
+    
+    # Multi-Process Mode (supervisor.py)
+    worker_count: int = Field(default=4, description="Worker processes started by the supervisor")
+    worker_base_port: int = Field(default=8100, description="Worker N listens on 127.0.0.1:worker_base_port+N")
+    
     # Environment
     environment: str = Field(default="development")
     debug: bool = Field(default=False)
@@ -57,6 +134,32 @@ class Settings(BaseSettings):
         except ValueError:
             raise ValueError("ADMIN_IDS must be comma-separated integers")
     
+    @field_validator("bot_mode")
+    @classmethod
+    def validate_bot_mode(cls, v: str) -> str:
+        """Ensure update delivery mode is supported"""
+        v = v.strip().lower()
+        if v not in ("polling", "webhook"):
+            raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+        return v
+    
+    @field_validator("fsm_storage")
+    @classmethod
+    def validate_fsm_storage(cls, v: str) -> str:
+        """Ensure FSM storage backend is supported"""
+        v = v.strip().lower()
+        if v not in ("memory", "postgres"):
+            raise ValueError("FSM_STORAGE must be 'memory' or 'postgres'")
+        return v
+    
+    @field_validator("webhook_max_connections")
+    @classmethod
+    def validate_webhook_max_connections(cls, v: int) -> int:
+        """Telegram accepts 1-100 simultaneous webhook connections"""
+        if not 1 <= v <= 100:
+            raise ValueError("WEBHOOK_MAX_CONNECTIONS must be between 1 and 100")
+        return v
+    
     @property
     def database_url(self) -> str:
         """Construct PostgreSQL database URL for asyncpg"""
@@ -65,6 +168,22 @@ class Settings(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
     
+    @property
+    def replica_database_url(self) -> Optional[str]:
+        """PostgreSQL URL of the read replica, None if not configured"""
+        if not self.db_replica_host:
+            return None
+        return (
+            f"postgresql+asyncpg://{self.db_user}:{self.db_password}"
+            f"@{self.db_replica_host}:{self.db_replica_port or self.db_port}"
+            f"/{self.db_replica_name or self.db_name}"
+        )
+    
+    @property
+    def webhook_url(self) -> str:
+        """Full URL Telegram delivers updates to"""
+        return self.webhook_base_url.rstrip("/") + self.webhook_path
+    
     @property
     def pricing_config(self) -> dict:
         """Get pricing configuration as dictionary"""
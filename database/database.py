@@ -4,90 +4,412 @@ Database Connection and Session Management
 Async SQLAlchemy setup for PostgreSQL with asyncpg
 """
 
-from typing import AsyncGenerator
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+from sqlalchemy import (
+    String, Numeric, column, insert, select, text, true, values
+)
+from sqlalchemy.exc import DBAPIError, ProgrammingError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncSession,
     AsyncEngine,
     async_sessionmaker,
     create_async_engine
 )
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 from config import settings
-from database.models import Base
+from database.models import SCHEMA_VERSION, Pricing
+from utils.metrics import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Create async engine
-engine: AsyncEngine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    poolclass=NullPool,  # Use NullPool for better async performance
-    pool_pre_ping=True
-)
+T = TypeVar("T")
 
-# Create async session factory
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False
-)
+
+class ObservedQueue(AsyncAdaptedQueue):
+    """
+    Connection queue of ObservedQueuePool
+    
+    Only blocking on the queue is timed - it blocks once pool and
+    overflow are exhausted. Opening a new connection (overflow,
+    recycling) happens outside of it and is not waiting for the pool.
+    
+    Metrics:
+        db.pool.wait_seconds: time to get a connection from the pool
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+    
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        """Take idle connection, counting the time spent blocked"""
+        if not block:
+            # Idle connection or, if none, a new overflow one: no waiting
+            metrics.observe("db.pool.wait_seconds", 0.0)
+            return super().get(block, timeout)
+        
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.waiting -= 1
+            metrics.observe("db.pool.wait_seconds", time.monotonic() - started)
+
+
+class ObservedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that tracks callers waiting for a connection"""
+    
+    _queue_class = ObservedQueue
+    
+    @property
+    def waiting(self) -> int:
+        """Callers blocked until a connection is returned"""
+        return self._pool.waiting
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    """
+    Create async engine with the configured pool
+    
+    Connections are kept open between sessions: recycling replaces them
+    before server/proxy idle timeouts, so no per-checkout ping is needed
+    
+    Args:
+        url: Database URL
+        
+    Returns:
+        Engine
+    """
+    return create_async_engine(
+        url,
+        echo=settings.debug,
+        poolclass=ObservedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={
+            "prepared_statement_cache_size": settings.db_statement_cache_size
+        }
+    )
+
+
+def _create_session_maker(bind: AsyncEngine) -> async_sessionmaker:
+    """Create session factory for an engine"""
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False
+    )
+
+
+# Create async engine and session factory
+engine: AsyncEngine = _create_engine(settings.database_url)
+async_session_maker = _create_session_maker(engine)
+
+# Optional read replica for methods marked with @read_only
+replica_engine: Optional[AsyncEngine] = None
+replica_session_maker: Optional[async_sessionmaker] = None
+if settings.replica_database_url:
+    replica_engine = _create_engine(settings.replica_database_url)
+    replica_session_maker = _create_session_maker(replica_engine)
+
+# User whose update is being handled, set by DatabaseMiddleware
+_reader: ContextVar[Optional[int]] = ContextVar("db_reader", default=None)
+
+# user_id: monotonic time until which the user reads from the primary
+_recent_writes: Dict[int, float] = {}
+_RECENT_WRITES_PRUNE = 10000
+
+# Monotonic time until which the replica is skipped after a failure
+_replica_down_until = 0.0
+
+# Set while a @read_only method runs on a replica session
+_on_replica: ContextVar[bool] = ContextVar("db_on_replica", default=False)
+
+
+@contextmanager
+def read_as(user_id: Optional[int]) -> Iterator[None]:
+    """
+    Attribute @read_only queries made inside the block to a user
+    
+    Usage:
+        with read_as(user.id):
+            return await handler(event, data)
+    
+    Args:
+        user_id: Telegram ID of the user the update came from
+    """
+    token = _reader.set(user_id)
+    try:
+        yield
+    finally:
+        _reader.reset(token)
+
+
+def mark_written(user_id: Optional[int] = None) -> None:
+    """
+    Send the user's reads to the primary for DB_REPLICA_WINDOW seconds
+    
+    Call this from repository methods that change what a user reads,
+    so the change is visible before the replica has caught up.
+    
+    Args:
+        user_id: Affected user (the current reader if None)
+    """
+    if replica_engine is None:
+        return
+    user_id = user_id if user_id is not None else _reader.get()
+    if user_id is None:
+        return
+    
+    now = time.monotonic()
+    if len(_recent_writes) >= _RECENT_WRITES_PRUNE:
+        for expired in [key for key, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[expired]
+    _recent_writes[user_id] = now + settings.db_replica_window
+
+
+def reading_replica() -> bool:
+    """
+    Whether the running @read_only method was given a replica session
+    
+    Rows read there may lag behind the primary and must not be cached
+    where readers of the primary would find them.
+    """
+    return _on_replica.get()
+
+
+def _use_replica() -> bool:
+    """Whether a read-only query may go to the replica"""
+    if replica_session_maker is None or _replica_down_until > time.monotonic():
+        return False
+    user_id = _reader.get()
+    if user_id is None:
+        # Background jobs read what they or another process just wrote
+        return False
+    return _recent_writes.get(user_id, 0.0) <= time.monotonic()
+
+
+def read_only(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Route a repository method to the replica when it is safe
+    
+    The method must only read and take the session as first argument.
+    It gets a replica session while handling a user's update, unless
+    that user wrote within DB_REPLICA_WINDOW seconds. Background jobs
+    and recent writers use the session passed in. A failed replica
+    query, or a replica pool that has no free connection within
+    DB_POOL_TIMEOUT, is retried on that session and the replica is
+    skipped for the next DB_REPLICA_WINDOW seconds.
+    
+    Metrics:
+        db.replica_reads: calls served by the replica
+        db.primary_reads: calls of read-only methods served by the primary
+        db.replica_failed: replica failures retried on the primary
+    """
+    @functools.wraps(method)
+    async def wrapper(session: AsyncSession, *args: Any, **kwargs: Any) -> T:
+        global _replica_down_until
+        if _use_replica():
+            try:
+                async with replica_session_maker() as replica:
+                    token = _on_replica.set(True)
+                    try:
+                        result = await method(replica, *args, **kwargs)
+                    finally:
+                        _on_replica.reset(token)
+                metrics.increment("db.replica_reads")
+                return result
+            except (DBAPIError, PoolTimeoutError, OSError) as e:
+                _replica_down_until = time.monotonic() + settings.db_replica_window
+                metrics.increment("db.replica_failed")
+                logger.warning(f"Replica read {method.__qualname__} failed, using primary: {e}")
+        
+        metrics.increment("db.primary_reads")
+        return await method(session, *args, **kwargs)
+    
+    return wrapper
 
 
 async def init_db() -> None:
     """
-    Initialize database - create all tables
+    Check database schema and insert default data
+    
+    Call this once when starting the bot. Tables are created and changed
+    by `alembic upgrade head`, so startup only reads the recorded schema
+    revision instead of reflecting every table.
     
-    Call this once when starting the bot
+    Raises:
+        RuntimeError: Database or replica is not at SCHEMA_VERSION
     """
     try:
         async with engine.begin() as conn:
-            # Create all tables
-            await conn.run_sync(Base.metadata.create_all)
+            version = await _get_schema_version(conn)
+            if version != SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"database schema is at revision {version}, "
+                    f"expected {SCHEMA_VERSION} - run `alembic upgrade head`"
+                )
+            
+            # Insert default pricing if not exists
+            await _insert_default_pricing(conn)
+        
+        if replica_engine is not None:
+            await _check_replica()
         
-        logger.info("✅ Database initialized successfully")
+        logger.info(f"✅ Database initialized successfully (schema {version})")
         
-        # Insert default pricing if not exists
-        await _insert_default_pricing()
+        await warm_pool()
         
     except Exception as e:
         logger.error(f"❌ Failed to initialize database: {e}")
         raise
 
 
-async def _insert_default_pricing() -> None:
-    """Insert default pricing configuration"""
-    from database.models import Pricing
+async def _check_replica() -> None:
+    """
+    Check replica schema revision
     
-    async with async_session_maker() as session:
-        # Check if pricing already exists
-        result = await session.execute(
-            "SELECT COUNT(*) FROM pricing WHERE is_active = true"
+    An unreachable replica only logs a warning, reads fall back to the
+    primary until it is back.
+    
+    Raises:
+        RuntimeError: Replica is not at SCHEMA_VERSION
+    """
+    try:
+        async with replica_engine.connect() as conn:
+            version = await _get_schema_version(conn)
+    except (DBAPIError, OSError) as e:
+        logger.warning(f"⚠️ Replica unreachable, reading from the primary: {e}")
+        return
+    
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f"replica schema is at revision {version}, expected {SCHEMA_VERSION}"
         )
-        count = result.scalar()
+
+
+async def _get_schema_version(conn: AsyncConnection) -> Optional[str]:
+    """
+    Get Alembic revision recorded in the database
+    
+    Args:
+        conn: Database connection
         
-        if count == 0:
-            # Insert default carpet pricing
-            carpet_pricing = Pricing(
-                service_type="carpet",
-                price_per_m2=settings.carpet_price_per_m2,
-                is_active=True
-            )
-            
-            # Insert default sofa pricing
-            sofa_pricing = Pricing(
-                service_type="sofa",
-                base_price=settings.sofa_price_2_seat,
-                is_active=True
-            )
-            
-            session.add(carpet_pricing)
-            session.add(sofa_pricing)
-            await session.commit()
-            
-            logger.info("✅ Default pricing inserted")
+    Returns:
+        Revision ID or None if migrations were never applied
+    """
+    try:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+    except ProgrammingError:
+        # alembic_version table does not exist
+        return None
+    return result.scalar_one_or_none()
+
+
+async def _insert_default_pricing(conn: AsyncConnection) -> None:
+    """
+    Insert default pricing configuration
+    
+    Single statement: rows are only inserted when no active pricing
+    exists yet
+    
+    Args:
+        conn: Database connection
+    """
+    defaults = values(
+        column("service_type", String),
+        column("price_per_m2", Numeric),
+        column("base_price", Numeric),
+        name="defaults"
+    ).data([
+        # Default carpet pricing
+        ("carpet", settings.carpet_price_per_m2, None),
+        # Default sofa pricing
+        ("sofa", None, settings.sofa_price_2_seat)
+    ])
+    
+    has_active = select(Pricing.id).where(Pricing.is_active.is_(True)).exists()
+    stmt = insert(Pricing).from_select(
+        ["service_type", "price_per_m2", "base_price", "is_active"],
+        select(
+            defaults.c.service_type,
+            defaults.c.price_per_m2,
+            defaults.c.base_price,
+            true()
+        ).where(~has_active)
+    )
+    result = await conn.execute(stmt)
+    
+    if result.rowcount:
+        logger.info("✅ Default pricing inserted")
+
+
+async def warm_pool() -> None:
+    """
+    Open pool_size connections up front
+    
+    Call this on startup so the first updates do not pay for
+    connection setup
+    """
+    async def touch(target: AsyncEngine) -> None:
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*(touch(engine) for _ in range(settings.db_pool_size)))
+    if replica_engine is not None:
+        results = await asyncio.gather(
+            *(touch(replica_engine) for _ in range(settings.db_pool_size)),
+            return_exceptions=True
+        )
+        if any(isinstance(result, Exception) for result in results):
+            logger.warning("⚠️ Replica pool not warmed")
+    logger.info(f"✅ Database pool warmed ({settings.db_pool_size} connections)")
+
+
+def pool_stats(target: Optional[AsyncEngine] = None) -> dict:
+    """
+    Get live connection pool statistics
+    
+    Args:
+        target: Engine (the primary if None)
+    
+    Returns:
+        Dictionary with pool size, checked out, idle, overflow and
+        waiting connection counts
+    """
+    pool = (target or engine).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "waiting": pool.waiting
+    }
+
+
+def _publish_pool_stats() -> None:
+    """Copy pool statistics to metrics gauges"""
+    for name, value in pool_stats().items():
+        metrics.set_gauge(f"db.pool.{name}", value)
+    if replica_engine is not None:
+        for name, value in pool_stats(replica_engine).items():
+            metrics.set_gauge(f"db.replica_pool.{name}", value)
+
+
+metrics.add_collector(_publish_pool_stats)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -115,4 +437,6 @@ async def dispose_engine() -> None:
     Call this when shutting down the bot
     """
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
     logger.info("✅ Database engine disposed")
\ No newline at end of file
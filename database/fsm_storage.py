@@ -0,0 +1,535 @@
+"""
+FSM Storage
+===========
+Pluggable aiogram FSM storages with idle-conversation expiry
+"""
+
+import asyncio
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import select, delete, case, cast, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import insert, JSONB
+from config import settings
+from database.database import engine
+from database.models import FSMRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def build_storage_key(key: StorageKey) -> str:
+    """
+    Serialize aiogram storage key into primary key string
+    
+    Args:
+        key: aiogram storage key
+        
+    Returns:
+        String like "bot:chat:user:thread:business:destiny"
+    """
+    return ":".join((
+        str(key.bot_id),
+        str(key.chat_id),
+        str(key.user_id),
+        str(key.thread_id or ""),
+        key.business_connection_id or "",
+        key.destiny
+    ))
+
+
+def parse_storage_key(value: str) -> StorageKey:
+    """
+    Rebuild aiogram storage key from primary key string
+    
+    Args:
+        value: String made by build_storage_key
+        
+    Returns:
+        aiogram storage key
+    """
+    bot_id, chat_id, user_id, thread_id, business_connection_id, destiny = value.split(":", 5)
+    return StorageKey(
+        bot_id=int(bot_id),
+        chat_id=int(chat_id),
+        user_id=int(user_id),
+        thread_id=int(thread_id) if thread_id else None,
+        business_connection_id=business_connection_id or None,
+        destiny=destiny
+    )
+
+
+class IdleConversation(NamedTuple):
+    """Conversation found by ExpiringStorage.scan_idle"""
+    
+    key: StorageKey
+    state: str
+    data: Dict[str, Any]
+    cursor: Any  # pass back as `after` to continue the scan
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    """Get state string from State object or string"""
+    return state.state if isinstance(state, State) else state
+
+
+class ExpiringStorage(BaseStorage):
+    """
+    FSM storage where conversations idle longer than TTL expire
+    
+    Expired conversations read as empty (no state, no data) and are
+    physically removed by purge_expired()
+    """
+    
+    def __init__(self, ttl: timedelta):
+        self.ttl = ttl
+        self._purger: Optional[asyncio.Task] = None
+    
+    @abstractmethod
+    async def get_record(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Read state and data together
+        
+        Args:
+            key: aiogram storage key
+            
+        Returns:
+            Tuple of (state, data)
+        """
+        pass
+    
+    @abstractmethod
+    async def set_record(
+        self,
+        key: StorageKey,
+        state: StateType,
+        data: Dict[str, Any]
+    ) -> None:
+        """
+        Replace state and data together
+        
+        Args:
+            key: aiogram storage key
+            state: New state
+            data: New data
+        """
+        pass
+    
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """
+        Remove expired conversations
+        
+        Returns:
+            Number of removed conversations
+        """
+        pass
+    
+    @abstractmethod
+    async def scan_idle(
+        self,
+        idle_for: timedelta,
+        limit: int,
+        after: Any = None
+    ) -> List[IdleConversation]:
+        """
+        Get conversations with a state idle longer than idle_for
+        
+        Conversations come in order of last activity, oldest first. Pass
+        the cursor of the last one as `after` to get the next batch - a
+        conversation is returned again only after it was active again.
+        
+        Args:
+            idle_for: Minimum time since last activity
+            limit: Maximum number of conversations
+            after: Cursor to continue from (None starts at the oldest)
+            
+        Returns:
+            Idle conversations
+        """
+        pass
+    
+    @abstractmethod
+    async def delete_if_idle(self, key: StorageKey, idle_for: timedelta) -> bool:
+        """
+        Remove conversation unless it was active in the meantime
+        
+        Args:
+            key: aiogram storage key
+            idle_for: Minimum time since last activity
+            
+        Returns:
+            Whether the conversation was removed
+        """
+        pass
+    
+    def start_purger(self, interval: int) -> None:
+        """
+        Periodically remove expired conversations
+        
+        Args:
+            interval: Seconds between purges (0 disables purging)
+        """
+        if interval <= 0 or self._purger is not None:
+            return
+        self._purger = asyncio.create_task(self._purge_loop(interval))
+    
+    async def stop_purger(self) -> None:
+        """Stop periodic purging"""
+        if self._purger is not None:
+            self._purger.cancel()
+            try:
+                await self._purger
+            except asyncio.CancelledError:
+                pass
+            self._purger = None
+    
+    async def _purge_loop(self, interval: int) -> None:
+        """Purger task body"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.purge_expired()
+                if removed:
+                    logger.info(f"🧹 Removed {removed} expired conversations")
+            except Exception as e:
+                logger.error(f"Error purging expired conversations: {e}")
+
+
+class PostgresStorage(ExpiringStorage):
+    """
+    FSM storage kept in the fsm_states table
+    
+    Survives restarts and is visible to every worker process. Every
+    operation is a single autocommit statement, so it costs exactly one
+    round trip: reads are a SELECT, writes (including update_data) are an
+    INSERT ... ON CONFLICT DO UPDATE.
+    """
+    
+    def __init__(self, ttl: timedelta):
+        super().__init__(ttl)
+        self._engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Write state"""
+        stmt = insert(FSMRecord).values(
+            storage_key=build_storage_key(key),
+            state=_state_name(state)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMRecord.storage_key],
+            set_={
+                "state": stmt.excluded.state,
+                "data": case(
+                    (self._expired(), cast({}, JSONB)),
+                    else_=FSMRecord.data
+                ),
+                "updated_at": func.now()
+            }
+        )
+        await self._execute(stmt)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Read state"""
+        stmt = select(FSMRecord.state).where(self._alive(key))
+        result = await self._execute(stmt)
+        return result.scalar_one_or_none()
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """Replace data"""
+        stmt = insert(FSMRecord).values(
+            storage_key=build_storage_key(key),
+            data=data
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMRecord.storage_key],
+            set_={
+                "state": case(
+                    (self._expired(), None),
+                    else_=FSMRecord.state
+                ),
+                "data": stmt.excluded.data,
+                "updated_at": func.now()
+            }
+        )
+        await self._execute(stmt)
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Read data"""
+        stmt = select(FSMRecord.data).where(self._alive(key))
+        result = await self._execute(stmt)
+        return dict(result.scalar_one_or_none() or {})
+    
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data in a single statement (no read-modify-write)"""
+        stmt = insert(FSMRecord).values(
+            storage_key=build_storage_key(key),
+            data=data
+        )
+        expired = self._expired()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMRecord.storage_key],
+            set_={
+                "state": case((expired, None), else_=FSMRecord.state),
+                "data": case(
+                    (expired, stmt.excluded.data),
+                    else_=FSMRecord.data.op("||")(stmt.excluded.data)
+                ),
+                "updated_at": func.now()
+            }
+        ).returning(FSMRecord.data)
+        result = await self._execute(stmt)
+        return dict(result.scalar_one())
+    
+    async def get_record(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Read state and data with one SELECT"""
+        stmt = select(FSMRecord.state, FSMRecord.data).where(self._alive(key))
+        result = await self._execute(stmt)
+        row = result.one_or_none()
+        if row is None:
+            return None, {}
+        return row.state, dict(row.data or {})
+    
+    async def set_record(
+        self,
+        key: StorageKey,
+        state: StateType,
+        data: Dict[str, Any]
+    ) -> None:
+        """Replace state and data with one upsert"""
+        stmt = insert(FSMRecord).values(
+            storage_key=build_storage_key(key),
+            state=_state_name(state),
+            data=data
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMRecord.storage_key],
+            set_={
+                "state": stmt.excluded.state,
+                "data": stmt.excluded.data,
+                "updated_at": func.now()
+            }
+        )
+        await self._execute(stmt)
+    
+    async def purge_expired(self) -> int:
+        """Delete conversations idle longer than TTL"""
+        stmt = delete(FSMRecord).where(self._expired())
+        result = await self._execute(stmt)
+        return result.rowcount
+    
+    async def scan_idle(
+        self,
+        idle_for: timedelta,
+        limit: int,
+        after: Any = None
+    ) -> List[IdleConversation]:
+        """Keyset scan over the updated_at index"""
+        stmt = select(
+            FSMRecord.storage_key,
+            FSMRecord.state,
+            FSMRecord.data,
+            FSMRecord.updated_at
+        ).where(
+            FSMRecord.updated_at < func.now() - idle_for,
+            FSMRecord.updated_at >= func.now() - self.ttl,
+            FSMRecord.state.is_not(None)
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(FSMRecord.updated_at, FSMRecord.storage_key)
+                > tuple_(literal(after[0]), literal(after[1]))
+            )
+        stmt = stmt.order_by(FSMRecord.updated_at, FSMRecord.storage_key).limit(limit)
+        
+        result = await self._execute(stmt)
+        return [
+            IdleConversation(
+                parse_storage_key(row.storage_key),
+                row.state,
+                dict(row.data or {}),
+                (row.updated_at, row.storage_key)
+            )
+            for row in result
+        ]
+    
+    async def delete_if_idle(self, key: StorageKey, idle_for: timedelta) -> bool:
+        """Delete row with one conditional DELETE"""
+        stmt = delete(FSMRecord).where(
+            FSMRecord.storage_key == build_storage_key(key),
+            FSMRecord.updated_at < func.now() - idle_for
+        )
+        result = await self._execute(stmt)
+        return result.rowcount > 0
+    
+    async def close(self) -> None:
+        """Engine is disposed by database.database.dispose_engine"""
+        pass
+    
+    def _expired(self):
+        """SQL condition: stored row is older than TTL"""
+        return FSMRecord.updated_at < func.now() - self.ttl
+    
+    def _alive(self, key: StorageKey):
+        """SQL condition: row for key that has not expired"""
+        return (
+            (FSMRecord.storage_key == build_storage_key(key))
+            & (FSMRecord.updated_at >= func.now() - self.ttl)
+        )
+    
+    async def _execute(self, stmt):
+        """Execute statement on autocommit connection"""
+        async with self._engine.connect() as conn:
+            return await conn.execute(stmt)
+
+
+class TTLMemoryRecord:
+    """In-process conversation record"""
+    
+    __slots__ = ("state", "data", "updated_at")
+    
+    def __init__(self):
+        self.state: Optional[str] = None
+        self.data: Dict[str, Any] = {}
+        self.updated_at = time.monotonic()
+
+
+class TTLMemoryStorage(ExpiringStorage):
+    """
+    In-process FSM storage with the same expiry rules as PostgresStorage
+    
+    Loses everything on restart - intended for tests and local development.
+    Records are kept in order of last activity, so expiry and idle scans
+    only look at the idle end.
+    """
+    
+    def __init__(self, ttl: timedelta):
+        super().__init__(ttl)
+        self.storage: OrderedDict[StorageKey, TTLMemoryRecord] = OrderedDict()
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Write state"""
+        self._touch(key).state = _state_name(state)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Read state"""
+        record = self._get(key)
+        return record.state if record else None
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """Replace data"""
+        self._touch(key).data = data.copy()
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Read data"""
+        record = self._get(key)
+        return record.data.copy() if record else {}
+    
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data"""
+        record = self._touch(key)
+        record.data.update(data)
+        return record.data.copy()
+    
+    async def get_record(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Read state and data"""
+        record = self._get(key)
+        if record is None:
+            return None, {}
+        return record.state, record.data.copy()
+    
+    async def set_record(
+        self,
+        key: StorageKey,
+        state: StateType,
+        data: Dict[str, Any]
+    ) -> None:
+        """Replace state and data"""
+        record = self._touch(key)
+        record.state = _state_name(state)
+        record.data = data.copy()
+    
+    async def purge_expired(self) -> int:
+        """Delete conversations idle longer than TTL"""
+        deadline = time.monotonic() - self.ttl.total_seconds()
+        removed = 0
+        while self.storage:
+            key, record = next(iter(self.storage.items()))
+            if record.updated_at >= deadline:
+                break
+            del self.storage[key]
+            removed += 1
+        return removed
+    
+    async def scan_idle(
+        self,
+        idle_for: timedelta,
+        limit: int,
+        after: Any = None
+    ) -> List[IdleConversation]:
+        """Walk records from the least recently active end"""
+        now = time.monotonic()
+        deadline = now - self.ttl.total_seconds()
+        cutoff = now - idle_for.total_seconds()
+        found = []
+        for key, record in self.storage.items():
+            if record.updated_at >= cutoff or len(found) >= limit:
+                break
+            if record.updated_at < deadline or record.state is None:
+                continue
+            if after is not None and record.updated_at <= after:
+                continue
+            found.append(IdleConversation(key, record.state, record.data.copy(), record.updated_at))
+        return found
+    
+    async def delete_if_idle(self, key: StorageKey, idle_for: timedelta) -> bool:
+        """Delete record unless touched within idle_for"""
+        record = self.storage.get(key)
+        if record is None or record.updated_at >= time.monotonic() - idle_for.total_seconds():
+            return False
+        del self.storage[key]
+        return True
+    
+    async def close(self) -> None:
+        """Nothing to release"""
+        pass
+    
+    def _get(self, key: StorageKey) -> Optional[TTLMemoryRecord]:
+        """Get record unless expired"""
+        record = self.storage.get(key)
+        if record and record.updated_at < time.monotonic() - self.ttl.total_seconds():
+            del self.storage[key]
+            return None
+        return record
+    
+    def _touch(self, key: StorageKey) -> TTLMemoryRecord:
+        """Get or create record and mark it active"""
+        record = self._get(key)
+        if record is None:
+            record = self.storage[key] = TTLMemoryRecord()
+        else:
+            self.storage.move_to_end(key)
+        record.updated_at = time.monotonic()
+        return record
+
+
+def create_storage(backend: Optional[str] = None) -> ExpiringStorage:
+    """
+    Create FSM storage configured in settings
+    
+    Args:
+        backend: 'postgres' or 'memory' (defaults to FSM_STORAGE)
+        
+    Returns:
+        Storage instance
+    """
+    backend = backend or settings.fsm_storage
+    ttl = timedelta(hours=settings.fsm_ttl_hours)
+    
+    if backend == "memory":
+        return TTLMemoryStorage(ttl)
+    return PostgresStorage(ttl)
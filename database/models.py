@@ -4,16 +4,26 @@ Database Models
 SQLAlchemy ORM models for the cleaning service bot
 """
 
-from datetime import datetime
+import re
+from datetime import date, datetime
 from typing import Optional, List
 from sqlalchemy import (
     BigInteger, String, Integer, Numeric, Boolean, Text,
-    DateTime, CheckConstraint, ForeignKey, func
+    Date, DateTime, CheckConstraint, ForeignKey, Index, Sequence, UniqueConstraint,
+    func, text
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+# Alembic revision these models correspond to - bump it together with
+# every new migration in alembic/versions/
+SCHEMA_VERSION = "0007"
+
+# Monthly partitions of orders and order_status_history: <table>_yYYYYmMM
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
 class Base(DeclarativeBase):
     """Base class for all models"""
     pass
@@ -80,10 +90,25 @@ class Admin(Base):
     )
 
 
+ORDER_NUMBER_SEQ = Sequence("orders_order_number_seq")
+
+
 class Order(Base):
     """Order model"""
     
     __tablename__ = "orders"
+    __table_args__ = (
+        # /myorders pages: WHERE user_id = ? ORDER BY created_at DESC, order_id DESC
+        Index(
+            "ix_orders_user_id_created_at_order_id",
+            "user_id", text("created_at DESC"), text("order_id DESC")
+        ),
+        # Admin queues and reports: WHERE status = ? ORDER BY created_at
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # Unique keys of a partitioned table include the partition key
+        UniqueConstraint("order_number", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     order_id: Mapped[int] = mapped_column(
         Integer,
@@ -92,8 +117,9 @@ class Order(Base):
     )
     order_number: Mapped[int] = mapped_column(
         Integer,
-        unique=True,
-        autoincrement=True
+        ORDER_NUMBER_SEQ,
+        server_default=ORDER_NUMBER_SEQ.next_value(),
+        nullable=False
     )
     user_id: Mapped[int] = mapped_column(
         BigInteger,
@@ -164,9 +190,10 @@ class Order(Base):
     cancelled_by: Mapped[Optional[int]] = mapped_column(BigInteger)
     cancellation_reason: Mapped[Optional[str]] = mapped_column(Text)
     
-    # Timestamps
+    # Timestamps (created_at is the partition key)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         server_default=func.now()
     )
     accepted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -189,6 +216,7 @@ class Order(Base):
     user: Mapped["User"] = relationship("User", back_populates="orders")
     status_history: Mapped[List["OrderStatusHistory"]] = relationship(
         "OrderStatusHistory",
+        primaryjoin="Order.order_id == foreign(OrderStatusHistory.order_id)",
         back_populates="order",
         cascade="all, delete-orphan"
     )
@@ -198,13 +226,11 @@ class OrderStatusHistory(Base):
     """Order status change history for audit trail"""
     
     __tablename__ = "order_status_history"
+    __table_args__ = {"postgresql_partition_by": "RANGE (changed_at)"}
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    order_id: Mapped[int] = mapped_column(
-        Integer,
-        ForeignKey("orders.order_id", ondelete="CASCADE"),
-        nullable=False
-    )
+    # Not a foreign key: orders is partitioned by created_at
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     old_status: Mapped[Optional[str]] = mapped_column(String(20))
     new_status: Mapped[str] = mapped_column(String(20), nullable=False)
     changed_by: Mapped[Optional[int]] = mapped_column(BigInteger)
@@ -215,11 +241,16 @@ class OrderStatusHistory(Base):
     notes: Mapped[Optional[str]] = mapped_column(Text)
     changed_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         server_default=func.now()
     )
     
     # Relationships
-    order: Mapped["Order"] = relationship("Order", back_populates="status_history")
+    order: Mapped["Order"] = relationship(
+        "Order",
+        primaryjoin="Order.order_id == foreign(OrderStatusHistory.order_id)",
+        back_populates="status_history"
+    )
 
 
 class Pricing(Base):
@@ -245,18 +276,84 @@ class Pricing(Base):
 
 
 class DailyStat(Base):
-    """Daily statistics model"""
+    """
+    Daily statistics rollup per service and operator
+    
+    Counters are incremented by OrderRepository and UserRepository in the
+    transaction of the change they count, on the day it happens. New
+    orders and new users have no operator (admin_id 0), new users no
+    service either (service_type '').
+    """
     
     __tablename__ = "daily_stats"
     
-    stat_date: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
-    total_orders: Mapped[int] = mapped_column(Integer, default=0)
-    completed_orders: Mapped[int] = mapped_column(Integer, default=0)
-    cancelled_orders: Mapped[int] = mapped_column(Integer, default=0)
-    total_revenue: Mapped[float] = mapped_column(Numeric(12, 2), default=0)
-    average_rating: Mapped[Optional[float]] = mapped_column(Numeric(3, 2))
-    new_users: Mapped[int] = mapped_column(Integer, default=0)
+    stat_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    service_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    admin_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    total_orders: Mapped[int] = mapped_column(Integer, server_default="0")
+    accepted_orders: Mapped[int] = mapped_column(Integer, server_default="0")
+    completed_orders: Mapped[int] = mapped_column(Integer, server_default="0")
+    cancelled_orders: Mapped[int] = mapped_column(Integer, server_default="0")
+    total_revenue: Mapped[float] = mapped_column(Numeric(12, 2), server_default="0")
+    rating_sum: Mapped[int] = mapped_column(Integer, server_default="0")
+    rating_count: Mapped[int] = mapped_column(Integer, server_default="0")
+    new_users: Mapped[int] = mapped_column(Integer, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+
+class FSMRecord(Base):
+    """Conversation state shared between bot processes"""
+    
+    __tablename__ = "fsm_states"
+    
+    storage_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255))
+    data: Mapped[dict] = mapped_column(
+        JSONB,
+        nullable=False,
+        server_default="{}"
+    )
     updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True
+    )
+
+
+class OutboxMessage(Base):
+    """Notification written with an order change, delivered in background"""
+    
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Dispatcher polling: pending messages that are due
+        Index(
+            "ix_notification_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(10),
+        CheckConstraint("status IN ('pending', 'sent', 'dead')"),
+        default="pending"
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+    next_attempt_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now()
     )
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
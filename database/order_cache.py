@@ -0,0 +1,234 @@
+"""
+Order Cache
+===========
+Read-through cache of order rows for OrderRepository
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy import JSON, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database.models import Order
+from utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses no admin action changes any more
+FINAL_STATUSES = frozenset({"completed", "cancelled"})
+
+_COLUMNS = tuple(column.key for column in inspect(Order).column_attrs)
+# Columns holding mutable values (items_details), copied in and out
+_JSON_COLUMNS = tuple(
+    attr.key for attr in inspect(Order).column_attrs
+    if isinstance(attr.columns[0].type, JSON)
+)
+_new_order = Order.__mapper__.class_manager.new_instance
+
+
+class OrderCache:
+    """
+    LRU cache of order snapshots with status-aware expiry
+    
+    Orders are kept as column values and every hit gets its own detached
+    Order with its own copy of the JSON columns, so callers may change
+    it without affecting the cache or each other. Active
+    orders expire after `ttl` seconds, completed and cancelled ones after
+    `final_ttl`. Writes through OrderRepository invalidate the order in
+    this process, other processes see the change once their copy
+    expires. Concurrent misses for one order share a single query.
+    Orders loaded from a read replica are returned but never cached, and
+    their loads are only shared with other replica lookups, so a reader
+    sent to the primary never gets a copy that is behind it.
+    
+    Metrics:
+        orders.cache_hits: lookups served from memory
+        orders.cache_misses: lookups that queried the database
+        orders.cache_coalesced: lookups that waited for another one's query
+        orders.cache_hit_rate: hits / lookups since start
+        orders.cache_size: cached orders
+        orders.cache_load_seconds: database load time on a miss
+    """
+    
+    def __init__(self, max_size: int = 5000, ttl: float = 5, final_ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.final_ttl = final_ttl
+        self._entries: OrderedDict[int, Tuple[Dict[str, Any], float]] = OrderedDict()
+        self._numbers: Dict[int, int] = {}  # order_number: order_id
+        self._loading: Dict[Tuple[str, int, bool], asyncio.Future] = {}  # (field, value, replica)
+        metrics.add_collector(self._publish)
+    
+    async def get(
+        self,
+        field: str,
+        value: int,
+        load: Callable[[], Awaitable[Optional[Order]]],
+        replica: bool = False
+    ) -> Optional[Order]:
+        """
+        Get order from cache, loading it on a miss
+        
+        Args:
+            field: 'order_id' or 'order_number'
+            value: Field value
+            load: Coroutine function querying the order
+            replica: load reads a replica, its result is not cached
+            
+        Returns:
+            Detached order or None if not found
+        """
+        order_id = value if field == "order_id" else self._numbers.get(value)
+        values = self._lookup(order_id) if order_id is not None else None
+        if values is not None:
+            metrics.increment("orders.cache_hits")
+            return self._hydrate(values)
+        
+        key = (field, value, replica)
+        future = self._loading.get(key)
+        if future is not None:
+            metrics.increment("orders.cache_coalesced")
+            try:
+                values = await asyncio.shield(future)
+                return self._hydrate(values) if values is not None else None
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The loading lookup was cancelled, query on our own
+        
+        metrics.increment("orders.cache_misses")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        started = time.perf_counter()
+        try:
+            order = await load()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it, nobody else has to
+            raise
+        finally:
+            metrics.observe("orders.cache_load_seconds", time.perf_counter() - started)
+            if self._loading.get(key) is future:
+                del self._loading[key]
+                stale = False
+            else:
+                # Invalidated while loading
+                stale = True
+        
+        values = self._snapshot(order) if order is not None else None
+        if values is not None and not stale and not replica:
+            self._store(values)
+        future.set_result(values)
+        return order
+    
+    def put(self, order: Order) -> None:
+        """
+        Cache committed order state
+        
+        Args:
+            order: Order as returned by the database
+        """
+        self.invalidate(order.order_id)
+        self._store(self._snapshot(order))
+    
+    def invalidate(self, order_id: int) -> None:
+        """
+        Drop order, including lookups still loading it
+        
+        Args:
+            order_id: Order ID
+        """
+        entry = self._entries.pop(order_id, None)
+        if entry is not None:
+            self._numbers.pop(entry[0]["order_number"], None)
+        # Lookups by number cannot be matched to the ID before they finish
+        for key in [key for key in self._loading if key[0] == "order_number" or key[1] == order_id]:
+            del self._loading[key]
+    
+    def invalidate_on_commit(self, session: AsyncSession, order_id: int) -> None:
+        """
+        Drop order now and again once the session commits
+        
+        Lookups between the write and the commit still read the old row,
+        the second invalidation keeps it from staying cached.
+        
+        Args:
+            session: Session holding the uncommitted write
+            order_id: Order ID
+        """
+        self.invalidate(order_id)
+        event.listen(
+            session.sync_session,
+            "after_commit",
+            lambda _session: self.invalidate(order_id),
+            once=True
+        )
+    
+    def clear(self) -> None:
+        """Drop all orders"""
+        self._entries.clear()
+        self._numbers.clear()
+        self._loading.clear()
+    
+    def _lookup(self, order_id: int) -> Optional[Dict[str, Any]]:
+        """Get fresh column values, marking the order as recently used"""
+        entry = self._entries.get(order_id)
+        if entry is None:
+            return None
+        values, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self.invalidate(order_id)
+            return None
+        self._entries.move_to_end(order_id)
+        return values
+    
+    def _store(self, values: Dict[str, Any]) -> None:
+        """Cache column values, evicting least recently used orders"""
+        ttl = self.final_ttl if values["status"] in FINAL_STATUSES else self.ttl
+        order_id = values["order_id"]
+        self._entries[order_id] = (values, time.monotonic() + ttl)
+        self._entries.move_to_end(order_id)
+        self._numbers[values["order_number"]] = order_id
+        while len(self._entries) > self.max_size:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._numbers.pop(evicted["order_number"], None)
+    
+    @staticmethod
+    def _snapshot(order: Order) -> Dict[str, Any]:
+        """Column values of an order, not sharing JSON values with it"""
+        values = {key: getattr(order, key) for key in _COLUMNS}
+        for key in _JSON_COLUMNS:
+            values[key] = deepcopy(values[key])
+        return values
+    
+    @staticmethod
+    def _hydrate(values: Dict[str, Any]) -> Order:
+        """Detached order with the given column values"""
+        # Filled like a loaded instance, Order(**values) costs ~15x more
+        order = _new_order()
+        order.__dict__.update(values)
+        for key in _JSON_COLUMNS:
+            order.__dict__[key] = deepcopy(values[key])
+        return order
+    
+    def _publish(self) -> None:
+        """Push cache size and hit rate to metrics"""
+        hits = metrics.counters.get("orders.cache_hits", 0)
+        lookups = hits + metrics.counters.get("orders.cache_misses", 0)
+        metrics.set_gauge("orders.cache_size", len(self._entries))
+        metrics.set_gauge("orders.cache_hit_rate", hits / lookups if lookups else 0.0)
+
+
+# Global order cache instance
+order_cache = OrderCache(
+    max_size=settings.order_cache_size,
+    ttl=settings.order_cache_ttl,
+    final_ttl=settings.order_cache_final_ttl
+)
@@ -0,0 +1,296 @@
+"""
+Table Partitions
+================
+Monthly partitions of orders and order_status_history
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from config import settings
+from database.database import engine
+from database.models import PARTITION_NAME
+from database.order_cache import FINAL_STATUSES
+from utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table: partition key column
+PARTITIONED_TABLES = {
+    "orders": "created_at",
+    "order_status_history": "changed_at"
+}
+
+# Schema detached partitions are moved to
+ARCHIVE_SCHEMA = "archive"
+
+
+def month_start(moment: datetime) -> datetime:
+    """
+    First moment of the month (UTC)
+    
+    Args:
+        moment: Any time in the month
+        
+    Returns:
+        Month start in UTC
+    """
+    moment = moment.astimezone(timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    """
+    Shift a month start by count months
+    
+    Args:
+        month: Month start
+        count: Months to add (negative to go back)
+        
+    Returns:
+        Month start
+    """
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    """Partition of table holding the month"""
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, datetime]]:
+    """
+    Get monthly partitions attached to a table
+    
+    Args:
+        conn: Database connection
+        table: Partitioned table
+        
+    Returns:
+        (partition name, month start) pairs, oldest first
+    """
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table}
+    )
+    partitions = []
+    for name in result.scalars():
+        match = PARTITION_NAME.match(name)
+        if match and match["table"] == table:
+            month = datetime(int(match["year"]), int(match["month"]), 1, tzinfo=timezone.utc)
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def ensure_partitions(months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create partitions from the current month to months_ahead months ahead
+    
+    Args:
+        months_ahead: Months after the current one to create
+        now: Current time (for tests)
+        
+    Returns:
+        Names of created partitions
+    """
+    current = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for table in PARTITIONED_TABLES:
+        async with engine.begin() as conn:
+            # Creating a partition locks the parent, never queue behind long queries
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            existing = {name for name, _ in await list_partitions(conn, table)}
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                name = partition_name(table, month)
+                if name in existing:
+                    continue
+                await conn.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') "
+                    f"TO ('{add_months(month, 1).isoformat()}')"
+                ))
+                created.append(name)
+    
+    if created:
+        metrics.increment("partitions.created", len(created))
+        logger.info(f"✅ Created partitions: {', '.join(created)}")
+    return created
+
+
+async def archive_partitions(keep_months: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Detach partitions older than keep_months into the archive schema
+    
+    An orders partition still holding orders that are not completed or
+    cancelled is kept and reported. An order_status_history partition is
+    kept while it holds history of any order still attached, whatever
+    month the order was created in, so an order the bot reads is never
+    left without its history. Archived partitions stay queryable as
+    archive.<name> but are no longer read by the bot.
+    
+    Args:
+        keep_months: Full months to keep attached before the current one
+        now: Current time (for tests)
+        
+    Returns:
+        Names of archived partitions
+    """
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -keep_months)
+    archived = []
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    
+    for table in PARTITIONED_TABLES:
+        async with engine.connect() as conn:
+            partitions = await list_partitions(conn, table)
+        
+        for name, month in partitions:
+            if add_months(month, 1) > cutoff:
+                break
+            async with engine.begin() as conn:
+                await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+                if table == "orders":
+                    open_orders = await conn.scalar(
+                        text(f"SELECT count(*) FROM {name} WHERE status <> ALL(:final)"),
+                        {"final": list(FINAL_STATUSES)}
+                    )
+                    if open_orders:
+                        metrics.increment("partitions.archive_skipped")
+                        logger.warning(f"⚠️ Partition {name} not archived: {open_orders} open orders")
+                        continue
+                else:
+                    # Orders come first, `orders` now only has the ones staying attached
+                    attached_history = await conn.scalar(text(
+                        f"SELECT EXISTS (SELECT 1 FROM {name} h "
+                        f"JOIN orders o ON o.order_id = h.order_id)"
+                    ))
+                    if attached_history:
+                        logger.info(f"Partition {name} kept with the history of attached orders")
+                        continue
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            archived.append(name)
+    
+    if archived:
+        metrics.increment("partitions.archived", len(archived))
+        logger.info(f"✅ Archived partitions: {', '.join(archived)}")
+    return archived
+
+
+class PartitionRange(NamedTuple):
+    """Month of an orders partition and the keys it holds"""
+    lower: datetime
+    upper: datetime
+    keys: Dict[str, Tuple[int, int]]  # key column: (min, max), missing if empty
+
+
+class OrderPartitionMap:
+    """
+    Maps order IDs and numbers to the created_at range holding them
+    
+    Both keys come from sequences, so they grow with created_at and every
+    partition holds a narrow range of them. Lookups by key add the
+    returned created_at bounds to their WHERE clause and Postgres reads a
+    single partition instead of probing the index of every month. Keys
+    above the newest range map to "from that month on", so orders
+    created after the last refresh are still found. The key ranges are
+    read from the partitions' indexes every `refresh_interval` seconds.
+    
+    A bound can still miss (transactions crossing a month boundary,
+    stale ranges), so callers must retry without it when nothing is found.
+    
+    Metrics:
+        orders.partition_map_refreshes: key ranges reloaded
+    """
+    
+    def __init__(self, refresh_interval: float = 300):
+        self.refresh_interval = refresh_interval
+        self._ranges: List[PartitionRange] = []
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def bounds(self, key: str, value: int) -> Optional[Tuple[datetime, Optional[datetime]]]:
+        """
+        Get created_at range an order is expected in
+        
+        Args:
+            key: 'order_id' or 'order_number'
+            value: Key value
+            
+        Returns:
+            (lower, upper) bounds, upper None for open-ended, or None if
+            the key cannot be placed
+        """
+        if time.monotonic() >= self._expires_at:
+            await self._refresh()
+        
+        filled = [partition for partition in self._ranges if key in partition.keys]
+        if not filled:
+            return None
+        
+        candidates = [
+            partition for partition in filled
+            if partition.keys[key][0] <= value <= partition.keys[key][1]
+        ]
+        newest = filled[-1]
+        if value >= newest.keys[key][0]:
+            # Newest month or a later one not seen yet
+            return min(partition.lower for partition in candidates + [newest]), None
+        if not candidates:
+            return None
+        return candidates[0].lower, candidates[-1].upper
+    
+    def invalidate(self) -> None:
+        """Reload key ranges on the next lookup"""
+        self._expires_at = 0.0
+    
+    async def _refresh(self) -> None:
+        """Read key ranges of every orders partition"""
+        async with self._lock:
+            if time.monotonic() < self._expires_at:
+                return
+            # Failures keep the old ranges until the next interval
+            self._expires_at = time.monotonic() + self.refresh_interval
+            try:
+                self._ranges = await self._load()
+                metrics.increment("orders.partition_map_refreshes")
+            except Exception as e:
+                logger.error(f"Error loading order partition ranges: {e}")
+    
+    async def _load(self) -> List[PartitionRange]:
+        """Query min and max keys per partition"""
+        async with engine.connect() as conn:
+            partitions = await list_partitions(conn, "orders")
+            if not partitions:
+                return []
+            # min/max of a leading index column reads one index page each
+            stmt = " UNION ALL ".join(
+                f"SELECT '{name}', min(order_id), max(order_id), "
+                f"min(order_number), max(order_number) FROM {name}"
+                for name, _ in partitions
+            )
+            rows = {row[0]: row[1:] for row in await conn.execute(text(stmt))}
+        
+        ranges = []
+        for name, month in partitions:
+            first_id, last_id, first_number, last_number = rows[name]
+            keys = {}
+            if first_id is not None:
+                keys["order_id"] = (first_id, last_id)
+                keys["order_number"] = (first_number, last_number)
+            ranges.append(PartitionRange(month, add_months(month, 1), keys))
+        return ranges
+
+
+# Global order partition map instance
+order_partitions = OrderPartitionMap(refresh_interval=settings.partition_map_refresh)
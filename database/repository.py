@@ -4,15 +4,212 @@ Database Repository
 High-level database operations and queries
 """
 
-from typing import Optional, List
-from datetime import datetime
-from sqlalchemy import select, update, delete, and_
+from typing import Awaitable, Callable, NamedTuple, Optional, List, Iterable, Tuple, TypeVar
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import (
+    select, update, delete, and_, case, func, literal, literal_column, true, tuple_,
+    BigInteger, DateTime, Select, Text
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import User, Order, OrderStatusHistory, Admin
+from sqlalchemy.orm import aliased
+from database.database import mark_written, read_only, reading_replica
+from database.models import User, Order, OrderStatusHistory, Admin, OutboxMessage, DailyStat
+from database.order_cache import order_cache
+from database.partitions import order_partitions
+from utils.metrics import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Allowed order status changes: current status -> reachable statuses
+ORDER_STATUS_TRANSITIONS = {
+    "pending": {"accepted", "cancelled"},
+    "accepted": {"in_progress", "cancelled"},
+    "in_progress": {"completed", "cancelled"},
+    "completed": set(),
+    "cancelled": set()
+}
+
+# Status change outcomes
+TRANSITION_APPLIED = "applied"
+TRANSITION_NOT_FOUND = "not_found"
+TRANSITION_CONFLICT = "conflict"  # status was changed by someone else
+TRANSITION_ILLEGAL = "illegal"    # not allowed by ORDER_STATUS_TRANSITIONS
+
+# Order page cursors count microseconds from here
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class StatusChange(NamedTuple):
+    """Result of OrderRepository.update_status"""
+    
+    order: Optional[Order]
+    outcome: str
+    current_status: Optional[str]
+    
+    @property
+    def applied(self) -> bool:
+        """Whether this call changed the status"""
+        return self.outcome == TRANSITION_APPLIED
+
+
+class OrderListRow:
+    """
+    Order as shown in order lists
+    
+    Plain row from a column-projected select - no ORM identity, no JSONB
+    details. Load the full Order when a single order is opened.
+    """
+    
+    __slots__ = ("order_id", "order_number", "status", "service_type", "created_at")
+    
+    def __init__(
+        self,
+        order_id: int,
+        order_number: int,
+        status: str,
+        service_type: str,
+        created_at: datetime
+    ):
+        self.order_id = order_id
+        self.order_number = order_number
+        self.status = status
+        self.service_type = service_type
+        self.created_at = created_at
+    
+    @property
+    def cursor(self) -> str:
+        """Page cursor pointing at this order"""
+        return encode_order_cursor(self.created_at, self.order_id)
+
+
+class OrderPage(NamedTuple):
+    """Result of OrderRepository.list_user_orders"""
+    
+    rows: List[OrderListRow]
+    older: Optional[str]  # cursor for the next older page, None on the last page
+    newer: Optional[str]  # cursor for the next newer page, None on the first page
+
+
+def encode_order_cursor(created_at: datetime, order_id: int) -> str:
+    """
+    Encode order position for callback data
+    
+    Args:
+        created_at: Order creation time
+        order_id: Order ID
+        
+    Returns:
+        Compact cursor, e.g. '63f1c2a9b4e10.2a'
+    """
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros:x}.{order_id:x}"
+
+
+def decode_order_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode cursor made by encode_order_cursor
+    
+    Args:
+        cursor: Cursor string
+        
+    Returns:
+        Creation time and order ID
+        
+    Raises:
+        ValueError: Malformed cursor
+    """
+    micros, order_id = cursor.split(".")
+    return _EPOCH + timedelta(microseconds=int(micros, 16)), int(order_id, 16)
+
+
+def _daily_stats_upsert(source: Select) -> Insert:
+    """
+    Add counters to daily_stats, creating missing rows
+    
+    Used as a CTE of the statement making the change, so the rollup is
+    updated in the same round trip and transaction.
+    
+    Args:
+        source: SELECT of stat_date, service_type and admin_id, then
+            the counters to add, labelled with daily_stats column names
+            
+    Returns:
+        INSERT ... ON CONFLICT DO UPDATE statement
+    """
+    columns = [column.key for column in source.selected_columns]
+    stmt = insert(DailyStat).from_select(columns, source)
+    return stmt.on_conflict_do_update(
+        index_elements=[DailyStat.stat_date, DailyStat.service_type, DailyStat.admin_id],
+        set_={
+            **{
+                name: getattr(DailyStat, name) + getattr(stmt.excluded, name)
+                for name in columns[3:]
+            },
+            "updated_at": func.now()
+        }
+    )
+
+
+def _count_new_users(upserted) -> Insert:
+    """
+    Count users inserted by a users upsert CTE into daily_stats
+    
+    Args:
+        upserted: CTE returning an `inserted` flag per row
+        
+    Returns:
+        daily_stats upsert, a no-op if no user was new
+    """
+    return _daily_stats_upsert(
+        select(
+            func.current_date().label("stat_date"),
+            literal("").label("service_type"),
+            literal(0, BigInteger).label("admin_id"),
+            func.count().label("new_users")
+        )
+        .select_from(upserted)
+        .where(upserted.c.inserted)
+        .having(func.count() > 0)
+    )
+
+
+async def _find_order(
+    key: str,
+    value: int,
+    run: Callable[[list], Awaitable[Optional[T]]]
+) -> Optional[T]:
+    """
+    Run an order lookup on the partition its key maps to
+    
+    Metrics:
+        orders.partition_misses: lookups repeated over all partitions
+    
+    Args:
+        key: 'order_id' or 'order_number'
+        value: Key value
+        run: Coroutine function running the lookup with extra WHERE
+            conditions, returning None if the order was not found
+            
+    Returns:
+        Result of run
+    """
+    bounds = await order_partitions.bounds(key, value)
+    if bounds is not None:
+        lower, upper = bounds
+        conditions = [Order.created_at >= lower]
+        if upper is not None:
+            conditions.append(Order.created_at < upper)
+        found = await run(conditions)
+        if found is not None:
+            return found
+        metrics.increment("orders.partition_misses")
+    return await run([])
+
 
 class UserRepository:
     """User database operations"""
@@ -26,34 +223,78 @@ class UserRepository:
         last_name: Optional[str],
         language: str
     ) -> User:
-        """Create or update user"""
-        stmt = select(User).where(User.user_id == user_id)
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if user:
-            # Update existing user
-            user.telegram_username = username
-            user.first_name = first_name
-            user.last_name = last_name
-            user.language_preference = language
-            user.last_interaction = datetime.now()
-        else:
-            # Create new user
-            user = User(
-                user_id=user_id,
-                telegram_username=username,
-                first_name=first_name,
-                last_name=last_name,
-                language_preference=language
-            )
-            session.add(user)
+        """Create or update user with a single upsert"""
+        stmt = insert(User).values(
+            user_id=user_id,
+            telegram_username=username,
+            first_name=first_name,
+            last_name=last_name,
+            language_preference=language
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                "telegram_username": stmt.excluded.telegram_username,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+                "language_preference": stmt.excluded.language_preference,
+                "last_interaction": func.now()
+            }
+        )
+        # xmax is 0 only for rows the INSERT created
+        upserted = stmt.returning(
+            *User.__table__.c,
+            literal_column("xmax = 0").label("inserted")
+        ).cte("upserted")
+        stats = _count_new_users(upserted).cte("stats")
+        
+        result = await session.scalars(
+            select(aliased(User, upserted)).add_cte(stats),
+            execution_options={"populate_existing": True}
+        )
+        user = result.one()
         
         await session.commit()
-        await session.refresh(user)
+        mark_written(user_id)
         return user
     
     @staticmethod
+    async def upsert_many(session: AsyncSession, rows: List[dict]) -> None:
+        """
+        Create or update many users with one multi-row upsert
+        
+        A None language keeps the stored one, last_interaction never
+        moves backwards. Users created by it are counted in daily_stats.
+        
+        Args:
+            session: Database session
+            rows: user_id, telegram_username, first_name, last_name,
+                language_preference and last_interaction of each user
+        """
+        stmt = insert(User).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                "telegram_username": stmt.excluded.telegram_username,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+                "language_preference": func.coalesce(
+                    stmt.excluded.language_preference,
+                    User.language_preference
+                ),
+                "last_interaction": func.greatest(
+                    stmt.excluded.last_interaction,
+                    User.last_interaction
+                )
+            }
+        )
+        upserted = stmt.returning(literal_column("xmax = 0").label("inserted")).cte("upserted")
+        stats = _count_new_users(upserted).cte("stats")
+        await session.execute(select(func.count()).select_from(upserted).add_cte(stats))
+        await session.commit()
+    
+    @staticmethod
+    @read_only
     async def get_by_id(session: AsyncSession, user_id: int) -> Optional[User]:
         """Get user by ID"""
         stmt = select(User).where(User.user_id == user_id)
@@ -74,6 +315,7 @@ class UserRepository:
         )
         await session.execute(stmt)
         await session.commit()
+        mark_written(user_id)
 
 
 class OrderRepository:
@@ -82,52 +324,149 @@ class OrderRepository:
     @staticmethod
     async def create(
         session: AsyncSession,
-        order_data: dict
+        order_data: dict,
+        commit: bool = True
     ) -> Order:
-        """Create new order"""
-        order = Order(**order_data)
-        session.add(order)
-        await session.commit()
-        await session.refresh(order)
+        """
+        Create new order, server defaults come back via RETURNING
+        
+        The order is counted in daily_stats by the same statement.
+        
+        Args:
+            session: Database session
+            order_data: Order column values
+            commit: Commit right away (False to add more writes, e.g.
+                outbox messages, to the same transaction)
+                
+        Returns:
+            Created order
+        """
+        inserted = (
+            insert(Order)
+            .values(**order_data)
+            .returning(*Order.__table__.c)
+            .cte("inserted")
+        )
+        stats = _daily_stats_upsert(
+            select(
+                func.current_date().label("stat_date"),
+                inserted.c.service_type,
+                literal(0, BigInteger).label("admin_id"),
+                literal(1).label("total_orders")
+            )
+        ).cte("stats")
+        
+        result = await session.scalars(select(aliased(Order, inserted)).add_cte(stats))
+        order = result.one()
+        mark_written(order.user_id)
+        
+        if commit:
+            await session.commit()
+            order_cache.put(order)
         
         logger.info(f"✅ Order #{order.order_number} created for user {order.user_id}")
         return order
     
     @staticmethod
+    @read_only
     async def get_by_id(
         session: AsyncSession,
         order_id: int
     ) -> Optional[Order]:
-        """Get order by ID"""
-        stmt = select(Order).where(Order.order_id == order_id)
-        result = await session.execute(stmt)
-        return result.scalar_one_or_none()
+        """Get order by ID through order_cache"""
+        async def run(conditions: list) -> Optional[Order]:
+            stmt = select(Order).where(Order.order_id == order_id, *conditions)
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+        
+        return await order_cache.get(
+            "order_id", order_id, lambda: _find_order("order_id", order_id, run),
+            replica=reading_replica()
+        )
     
     @staticmethod
+    @read_only
     async def get_by_number(
         session: AsyncSession,
         order_number: int
     ) -> Optional[Order]:
-        """Get order by order number"""
-        stmt = select(Order).where(Order.order_number == order_number)
-        result = await session.execute(stmt)
-        return result.scalar_one_or_none()
+        """Get order by order number through order_cache"""
+        async def run(conditions: list) -> Optional[Order]:
+            stmt = select(Order).where(Order.order_number == order_number, *conditions)
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+        
+        return await order_cache.get(
+            "order_number", order_number, lambda: _find_order("order_number", order_number, run),
+            replica=reading_replica()
+        )
     
     @staticmethod
-    async def get_user_orders(
+    @read_only
+    async def list_user_orders(
         session: AsyncSession,
         user_id: int,
-        limit: int = 10
-    ) -> List[Order]:
-        """Get user's orders"""
+        limit: int = 10,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> OrderPage:
+        """
+        Get one page of user's orders for list views
+        
+        Keyset pagination on (created_at, order_id): every page is one
+        range scan of ix_orders_user_id_created_at_order_id, however far
+        back it is. Partitions are read newest first and only until the
+        page is full; past the first page, the cursor also prunes the
+        months on the other side of it.
+        
+        Args:
+            session: Database session
+            user_id: User's Telegram ID
+            limit: Orders per page
+            before: Cursor - get orders older than it
+            after: Cursor - get orders newer than it
+            
+        Returns:
+            Page with rows newest first and cursors of neighbour pages
+        """
+        position = tuple_(Order.created_at, Order.order_id)
         stmt = (
-            select(Order)
+            select(
+                Order.order_id,
+                Order.order_number,
+                Order.status,
+                Order.service_type,
+                Order.created_at
+            )
             .where(Order.user_id == user_id)
-            .order_by(Order.created_at.desc())
-            .limit(limit)
+            .limit(limit + 1)
         )
+        
+        cursor = after or before
+        if cursor is not None:
+            created_at, order_id = decode_order_cursor(cursor)
+            boundary = tuple_(literal(created_at, DateTime(timezone=True)), literal(order_id))
+            stmt = stmt.where(position > boundary if after else position < boundary)
+            # Row comparisons do not prune partitions, the plain one does
+            stmt = stmt.where(Order.created_at >= created_at if after else Order.created_at <= created_at)
+        if after:
+            stmt = stmt.order_by(Order.created_at, Order.order_id)
+        else:
+            stmt = stmt.order_by(Order.created_at.desc(), Order.order_id.desc())
+        
         result = await session.execute(stmt)
-        return list(result.scalars().all())
+        rows = [OrderListRow(*row) for row in result]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after:
+            rows.reverse()
+        
+        if not rows:
+            return OrderPage(rows, None, None)
+        # The page we came from is on the other side of the cursor
+        older = rows[-1].cursor if has_more or after else None
+        newer = rows[0].cursor if (has_more and after) or before else None
+        return OrderPage(rows, older, newer)
     
     @staticmethod
     async def update_status(
@@ -135,47 +474,202 @@ class OrderRepository:
         order_id: int,
         new_status: str,
         admin_id: Optional[int] = None,
-        notes: Optional[str] = None
-    ) -> Optional[Order]:
-        """Update order status with history tracking"""
-        order = await OrderRepository.get_by_id(session, order_id)
+        notes: Optional[str] = None,
+        expected_status: Optional[str] = None,
+        commit: bool = True
+    ) -> StatusChange:
+        """
+        Change order status atomically with history tracking
         
-        if not order:
-            return None
+        The status check, the update, the history row and the
+        daily_stats counters are one statement, so of two admins pressing
+        the same button only one succeeds - the other gets a CONFLICT
+        outcome.
         
-        old_status = order.status
-        order.status = new_status
+        Args:
+            session: Database session
+            order_id: Order ID
+            new_status: Target status
+            admin_id: Admin making the change (None for system)
+            notes: History notes
+            expected_status: Status the caller saw (any legal source if None)
+            commit: Commit right away (False to add more writes to the
+                same transaction - the order row stays locked until then)
+            
+        Returns:
+            StatusChange with the updated order when applied
+        """
+        sources = {
+            status for status, targets in ORDER_STATUS_TRANSITIONS.items()
+            if new_status in targets
+        }
+        if expected_status is not None:
+            sources &= {expected_status}
+        
+        if not sources:
+            return StatusChange(None, TRANSITION_ILLEGAL, expected_status)
         
         # Update timestamps based on status
-        now = datetime.now()
+        values = {"status": new_status}
         if new_status == "accepted":
-            order.accepted_at = now
-            order.accepted_by = admin_id
+            values.update(accepted_at=func.now(), accepted_by=admin_id)
         elif new_status == "in_progress":
-            order.in_progress_at = now
+            values.update(in_progress_at=func.now())
         elif new_status == "completed":
-            order.completed_at = now
-            order.completed_by = admin_id
+            values.update(completed_at=func.now(), completed_by=admin_id)
         elif new_status == "cancelled":
-            order.cancelled_at = now
-            order.cancelled_by = admin_id
+            values.update(cancelled_at=func.now(), cancelled_by=admin_id)
         
-        # Create status history record
-        history = OrderStatusHistory(
-            order_id=order_id,
-            old_status=old_status,
-            new_status=new_status,
-            changed_by=admin_id,
-            changed_by_type="admin" if admin_id else "system",
-            notes=notes
-        )
-        session.add(history)
+        def build(conditions: list) -> Select:
+            """Status change statement, conditions narrow the order lookup"""
+            # Lock the row and remember its status
+            current = (
+                select(Order.order_id, Order.status)
+                .where(Order.order_id == order_id, *conditions)
+                .with_for_update()
+                .cte("current")
+            )
+            
+            # Apply only if the locked status allows the transition
+            updated = (
+                update(Order)
+                .where(
+                    Order.order_id == current.c.order_id,
+                    current.c.status.in_(sources),
+                    *conditions
+                )
+                .values(**values)
+                .returning(*Order.__table__.c, current.c.status.label("old_status"))
+                .cte("updated")
+            )
+            
+            # Create status history record for the applied change
+            history = insert(OrderStatusHistory).from_select(
+                ["order_id", "old_status", "new_status", "changed_by", "changed_by_type", "notes"],
+                select(
+                    updated.c.order_id,
+                    updated.c.old_status,
+                    literal(new_status),
+                    literal(admin_id, BigInteger),
+                    literal("admin" if admin_id else "system"),
+                    literal(notes, Text)
+                )
+            ).cte("history")
+            
+            updated_order = aliased(Order, updated)
+            stmt = (
+                select(current.c.status, updated_order)
+                .select_from(current)
+                .outerjoin(updated, true())
+                .add_cte(history)
+            )
+            
+            # Count the applied change for the admin making it
+            counters = {
+                "accepted": [literal(1).label("accepted_orders")],
+                "completed": [
+                    literal(1).label("completed_orders"),
+                    func.coalesce(updated.c.final_cost, 0).label("total_revenue")
+                ],
+                "cancelled": [literal(1).label("cancelled_orders")]
+            }.get(new_status)
+            if counters:
+                stats = _daily_stats_upsert(
+                    select(
+                        func.current_date().label("stat_date"),
+                        updated.c.service_type,
+                        literal(admin_id or 0, BigInteger).label("admin_id"),
+                        *counters
+                    )
+                ).cte("stats")
+                stmt = stmt.add_cte(stats)
+            return stmt
         
-        await session.commit()
-        await session.refresh(order)
+        async def run(conditions: list) -> Optional[Row]:
+            result = await session.execute(build(conditions))
+            return result.one_or_none()
         
-        logger.info(f"✅ Order #{order.order_number} status: {old_status} → {new_status}")
-        return order
+        row = await _find_order("order_id", order_id, run)
+        if commit:
+            await session.commit()
+        
+        # Cached copy is stale whatever the outcome: applied now, or
+        # changed by someone else when the transition was rejected
+        if row is not None and row[1] is not None and commit:
+            order_cache.put(row[1])
+        elif commit:
+            order_cache.invalidate(order_id)
+        else:
+            order_cache.invalidate_on_commit(session, order_id)
+        
+        if row is None:
+            return StatusChange(None, TRANSITION_NOT_FOUND, None)
+        
+        current_status, order = row
+        if order is None:
+            if expected_status is not None and current_status != expected_status:
+                outcome = TRANSITION_CONFLICT
+            else:
+                outcome = TRANSITION_ILLEGAL
+            logger.warning(
+                f"Order {order_id} status {current_status} → {new_status} rejected: {outcome}"
+            )
+            return StatusChange(None, outcome, current_status)
+        
+        mark_written(order.user_id)
+        logger.info(f"✅ Order #{order.order_number} status: {current_status} → {new_status}")
+        return StatusChange(order, TRANSITION_APPLIED, new_status)
+    
+    @staticmethod
+    def _feedback_statement(
+        condition,
+        rating: int,
+        comment: Optional[str],
+        conditions: list
+    ) -> Select:
+        """
+        Statement saving feedback and adding it to daily_stats
+        
+        A repeated rating replaces the earlier one in the rollup, it is
+        credited to the operator who accepted the order.
+        
+        Args:
+            condition: WHERE clause selecting one order
+            rating: Rating 1-5
+            comment: Optional feedback text
+            conditions: Extra WHERE conditions narrowing the lookup
+            
+        Returns:
+            SELECT of the updated order
+        """
+        # Lock the row and remember the rating it had
+        previous = (
+            select(Order.order_id, Order.rating)
+            .where(condition, *conditions)
+            .with_for_update()
+            .cte("previous")
+        )
+        updated = (
+            update(Order)
+            .where(Order.order_id == previous.c.order_id, *conditions)
+            .values(
+                rating=rating,
+                feedback_comment=comment,
+                feedback_at=func.now()
+            )
+            .returning(*Order.__table__.c, previous.c.rating.label("old_rating"))
+            .cte("updated")
+        )
+        stats = _daily_stats_upsert(
+            select(
+                func.current_date().label("stat_date"),
+                updated.c.service_type,
+                func.coalesce(updated.c.accepted_by, 0).label("admin_id"),
+                (updated.c.rating - func.coalesce(updated.c.old_rating, 0)).label("rating_sum"),
+                case((updated.c.old_rating.is_(None), 1), else_=0).label("rating_count")
+            )
+        ).cte("stats")
+        return select(aliased(Order, updated)).add_cte(stats)
     
     @staticmethod
     async def save_feedback(
@@ -185,16 +679,249 @@ class OrderRepository:
         comment: Optional[str] = None
     ) -> bool:
         """Save customer feedback"""
+        async def run(conditions: list) -> Optional[Order]:
+            stmt = OrderRepository._feedback_statement(
+                Order.order_id == order_id, rating, comment, conditions
+            )
+            result = await session.scalars(stmt)
+            return result.one_or_none()
+        
+        saved = await _find_order("order_id", order_id, run) is not None
+        await session.commit()
+        order_cache.invalidate(order_id)
+        mark_written()
+        
+        return saved
+    
+    @staticmethod
+    async def save_feedback_by_number(
+        session: AsyncSession,
+        order_number: int,
+        rating: int,
+        comment: Optional[str] = None
+    ) -> Optional[Order]:
+        """
+        Save customer feedback in one statement
+        
+        Args:
+            session: Database session
+            order_number: Customer-facing order number
+            rating: Rating 1-5
+            comment: Optional feedback text
+            
+        Returns:
+            Updated order or None if not found
+        """
+        async def run(conditions: list) -> Optional[Order]:
+            stmt = OrderRepository._feedback_statement(
+                Order.order_number == order_number, rating, comment, conditions
+            )
+            result = await session.scalars(
+                stmt,
+                execution_options={"populate_existing": True}
+            )
+            return result.one_or_none()
+        
+        order = await _find_order("order_number", order_number, run)
+        await session.commit()
+        if order is not None:
+            order_cache.put(order)
+            mark_written(order.user_id)
+        
+        return order
+
+
+class OutboxRepository:
+    """Notification outbox operations"""
+    
+    @staticmethod
+    async def add(
+        session: AsyncSession,
+        kind: str,
+        idempotency_key: str,
+        payload: dict
+    ) -> None:
+        """
+        Queue notification in the caller's transaction (does not commit)
+        
+        A message with the same idempotency key is queued only once.
+        
+        Args:
+            session: Database session
+            kind: Notification type
+            idempotency_key: Unique key of this notification
+            payload: Data needed to build the notification
+        """
+        stmt = insert(OutboxMessage).values(
+            kind=kind,
+            idempotency_key=idempotency_key,
+            payload=payload
+        ).on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+        await session.execute(stmt)
+    
+    @staticmethod
+    async def claim_due(
+        session: AsyncSession,
+        limit: int,
+        lease_seconds: float
+    ) -> List[OutboxMessage]:
+        """
+        Take due messages for delivery
+        
+        Claimed messages count an attempt and are hidden from other
+        dispatchers for lease_seconds - if this process dies before
+        reporting the result, they are delivered again after that.
+        
+        Args:
+            session: Database session
+            limit: Max messages to take
+            lease_seconds: Time to deliver them
+            
+        Returns:
+            Claimed messages, oldest first
+        """
+        due = (
+            select(OutboxMessage.id)
+            .where(
+                OutboxMessage.status == "pending",
+                OutboxMessage.next_attempt_at <= func.now()
+            )
+            .order_by(OutboxMessage.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
         stmt = (
-            update(Order)
-            .where(Order.order_id == order_id)
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
             .values(
-                rating=rating,
-                feedback_comment=comment,
-                feedback_at=datetime.now()
+                attempts=OutboxMessage.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds)
+            )
+            .returning(OutboxMessage)
+        )
+        result = await session.scalars(
+            stmt,
+            execution_options={"populate_existing": True}
+        )
+        messages = sorted(result.all(), key=lambda message: message.id)
+        await session.commit()
+        
+        return messages
+    
+    @staticmethod
+    async def mark_sent(session: AsyncSession, message_ids: Iterable[int]) -> None:
+        """Mark messages as delivered"""
+        stmt = (
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(list(message_ids)))
+            .values(status="sent", sent_at=func.now(), last_error=None)
+        )
+        await session.execute(stmt)
+        await session.commit()
+    
+    @staticmethod
+    async def mark_failed(
+        session: AsyncSession,
+        message_id: int,
+        error: str,
+        retry_in: Optional[float],
+        payload: Optional[dict] = None
+    ) -> None:
+        """
+        Record failed delivery attempt
+        
+        Args:
+            session: Database session
+            message_id: Outbox message ID
+            error: Error description
+            retry_in: Seconds until next attempt (None moves the message
+                to the dead-letter state)
+            payload: Replacement payload, e.g. with recipients left to reach
+        """
+        values = {"last_error": error[:1000]}
+        if retry_in is None:
+            values["status"] = "dead"
+        else:
+            values["next_attempt_at"] = func.now() + timedelta(seconds=retry_in)
+        if payload is not None:
+            values["payload"] = payload
+        
+        stmt = update(OutboxMessage).where(OutboxMessage.id == message_id).values(**values)
+        await session.execute(stmt)
+        await session.commit()
+    
+    @staticmethod
+    async def get_stats(session: AsyncSession) -> dict:
+        """
+        Get outbox backlog statistics
+        
+        Returns:
+            Dictionary with pending and dead message counts and the age
+            of the oldest pending message in seconds
+        """
+        stmt = select(
+            func.count().filter(OutboxMessage.status == "pending"),
+            func.count().filter(OutboxMessage.status == "dead"),
+            func.extract(
+                "epoch",
+                func.now() - func.min(OutboxMessage.created_at).filter(
+                    OutboxMessage.status == "pending"
+                )
             )
+        ).where(OutboxMessage.status != "sent")
+        pending, dead, oldest = (await session.execute(stmt)).one()
+        
+        return {
+            "pending": pending,
+            "dead": dead,
+            "oldest_pending_seconds": float(oldest or 0)
+        }
+    
+    @staticmethod
+    async def purge_sent(session: AsyncSession, older_than: timedelta) -> int:
+        """
+        Delete delivered messages
+        
+        Args:
+            session: Database session
+            older_than: Keep messages delivered more recently than this
+            
+        Returns:
+            Number of deleted messages
+        """
+        stmt = delete(OutboxMessage).where(
+            OutboxMessage.status == "sent",
+            OutboxMessage.sent_at < func.now() - older_than
         )
         result = await session.execute(stmt)
         await session.commit()
         
-        return result.rowcount > 0
+        return result.rowcount
+
+
+class StatsRepository:
+    """Statistics queries, served from daily_stats rollups only"""
+    
+    @staticmethod
+    @read_only
+    async def get_daily(
+        session: AsyncSession,
+        since: date
+    ) -> List[Tuple[DailyStat, Optional[str]]]:
+        """
+        Get rollup rows from a day on
+        
+        Args:
+            session: Database session
+            since: First day to include
+            
+        Returns:
+            Rows with the operator's name (None if unknown or no operator)
+        """
+        stmt = (
+            select(DailyStat, Admin.full_name)
+            .outerjoin(Admin, Admin.admin_id == DailyStat.admin_id)
+            .where(DailyStat.stat_date >= since)
+        )
+        result = await session.execute(stmt)
+        return [tuple(row) for row in result.all()]
@@ -30,7 +30,7 @@ async def show_address_request(callback, state: FSMContext):
     message_text = get_text(language, 'enter_address')
     keyboard = get_address_keyboard(language)
     
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         message_text,
@@ -51,7 +51,14 @@ async def callback_address_manual(callback: CallbackQuery, state: FSMContext):
     
     prompt = get_text(language, 'address_manual_prompt')
     
-    await callback.message.edit_text(prompt, parse_mode='HTML')
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
+        prompt,
+        parse_mode='HTML'
+    )
     await state.set_state(OrderStates.waiting_address_text)
 
 
@@ -84,10 +91,7 @@ async def handle_address_text(message: Message, state: FSMContext):
     
     logger.info(f"User {message.from_user.id} entered manual address")
     
-    # Delete prompt
-    await message_manager.delete_last_message(message.bot, message.chat.id)
-    
-    # Proceed to name collection
+    # Proceed to name collection in place of the prompt
     from handlers.customer_info import show_name_request
     
     fake_callback = type('obj', (object,), {
@@ -108,21 +112,20 @@ async def callback_address_location(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    # Delete inline keyboard message
-    await message_manager.delete_message(callback.message)
+    # Reply keyboards cannot be edited in, so the request replaces this message
+    await message_manager.track(callback.message)
     
     # Send location request with reply keyboard
     prompt = get_text(language, 'location_request')
     keyboard = get_location_keyboard(language)
     
-    msg = await callback.bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=prompt,
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
+        prompt,
         reply_markup=keyboard
     )
     
-    # Store message ID
-    await state.update_data(location_request_message_id=msg.message_id)
     await state.set_state(OrderStates.waiting_location)
 
 
@@ -154,22 +157,11 @@ async def handle_location(message: Message, state: FSMContext):
         reply_markup=ReplyKeyboardRemove()
     )
     
-    # Delete location request message
-    location_msg_id = data.get('location_request_message_id')
-    if location_msg_id:
-        try:
-            await message.bot.delete_message(
-                chat_id=message.chat.id,
-                message_id=location_msg_id
-            )
-        except:
-            pass
-    
     # Small delay
     import asyncio
     await asyncio.sleep(0.5)
     
-    # Proceed to name
+    # Proceed to name, replacing the location request
     from handlers.customer_info import show_name_request
     
     fake_callback = type('obj', (object,), {
@@ -199,19 +191,7 @@ async def handle_cancel_location(message: Message, state: FSMContext):
             reply_markup=ReplyKeyboardRemove()
         )
         
-        # Delete location request
-        data = await state.get_data()
-        location_msg_id = data.get('location_request_message_id')
-        if location_msg_id:
-            try:
-                await message.bot.delete_message(
-                    chat_id=message.chat.id,
-                    message_id=location_msg_id
-                )
-            except:
-                pass
-        
-        # Show address selection again
+        # Show address selection again, replacing the location request
         fake_callback = type('obj', (object,), {
             'message': message,
             'from_user': message.from_user,
@@ -237,8 +217,8 @@ async def callback_back_to_sizes(callback: CallbackQuery, state: FSMContext):
     
     await state.update_data(order_data=order_data)
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Go back to last size
     total_quantity = order_data.get('quantity', 1)
@@ -5,20 +5,28 @@ Handles all admin operations for order management
 """
 
 from aiogram import Router, F
+from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.repository import OrderRepository
+from database.repository import (
+    OrderRepository,
+    OutboxRepository,
+    StatusChange,
+    TRANSITION_NOT_FOUND
+)
 from keyboards.inline import (
     get_admin_accepted_keyboard,
     get_admin_in_progress_keyboard
 )
-from services.admin_notifications import (
-    notify_customer_order_accepted,
-    notify_customer_order_in_progress,
-    notify_customer_order_completed
+from services.outbox import (
+    outbox_dispatcher,
+    NOTIFY_CUSTOMER_ACCEPTED,
+    NOTIFY_CUSTOMER_IN_PROGRESS,
+    NOTIFY_CUSTOMER_COMPLETED
 )
+from services.stats_report import stats_report
 from config import settings
 from datetime import datetime
 
@@ -34,6 +42,44 @@ def is_admin(user_id: int) -> bool:
     return user_id in settings.admin_ids
 
 
+def status_change_error(change: StatusChange) -> str:
+    """Alert text for a status change that was not applied"""
+    if change.outcome == TRANSITION_NOT_FOUND:
+        return "❌ Заказ не найден"
+    return f"⚠️ Заказ уже обработан (текущий статус: {change.current_status})"
+
+
+async def commit_with_notification(
+    session: AsyncSession,
+    change: StatusChange,
+    kind: str,
+    payload: dict
+) -> None:
+    """
+    Queue customer notification and commit it with the status change
+    
+    Args:
+        session: Session holding the uncommitted status change
+        change: Applied status change
+        kind: Outbox notification kind
+        payload: Notification arguments
+    """
+    order = change.order
+    await OutboxRepository.add(
+        session,
+        kind,
+        f"order:{order.order_id}:{order.status}",
+        {
+            "user_id": order.user_id,
+            "order_number": order.order_number,
+            "language": order.language,
+            **payload
+        }
+    )
+    await session.commit()
+    outbox_dispatcher.wake()
+
+
 @router.callback_query(F.data.startswith("admin_accept_"))
 async def callback_admin_accept_order(
     callback: CallbackQuery,
@@ -46,26 +92,35 @@ async def callback_admin_accept_order(
         await callback.answer("❌ У вас нет прав администратора", show_alert=True)
         return
     
-    await callback.answer()
-    
     # Extract order ID
     order_id = int(callback.data.split('_')[2])
     admin_id = callback.from_user.id
     admin_name = callback.from_user.first_name or "Админ"
     
-    # Update order status
-    order = await OrderRepository.update_status(
+    # Update order status (only one admin wins a simultaneous click)
+    change = await OrderRepository.update_status(
         session,
         order_id,
         'accepted',
         admin_id=admin_id,
-        notes=f"Accepted by {admin_name}"
+        notes=f"Accepted by {admin_name}",
+        expected_status='pending',
+        commit=False
     )
     
-    if not order:
-        await callback.answer("❌ Заказ не найден", show_alert=True)
+    if not change.applied:
+        await callback.answer(status_change_error(change), show_alert=True)
         return
     
+    # Customer is notified by the outbox dispatcher
+    await commit_with_notification(
+        session, change, NOTIFY_CUSTOMER_ACCEPTED,
+        {"admin_name": admin_name, "accepted_at": change.order.accepted_at.isoformat()}
+    )
+    
+    await callback.answer()
+    order = change.order
+    
     logger.info(f"✅ Admin {admin_id} accepted order #{order.order_number}")
     
     # Update admin's message
@@ -79,15 +134,6 @@ async def callback_admin_accept_order(
         reply_markup=keyboard,
         parse_mode='HTML'
     )
-    
-    # Notify customer
-    await notify_customer_order_accepted(
-        bot=callback.bot,
-        user_id=order.user_id,
-        order_number=order.order_number,
-        admin_name=admin_name,
-        language=order.language
-    )
 
 
 @router.callback_query(F.data.startswith("admin_reject_"))
@@ -146,25 +192,31 @@ async def callback_admin_start_order(
         await callback.answer("❌ У вас нет прав администратора", show_alert=True)
         return
     
-    await callback.answer()
-    
     order_id = int(callback.data.split('_')[2])
     admin_id = callback.from_user.id
     admin_name = callback.from_user.first_name or "Админ"
     
-    # Update order status
-    order = await OrderRepository.update_status(
+    # Update order status (only one admin wins a simultaneous click)
+    change = await OrderRepository.update_status(
         session,
         order_id,
         'in_progress',
         admin_id=admin_id,
-        notes=f"Started by {admin_name}"
+        notes=f"Started by {admin_name}",
+        expected_status='accepted',
+        commit=False
     )
     
-    if not order:
-        await callback.answer("❌ Заказ не найден", show_alert=True)
+    if not change.applied:
+        await callback.answer(status_change_error(change), show_alert=True)
         return
     
+    # Customer is notified by the outbox dispatcher
+    await commit_with_notification(session, change, NOTIFY_CUSTOMER_IN_PROGRESS, {})
+    
+    await callback.answer()
+    order = change.order
+    
     logger.info(f"✅ Admin {admin_id} started order #{order.order_number}")
     
     # Update message
@@ -178,14 +230,6 @@ async def callback_admin_start_order(
         reply_markup=keyboard,
         parse_mode='HTML'
     )
-    
-    # Notify customer
-    await notify_customer_order_in_progress(
-        bot=callback.bot,
-        user_id=order.user_id,
-        order_number=order.order_number,
-        language=order.language
-    )
 
 
 @router.callback_query(F.data.startswith("admin_complete_"))
@@ -200,25 +244,31 @@ async def callback_admin_complete_order(
         await callback.answer("❌ У вас нет прав администратора", show_alert=True)
         return
     
-    await callback.answer()
-    
     order_id = int(callback.data.split('_')[2])
     admin_id = callback.from_user.id
     admin_name = callback.from_user.first_name or "Админ"
     
-    # Update order status
-    order = await OrderRepository.update_status(
+    # Update order status (only one admin wins a simultaneous click)
+    change = await OrderRepository.update_status(
         session,
         order_id,
         'completed',
         admin_id=admin_id,
-        notes=f"Completed by {admin_name}"
+        notes=f"Completed by {admin_name}",
+        expected_status='in_progress',
+        commit=False
     )
     
-    if not order:
-        await callback.answer("❌ Заказ не найден", show_alert=True)
+    if not change.applied:
+        await callback.answer(status_change_error(change), show_alert=True)
         return
     
+    # Customer is notified by the outbox dispatcher
+    await commit_with_notification(session, change, NOTIFY_CUSTOMER_COMPLETED, {})
+    
+    await callback.answer()
+    order = change.order
+    
     logger.info(f"✅ Admin {admin_id} completed order #{order.order_number}")
     
     # Update message
@@ -229,11 +279,16 @@ async def callback_admin_complete_order(
         updated_message,
         parse_mode='HTML'
     )
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message, session: AsyncSession):
+    """Show order statistics from the daily rollups"""
     
-    # Notify customer and request feedback
-    await notify_customer_order_completed(
-        bot=callback.bot,
-        user_id=order.user_id,
-        order_number=order.order_number,
-        language=order.language
-    )
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав администратора")
+        return
+    
+    # Served from memory for STATS_CACHE_TTL seconds
+    text = await stats_report.render(session)
+    await message.answer(text, parse_mode='HTML')
@@ -30,7 +30,7 @@ async def show_name_request(callback, state: FSMContext):
     
     message_text = get_text(language, 'enter_name')
     
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         message_text,
@@ -65,10 +65,7 @@ async def handle_name_input(message: Message, state: FSMContext):
     
     logger.info(f"User {message.from_user.id} entered name: {name_text}")
     
-    # Delete name prompt
-    await message_manager.delete_last_message(message.bot, message.chat.id)
-    
-    # Proceed to phone
+    # Proceed to phone, replacing the name prompt
     await show_phone_request(message, state)
 
 
@@ -81,15 +78,15 @@ async def show_phone_request(message: Message, state: FSMContext):
     message_text = get_text(language, 'enter_phone')
     keyboard = get_contact_keyboard(language)
     
-    msg = await message.bot.send_message(
-        chat_id=message.chat.id,
-        text=message_text,
+    # Reply keyboards cannot be edited in, so this is always a new message
+    await message_manager.render(
+        message.bot,
+        message.chat.id,
+        message_text,
         reply_markup=keyboard,
         parse_mode='HTML'
     )
     
-    # Store message ID
-    await state.update_data(phone_request_message_id=msg.message_id)
     await state.set_state(OrderStates.waiting_phone)
 
 
@@ -126,7 +123,7 @@ async def handle_phone_text(message: Message, state: FSMContext):
     
     # Check if user clicked "Enter manually"
     if "Ввести вручную" in phone_text or "Qo'lda kiritish" in phone_text:
-        await message.delete()
+        await message_manager.delete_message(message)
         
         data = await state.get_data()
         language = data.get('language', 'ru')
@@ -163,24 +160,6 @@ async def store_phone_and_proceed(message: Message, state: FSMContext, phone: st
     
     logger.info(f"User {message.from_user.id} entered phone: {phone}")
     
-    # Remove keyboard
-    await message.bot.send_message(
-        chat_id=message.chat.id,
-        text="✅",
-        reply_markup=ReplyKeyboardRemove()
-    )
-    
-    # Delete phone request message
-    phone_msg_id = data.get('phone_request_message_id')
-    if phone_msg_id:
-        try:
-            await message.bot.delete_message(
-                chat_id=message.chat.id,
-                message_id=phone_msg_id
-            )
-        except:
-            pass
-    
     # Show thank you and proceed
     await show_thank_you_and_proceed(message, state)
 
@@ -194,22 +173,20 @@ async def show_thank_you_and_proceed(message: Message, state: FSMContext):
     # Get thank you text
     thank_you_text = get_text(language, 'thank_you')
     
-    # Send and auto-delete
+    # Send and auto-delete, removing the contact keyboard with it
     msg = await message.bot.send_message(
         chat_id=message.chat.id,
-        text=thank_you_text
+        text=thank_you_text,
+        reply_markup=ReplyKeyboardRemove()
     )
     
     # Wait 1.5 seconds
     await asyncio.sleep(1.5)
     
     # Delete thank you
-    try:
-        await msg.delete()
-    except:
-        pass
+    await message_manager.delete_message(msg)
     
-    # Show order summary
+    # Show order summary, replacing the phone request
     from handlers.order_summary import show_order_summary
     await show_order_summary(message, state)
 
@@ -227,8 +204,8 @@ async def callback_back_to_address(callback: CallbackQuery, state: FSMContext):
     
     await state.update_data(order_data=order_data)
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show address request
     from handlers.address import show_address_request
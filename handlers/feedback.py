@@ -59,7 +59,11 @@ async def callback_rating_selection(callback: CallbackQuery, state: FSMContext):
     message_text = get_text(language, 'feedback_thanks', stars=stars)
     keyboard = get_feedback_keyboard(order_number, language)
     
-    await callback.message.edit_text(
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
         message_text,
         reply_markup=keyboard,
         parse_mode='HTML'
@@ -79,7 +83,9 @@ async def callback_write_feedback(callback: CallbackQuery, state: FSMContext):
     
     prompt = get_text(language, 'write_feedback_prompt')
     
-    await callback.message.edit_text(prompt)
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(callback.bot, callback.message.chat.id, prompt)
     await state.set_state(FeedbackStates.waiting_feedback_comment)
 
 
@@ -116,35 +122,29 @@ async def handle_feedback_comment(
     rating = pending['rating']
     
     # Save to database
-    order = await OrderRepository.get_by_number(session, order_number)
+    order = await OrderRepository.save_feedback_by_number(
+        session,
+        order_number,
+        rating,
+        comment_text
+    )
     
     if order:
-        success = await OrderRepository.save_feedback(
-            session,
-            str(order.order_id),
-            rating,
-            comment_text
-        )
+        logger.info(f"✅ Saved feedback for order #{order_number}")
         
-        if success:
-            logger.info(f"✅ Saved feedback for order #{order_number}")
-            
-            # Notify admins
-            user = message.from_user
-            await notify_admins_feedback_received(
-                bot=message.bot,
-                order_number=order_number,
-                user_id=user.id,
-                username=user.username or "no_username",
-                customer_name=order.customer_name,
-                rating=rating,
-                comment=comment_text
-            )
-    
-    # Delete prompt
-    await message_manager.delete_last_message(message.bot, message.chat.id)
+        # Notify admins
+        user = message.from_user
+        await notify_admins_feedback_received(
+            bot=message.bot,
+            order_number=order_number,
+            user_id=user.id,
+            username=user.username or "no_username",
+            customer_name=order.customer_name,
+            rating=rating,
+            comment=comment_text
+        )
     
-    # Show thank you
+    # Show thank you in place of the prompt
     await show_feedback_thank_you(message, state)
 
 
@@ -169,16 +169,14 @@ async def callback_skip_comment(
     rating = pending['rating']
     
     # Save without comment
-    order = await OrderRepository.get_by_number(session, order_number)
+    order = await OrderRepository.save_feedback_by_number(
+        session,
+        order_number,
+        rating,
+        None
+    )
     
     if order:
-        await OrderRepository.save_feedback(
-            session,
-            str(order.order_id),
-            rating,
-            None
-        )
-        
         # Notify admins
         user = callback.from_user
         await notify_admins_feedback_received(
@@ -191,8 +189,8 @@ async def callback_skip_comment(
             comment=""
         )
     
-    # Delete message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show thank you
     fake_msg = type('obj', (object,), {
@@ -213,7 +211,8 @@ async def callback_skip_rating(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     if language == 'ru':
         text = "Спасибо! Будем рады видеть вас снова! ❤️"
@@ -223,11 +222,13 @@ async def callback_skip_rating(callback: CallbackQuery, state: FSMContext):
     from keyboards.inline import get_confirmation_keyboard
     keyboard = get_confirmation_keyboard(language)
     
-    await callback.bot.send_message(
-        chat_id=callback.message.chat.id,
-        text=text,
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
+        text,
         reply_markup=keyboard
     )
+    await message_manager.forget(callback.bot, callback.message.chat.id)
 
 
 async def show_feedback_thank_you(message: Message, state: FSMContext):
@@ -241,12 +242,14 @@ async def show_feedback_thank_you(message: Message, state: FSMContext):
     from keyboards.inline import get_confirmation_keyboard
     keyboard = get_confirmation_keyboard(language)
     
-    await message.bot.send_message(
-        chat_id=message.chat.id,
-        text=message_text,
+    await message_manager.render(
+        message.bot,
+        message.chat.id,
+        message_text,
         reply_markup=keyboard,
         parse_mode='HTML'
     )
+    await message_manager.forget(message.bot, message.chat.id)
     
     # Clear pending feedback
     await state.update_data(pending_feedback=None)
\ No newline at end of file
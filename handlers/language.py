@@ -7,11 +7,10 @@ Handles language preference selection
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.repository import UserRepository
 from keyboards.inline import get_service_keyboard, get_language_keyboard
 from services.message_manager import message_manager
+from services.user_buffer import user_buffer
 from localization.translations import get_text
 from utils.states import OrderStates
 
@@ -23,11 +22,7 @@ router = Router()
 
 
 @router.callback_query(F.data.startswith("lang_"))
-async def callback_language_selection(
-    callback: CallbackQuery,
-    state: FSMContext,
-    session: AsyncSession
-):
+async def callback_language_selection(callback: CallbackQuery, state: FSMContext):
     """
     Handle language selection callback
     
@@ -45,21 +40,13 @@ async def callback_language_selection(
     # Store language in state
     await state.update_data(language=language)
     
-    # Create or update user in database
-    user = callback.from_user
-    await UserRepository.create_or_update(
-        session=session,
-        user_id=user.id,
-        username=user.username,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        language=language
-    )
+    # Create or update user in database (written in background)
+    user_buffer.update_profile(callback.from_user, language)
     
-    logger.info(f"User {user.id} selected language: {language}")
+    logger.info(f"User {callback.from_user.id} selected language: {language}")
     
-    # Delete language selection message
-    await message_manager.delete_message(callback.message)
+    # Render next step into the language selection message
+    await message_manager.track(callback.message)
     
     # Show service selection
     await show_service_selection(callback, state)
@@ -71,11 +58,11 @@ async def callback_back_to_language(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer()
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show language selection
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         "Выберите язык / Tilni tanlang 🌐",
@@ -94,7 +81,7 @@ async def show_service_selection(callback: CallbackQuery, state: FSMContext):
     message_text = get_text(language, 'choose_service')
     keyboard = get_service_keyboard(language)
     
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         message_text,
@@ -4,6 +4,7 @@ My Orders Handler
 Displays user's order history and individual order details
 """
 
+from typing import Optional
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
@@ -26,11 +27,15 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
+# Orders per /myorders page
+PAGE_SIZE = 10
+
+
 @router.message(Command("myorders"))
 async def cmd_my_orders(message: Message, state: FSMContext, session: AsyncSession):
     """Handle /myorders command"""
     
-    await show_my_orders(message, state, session)
+    await show_my_orders(message, state, session, message.from_user.id)
 
 
 @router.callback_query(F.data == "my_orders")
@@ -42,24 +47,56 @@ async def callback_my_orders(
     """Handle my orders button callback"""
     
     await callback.answer()
-    await show_my_orders(callback.message, state, session, edit=True)
+    await show_my_orders(callback.message, state, session, callback.from_user.id, edit=True)
+
+
+@router.callback_query(F.data.regexp(r"^my_orders:[on]:[0-9a-f]+\.[0-9a-f]+$"))
+async def callback_my_orders_page(
+    callback: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession
+):
+    """
+    Handle older/newer page buttons
+    
+    Callback data: my_orders:o:<cursor> (older) or my_orders:n:<cursor> (newer)
+    """
+    await callback.answer()
+    
+    _, direction, cursor = callback.data.split(':')
+    await show_my_orders(
+        callback.message,
+        state,
+        session,
+        callback.from_user.id,
+        edit=True,
+        before=cursor if direction == 'o' else None,
+        after=cursor if direction == 'n' else None
+    )
 
 
 async def show_my_orders(
     message: Message,
     state: FSMContext,
     session: AsyncSession,
-    edit: bool = False
+    user_id: int,
+    edit: bool = False,
+    before: Optional[str] = None,
+    after: Optional[str] = None
 ):
-    """Display user's order history"""
-    
-    user_id = message.from_user.id if hasattr(message, 'from_user') else message.chat.id
+    """Display one page of user's order history"""
     
     data = await state.get_data()
     language = data.get('language', 'ru')
     
-    # Get user's orders
-    orders = await OrderRepository.get_user_orders(session, user_id, limit=10)
+    # Get user's orders (list columns only)
+    page = await OrderRepository.list_user_orders(
+        session, user_id, limit=PAGE_SIZE, before=before, after=after
+    )
+    if not page.rows and (before or after):
+        # Orders around the cursor are gone, start over
+        page = await OrderRepository.list_user_orders(session, user_id, limit=PAGE_SIZE)
+    orders = page.rows
     
     if not orders:
         # No orders
@@ -105,6 +142,21 @@ async def show_my_orders(
             callback_data=f"view_order_{order.order_id}"
         ))
     
+    # Add page buttons
+    page_buttons = []
+    if page.newer:
+        page_buttons.append(InlineKeyboardButton(
+            text="⬅️ Новые" if language == 'ru' else "⬅️ Yangilari",
+            callback_data=f"my_orders:n:{page.newer}"
+        ))
+    if page.older:
+        page_buttons.append(InlineKeyboardButton(
+            text="Старые ➡️" if language == 'ru' else "Eskilari ➡️",
+            callback_data=f"my_orders:o:{page.older}"
+        ))
+    if page_buttons:
+        builder.row(*page_buttons)
+    
     # Add navigation buttons
     if language == 'ru':
         builder.row(
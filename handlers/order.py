@@ -41,7 +41,7 @@ async def show_quantity_selection(callback: CallbackQuery, state: FSMContext):
     
     keyboard = get_quantity_keyboard(language)
     
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         message_text,
@@ -65,7 +65,9 @@ async def callback_quantity_selection(callback: CallbackQuery, state: FSMContext
         # Ask for custom quantity
         prompt = get_text(language, 'enter_custom_quantity')
         
-        await callback.message.edit_text(prompt)
+        # Show next step in this message
+        await message_manager.track(callback.message)
+        await message_manager.render(callback.bot, callback.message.chat.id, prompt)
         await state.set_state(OrderStates.waiting_custom_quantity)
         return
     
@@ -85,8 +87,8 @@ async def callback_quantity_selection(callback: CallbackQuery, state: FSMContext
     
     logger.info(f"User {callback.from_user.id} selected quantity: {quantity}")
     
-    # Delete quantity message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show size selection for first item
     await show_size_selection(callback, state)
@@ -115,11 +117,7 @@ async def handle_custom_quantity(message: Message, state: FSMContext):
     order_data['items'] = []
     await state.update_data(order_data=order_data, current_item_index=0)
     
-    # Delete prompt message (stored in message_manager)
-    await message_manager.delete_last_message(message.bot, message.chat.id)
-    
-    # Show size selection
-    from aiogram.types import CallbackQuery as FakeCallback
+    # Show size selection in place of the prompt
     fake_callback = type('obj', (object,), {
         'message': message,
         'from_user': message.from_user,
@@ -161,7 +159,7 @@ async def show_size_selection(callback, state: FSMContext):
         )
         keyboard = get_sofa_type_keyboard(current_index, language)
     
-    await message_manager.send_and_store(
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         message_text,
@@ -189,7 +187,8 @@ async def callback_size_selection(callback: CallbackQuery, state: FSMContext):
     # Handle custom size
     if size_type == 'custom':
         prompt = get_text(language, 'enter_custom_size')
-        await callback.message.edit_text(prompt)
+        await message_manager.track(callback.message)
+        await message_manager.render(callback.bot, callback.message.chat.id, prompt)
         
         await state.update_data(custom_size_index=item_index)
         await state.set_state(OrderStates.waiting_custom_size)
@@ -230,8 +229,8 @@ async def callback_size_selection(callback: CallbackQuery, state: FSMContext):
     
     logger.info(f"Item {item_index + 1} size selected: {size_type}")
     
-    # Delete size message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Check if more items need sizing
     current_index = data.get('current_item_index', 0)
@@ -284,10 +283,7 @@ async def handle_custom_size(message: Message, state: FSMContext):
     
     await state.update_data(order_data=order_data)
     
-    # Delete prompt
-    await message_manager.delete_last_message(message.bot, message.chat.id)
-    
-    # Continue to next item or address
+    # Continue to next item or address in place of the prompt
     current_index = data.get('current_item_index', 0)
     total_quantity = order_data.get('quantity', 1)
     
@@ -317,8 +313,8 @@ async def callback_back_to_quantity(callback: CallbackQuery, state: FSMContext):
     order_data['items'] = []
     await state.update_data(order_data=order_data, current_item_index=0)
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show quantity selection
     await show_quantity_selection(callback, state)
\ No newline at end of file
@@ -9,14 +9,15 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.repository import OrderRepository
+from database.repository import OrderRepository, OutboxRepository
 from keyboards.inline import (
     get_order_summary_keyboard,
     get_edit_menu_keyboard,
     get_confirmation_keyboard
 )
 from services.message_manager import message_manager
-from services.admin_notifications import notify_admins_new_order
+from services.outbox import outbox_dispatcher, NOTIFY_ADMINS_NEW_ORDER
+from services.user_buffer import user_buffer
 from localization.translations import get_text
 from utils.formatters import format_order_summary
 from utils.pricing import calculate_carpet_cost, calculate_sofa_cost
@@ -57,8 +58,8 @@ async def show_order_summary(message: Message, state: FSMContext):
     # Get keyboard
     keyboard = get_order_summary_keyboard(language)
     
-    # Send summary
-    await message_manager.send_and_store(
+    # Show summary
+    await message_manager.render(
         message.bot,
         message.chat.id,
         summary_text,
@@ -80,7 +81,14 @@ async def callback_add_comment(callback: CallbackQuery, state: FSMContext):
     
     prompt = get_text(language, 'comment_prompt')
     
-    await callback.message.edit_text(prompt, parse_mode='HTML')
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
+        prompt,
+        parse_mode='HTML'
+    )
     await state.set_state(OrderStates.waiting_comment)
 
 
@@ -109,10 +117,7 @@ async def handle_comment_input(message: Message, state: FSMContext):
     
     logger.info(f"User {message.from_user.id} added comment")
     
-    # Delete prompt
-    await message_manager.delete_last_message(message.bot, message.chat.id)
-    
-    # Show updated summary
+    # Show updated summary in place of the prompt
     await show_order_summary(message, state)
 
 
@@ -154,8 +159,24 @@ async def callback_confirm_order(
     }
     
     try:
-        # Save order to database
-        order = await OrderRepository.create(session, db_order_data)
+        # Order references the user row, which may still be buffered
+        await user_buffer.persist(user_id)
+        
+        # Save order and the admin notification in one transaction
+        order = await OrderRepository.create(session, db_order_data, commit=False)
+        await OutboxRepository.add(
+            session,
+            NOTIFY_ADMINS_NEW_ORDER,
+            f"order:{order.order_id}:created",
+            {
+                "order_id": order.order_id,
+                "username": callback.from_user.username or 'no_username'
+            }
+        )
+        await session.commit()
+        
+        # Notify admins
+        outbox_dispatcher.wake()
         
         logger.info(f"✅ Order #{order.order_number} created for user {user_id}")
         
@@ -166,10 +187,7 @@ async def callback_confirm_order(
             confirmed_order_number=order.order_number
         )
         
-        # Delete summary message
-        await message_manager.delete_message(callback.message)
-        
-        # Send confirmation
+        # Show confirmation in place of the summary
         confirmation_text = get_text(
             language,
             'order_confirmed',
@@ -178,16 +196,18 @@ async def callback_confirm_order(
         
         keyboard = get_confirmation_keyboard(language)
         
-        await callback.bot.send_message(
-            chat_id=callback.message.chat.id,
-            text=confirmation_text,
+        # Show next step in this message
+        await message_manager.track(callback.message)
+        await message_manager.render(
+            callback.bot,
+            callback.message.chat.id,
+            confirmation_text,
             reply_markup=keyboard,
             parse_mode='HTML'
         )
         
-        # Notify admins
-        order_data['username'] = callback.from_user.username or 'no_username'
-        await notify_admins_new_order(callback.bot, order, order_data)
+        # Keep confirmation in chat when the next order starts
+        await message_manager.forget(callback.bot, callback.message.chat.id)
         
     except Exception as e:
         logger.error(f"Error creating order: {e}", exc_info=True)
@@ -212,8 +232,8 @@ async def callback_new_order(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await state.update_data(user_id=user_id, language=language)
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show service selection
     from handlers.language import show_service_selection
@@ -233,7 +253,14 @@ async def callback_edit_order(callback: CallbackQuery, state: FSMContext):
     
     keyboard = get_edit_menu_keyboard(language)
     
-    await callback.message.edit_text(edit_text, reply_markup=keyboard)
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
+        edit_text,
+        reply_markup=keyboard
+    )
 
 
 @router.callback_query(F.data.startswith("edit_"))
@@ -244,8 +271,8 @@ async def callback_edit_actions(callback: CallbackQuery, state: FSMContext):
     
     edit_type = callback.data.split('_')[1]
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     if edit_type == "service":
         from handlers.language import show_service_selection
@@ -293,7 +320,8 @@ async def callback_back_to_summary(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer()
     
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Create fake message
     fake_msg = type('obj', (object,), {
@@ -344,7 +372,11 @@ Aloqa turini tanlang:"""
         callback_data="back_to_summary"
     ))
     
-    await callback.message.edit_text(
+    # Show next step in this message
+    await message_manager.track(callback.message)
+    await message_manager.render(
+        callback.bot,
+        callback.message.chat.id,
         contact_text,
         reply_markup=builder.as_markup(),
         parse_mode='HTML'
@@ -42,8 +42,8 @@ async def callback_service_selection(callback: CallbackQuery, state: FSMContext)
     
     logger.info(f"User {callback.from_user.id} selected service: {service_type}")
     
-    # Delete service selection message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show service description
     await show_service_description(callback, state, service_type)
@@ -66,8 +66,8 @@ async def show_service_description(
     # Get keyboard
     keyboard = get_order_now_keyboard(language)
     
-    # Send description
-    await message_manager.send_and_store(
+    # Show description
+    await message_manager.render(
         callback.bot,
         callback.message.chat.id,
         description,
@@ -93,8 +93,8 @@ async def callback_order_now(callback: CallbackQuery, state: FSMContext):
     }
     await state.update_data(order_data=order_data)
     
-    # Delete description message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show quantity selection
     from handlers.order import show_quantity_selection
@@ -107,8 +107,8 @@ async def callback_back_to_service(callback: CallbackQuery, state: FSMContext):
     
     await callback.answer()
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Clear service type
     data = await state.get_data()
@@ -126,8 +126,8 @@ async def callback_back_to_description(callback: CallbackQuery, state: FSMContex
     
     await callback.answer()
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Clear order data
     data = await state.get_data()
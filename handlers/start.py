@@ -145,8 +145,8 @@ async def callback_main_menu(callback: CallbackQuery, state: FSMContext):
     await state.clear()
     await state.update_data(user_id=user_id, language=language)
     
-    # Delete current message
-    await message_manager.delete_message(callback.message)
+    # Show next step in this message
+    await message_manager.track(callback.message)
     
     # Show service selection
     from handlers.language import show_service_selection
@@ -155,6 +155,11 @@ TRANSLATIONS = {
 
 Оформите первый заказ прямо сейчас!''',
         
+        # Abandoned order reminder
+        'draft_reminder': '''⏰ <b>Вы не завершили оформление заказа</b>
+
+Ваши ответы сохранены - продолжите с того места, где остановились, или отправьте /start, чтобы начать заново.''',
+        
         # Errors
         'error_invalid_phone': '❌ Неверный формат номера. Пожалуйста, используйте формат: +998XXXXXXXXX',
         'error_invalid_name': '❌ Имя должно содержать минимум 5 символов',
@@ -312,6 +317,11 @@ Sizda hali buyurtmalar yo'q.
 
 Birinchi buyurtmani hozir bering!''',
         
+        # Abandoned order reminder
+        'draft_reminder': '''⏰ <b>Siz buyurtmani rasmiylashtirishni yakunlamadingiz</b>
+
+Javoblaringiz saqlangan - to'xtagan joyingizdan davom eting yoki qaytadan boshlash uchun /start yuboring.''',
+        
         # Errors
         'error_invalid_phone': "❌ Noto'g'ri format. Iltimos, +998XXXXXXXXX formatidan foydalaning",
         'error_invalid_name': "❌ Ism kamida 5 ta belgidan iborat bo'lishi kerak",
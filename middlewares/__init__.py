@@ -6,8 +6,17 @@ Export all middlewares
 
 from middlewares.database import DatabaseMiddleware
 from middlewares.user_state import UserStateMiddleware
+from middlewares.update_scheduler import UpdateSchedulerMiddleware
+from middlewares.fsm_cache import CachedFSMContext, CachedFSMContextMiddleware
+from middlewares.message_cleanup import MessageCleanupMiddleware
+from middlewares.user_activity import UserActivityMiddleware
 
 __all__ = [
     'DatabaseMiddleware',
-    'UserStateMiddleware'
+    'UserStateMiddleware',
+    'UpdateSchedulerMiddleware',
+    'CachedFSMContext',
+    'CachedFSMContextMiddleware',
+    'MessageCleanupMiddleware',
+    'UserActivityMiddleware'
 ]
\ No newline at end of file
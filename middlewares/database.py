@@ -4,20 +4,66 @@ Database Middleware
 Provides database session to handlers
 """
 
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.database import async_session_maker
+from database.database import async_session_maker, read_as
+from utils.metrics import metrics
+
+
+class LazySession:
+    """
+    AsyncSession stand-in that opens the real session on first use
+    
+    Every attribute access is forwarded to the session, so handlers and
+    repositories use it exactly like AsyncSession.
+    """
+    
+    __slots__ = ("_session",)
+    
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+    
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = async_session_maker()
+            metrics.increment("db.sessions_opened")
+        return getattr(self._session, name)
+    
+    async def discard(self, rollback: bool = False) -> None:
+        """
+        Release session if it was opened
+        
+        Args:
+            rollback: Roll back pending transaction first
+        """
+        if self._session is None:
+            return
+        try:
+            if rollback:
+                await self._session.rollback()
+        finally:
+            await self._session.close()
+            self._session = None
 
 
 class DatabaseMiddleware(BaseMiddleware):
     """
     Middleware to provide database session to handlers
     
+    Only handlers declaring a `session` argument get one, and the
+    connection is taken from the pool on the first query and returned
+    as soon as the handler finishes. Read-only repository calls made by
+    the handler are attributed to the user the update came from, so
+    they can go to the replica.
+    
     Usage in handler:
         async def handler(message: Message, session: AsyncSession):
             # Use session here
+            
+    Metrics:
+        db.sessions_opened: sessions that actually reached the database
     """
     
     async def __call__(
@@ -37,14 +83,25 @@ class DatabaseMiddleware(BaseMiddleware):
         Returns:
             Handler result
         """
-        async with async_session_maker() as session:
-            # Add session to handler data
-            data['session'] = session
-            
-            try:
-                # Execute handler
+        # Skip handlers that never ask for a session
+        handler_object = data.get('handler')
+        if handler_object and not handler_object.varkw and 'session' not in handler_object.params:
+            return await handler(event, data)
+        
+        session = LazySession()
+        
+        # Add session to handler data
+        data['session'] = session
+        
+        user = data.get('event_from_user')
+        failed = False
+        try:
+            # Execute handler
+            with read_as(user.id if user else None):
                 return await handler(event, data)
-            except Exception:
-                # Rollback on error
-                await session.rollback()
-                raise
\ No newline at end of file
+        except Exception:
+            # Rollback on error
+            failed = True
+            raise
+        finally:
+            await session.discard(rollback=failed)
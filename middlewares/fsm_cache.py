@@ -0,0 +1,192 @@
+"""
+FSM Cache Middleware
+====================
+Loads FSM state once per update and writes it back once
+"""
+
+from copy import deepcopy
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey, DEFAULT_DESTINY
+from aiogram.types import TelegramObject
+
+from database.fsm_storage import ExpiringStorage
+from utils.metrics import metrics
+
+
+class CachedFSMContext(FSMContext):
+    """
+    Request-scoped FSM context
+    
+    Keeps state and data in memory for the duration of one update.
+    Handlers may read and update it any number of times - the storage
+    sees one read when the update starts and at most one write when it
+    ends, and only if something actually changed.
+    
+    Metrics:
+        fsm.reads: storage read operations
+        fsm.writes: storage write operations
+    """
+    
+    def __init__(self, storage: BaseStorage, key: StorageKey) -> None:
+        super().__init__(storage=storage, key=key)
+        self._state: Optional[str] = None
+        self._data: Dict[str, Any] = {}
+        self._loaded = False
+        self._dirty = False
+    
+    async def load(self) -> None:
+        """Read state and data from storage"""
+        if isinstance(self.storage, ExpiringStorage):
+            self._state, self._data = await self.storage.get_record(self.key)
+            metrics.increment("fsm.reads")
+        else:
+            self._state = await self.storage.get_state(self.key)
+            self._data = await self.storage.get_data(self.key)
+            metrics.increment("fsm.reads", 2)
+        self._loaded = True
+        self._dirty = False
+    
+    async def flush(self) -> None:
+        """Write state and data back if they were changed"""
+        if not self._dirty:
+            return
+        if isinstance(self.storage, ExpiringStorage):
+            await self.storage.set_record(self.key, self._state, self._data)
+            metrics.increment("fsm.writes")
+        else:
+            await self.storage.set_state(self.key, self._state)
+            await self.storage.set_data(self.key, self._data)
+            metrics.increment("fsm.writes", 2)
+        self._dirty = False
+    
+    async def set_state(self, state: StateType = None) -> None:
+        """Change state"""
+        await self._ensure_loaded()
+        self._state = state.state if isinstance(state, State) else state
+        self._dirty = True
+    
+    async def get_state(self) -> Optional[str]:
+        """Get current state"""
+        await self._ensure_loaded()
+        return self._state
+    
+    async def set_data(self, data: Dict[str, Any]) -> None:
+        """Replace data"""
+        await self._ensure_loaded()
+        self._data = deepcopy(data)
+        self._dirty = True
+    
+    async def get_data(self) -> Dict[str, Any]:
+        """Get copy of current data"""
+        await self._ensure_loaded()
+        return deepcopy(self._data)
+    
+    async def get_value(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        Get copy of one data value
+        
+        Same signature as FSMContext.get_value of newer aiogram, which
+        would read the storage and miss changes made in this update.
+        
+        Args:
+            key: Data key
+            default: Returned when the key is not set
+            
+        Returns:
+            Value or default
+        """
+        await self._ensure_loaded()
+        return deepcopy(self._data.get(key, default))
+    
+    async def update_data(
+        self,
+        data: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """Merge data"""
+        await self._ensure_loaded()
+        if data:
+            kwargs.update(data)
+        self._data.update(deepcopy(kwargs))
+        self._dirty = True
+        return deepcopy(self._data)
+    
+    async def clear(self) -> None:
+        """Reset state and data"""
+        await self._ensure_loaded()
+        self._state = None
+        self._data = {}
+        self._dirty = True
+    
+    async def _ensure_loaded(self) -> None:
+        """Load lazily when used outside the middleware"""
+        if not self._loaded:
+            await self.load()
+
+
+class CachedFSMContextMiddleware(FSMContextMiddleware):
+    """
+    Drop-in replacement for aiogram's FSM middleware
+    
+    Injects CachedFSMContext as `state` and flushes it after the handler,
+    including when the handler raises, so partially completed steps are
+    kept just like with the default context.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Execute handler with cached FSM context
+        
+        Args:
+            handler: Handler function
+            event: Telegram update
+            data: Handler data dictionary
+            
+        Returns:
+            Handler result
+        """
+        bot: Bot = data["bot"]
+        context = self.resolve_event_context(bot, data)
+        data["fsm_storage"] = self.storage
+        
+        if not context:
+            return await handler(event, data)
+        
+        async with self.events_isolation.lock(key=context.key):
+            await context.load()
+            data.update({"state": context, "raw_state": await context.get_state()})
+            try:
+                return await handler(event, data)
+            finally:
+                await context.flush()
+    
+    def get_context(
+        self,
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        thread_id: Optional[int] = None,
+        business_connection_id: Optional[str] = None,
+        destiny: str = DEFAULT_DESTINY
+    ) -> CachedFSMContext:
+        """Build cached context for storage key"""
+        return CachedFSMContext(
+            storage=self.storage,
+            key=StorageKey(
+                user_id=user_id,
+                chat_id=chat_id,
+                bot_id=bot.id,
+                thread_id=thread_id,
+                business_connection_id=business_connection_id,
+                destiny=destiny
+            )
+        )
@@ -0,0 +1,45 @@
+"""
+Message Cleanup Middleware
+==========================
+Sends the deletions queued by a handler once the update is handled
+"""
+
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.message_manager import message_manager
+
+
+class MessageCleanupMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that flushes message deletions
+    
+    Handlers queue deletions of user input and old prompts through
+    message_manager. They are sent here, after the handler finished, as a
+    single deleteMessages call per chat.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Execute handler, then delete the chat's queued messages
+        
+        Args:
+            handler: Handler function
+            event: Telegram update
+            data: Handler data dictionary
+            
+        Returns:
+            Handler result
+        """
+        try:
+            return await handler(event, data)
+        finally:
+            chat = data.get('event_chat')
+            if chat:
+                await message_manager.flush(chat.id)
@@ -0,0 +1,125 @@
+"""
+Update Scheduler Middleware
+===========================
+Bounds concurrent update processing and keeps per-chat ordering
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Any, Awaitable, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.metrics import metrics
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that schedules handler execution
+    
+    Every chat gets a serial FIFO queue, so updates from one customer are
+    handled strictly in arrival order while different chats run in
+    parallel. At most `concurrency_limit` updates are processed at once,
+    which also caps the number of simultaneous DB connections.
+    
+    Metrics:
+        updates.handled: updates taken for processing
+        updates.queued: updates waiting for their turn
+        updates.running: updates currently being handled
+        updates.active_chats: chats with queued or running updates
+        updates.max_chat_pending: queued + running updates of the busiest chat
+        updates.wait_seconds: time from arrival to handler start
+        updates.chat_depth: updates of the same chat ahead of an arriving one
+    """
+    
+    def __init__(self, concurrency_limit: int):
+        self._semaphore = asyncio.Semaphore(concurrency_limit)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_pending: Dict[int, int] = {}  # chat_id: queued + running updates
+        self._queued = 0
+        self._running = 0
+        # Scanning every chat is left to snapshot time, not each update
+        metrics.add_collector(self._publish_chat_depth)
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Execute handler once the chat queue and global limit allow it
+        
+        Args:
+            handler: Handler function
+            event: Telegram update
+            data: Handler data dictionary
+        
+        Returns:
+            Handler result
+        """
+        chat_id = self._resolve_chat_id(data)
+        
+        metrics.increment("updates.handled")
+        
+        if chat_id is None:
+            async with self._semaphore:
+                return await handler(event, data)
+        
+        arrived = time.monotonic()
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        ahead = self._chat_pending.get(chat_id, 0)
+        self._chat_pending[chat_id] = ahead + 1
+        metrics.observe("updates.chat_depth", ahead)
+        self._queued += 1
+        self._publish()
+        
+        started = False
+        try:
+            async with lock:
+                async with self._semaphore:
+                    started = True
+                    self._queued -= 1
+                    self._running += 1
+                    self._publish()
+                    metrics.observe("updates.wait_seconds", time.monotonic() - arrived)
+                    
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self._running -= 1
+        finally:
+            if not started:
+                # Cancelled while still waiting in the queue
+                self._queued -= 1
+            
+            remaining = self._chat_pending[chat_id] - 1
+            if remaining:
+                self._chat_pending[chat_id] = remaining
+            else:
+                del self._chat_pending[chat_id]
+                del self._chat_locks[chat_id]
+            self._publish()
+    
+    @staticmethod
+    def _resolve_chat_id(data: Dict[str, Any]) -> Optional[int]:
+        """Get chat ID (or user ID for chatless updates) from context"""
+        chat = data.get('event_chat')
+        if chat:
+            return chat.id
+        user = data.get('event_from_user')
+        if user:
+            return user.id
+        return None
+    
+    def _publish(self) -> None:
+        """Push current queue state to metrics"""
+        metrics.set_gauge("updates.queued", self._queued)
+        metrics.set_gauge("updates.running", self._running)
+        metrics.set_gauge("updates.active_chats", len(self._chat_pending))
+    
+    def _publish_chat_depth(self) -> None:
+        """Push the deepest per-chat queue to metrics"""
+        metrics.set_gauge("updates.max_chat_pending", max(self._chat_pending.values(), default=0))
@@ -0,0 +1,42 @@
+"""
+User Activity Middleware
+========================
+Records user activity for the users table
+"""
+
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from services.user_buffer import user_buffer
+
+
+class UserActivityMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that refreshes users.last_interaction
+    
+    Only marks the user in user_buffer - the database is written in
+    batches, not once per update.
+    """
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Record activity, then execute handler
+        
+        Args:
+            handler: Handler function
+            event: Telegram update
+            data: Handler data dictionary
+            
+        Returns:
+            Handler result
+        """
+        user = data.get('event_from_user')
+        if user and not user.is_bot:
+            user_buffer.touch(user)
+        return await handler(event, data)
@@ -0,0 +1,119 @@
+"""
+Admin Fan-out Benchmark
+=======================
+confirm_order latency and new-order notice delivery by number of admins
+
+Runs the order flow of scripts/order_flow.py through the dispatcher with
+ADMIN_IDS set to --admins fake admins, a fake Telegram session taking
+--rtt-ms per call and the outbound queue (per-chat limits lifted, the
+flow's own replies are not what is measured). The outbox dispatcher
+delivers the new-order notice as in the bot. For every admin count it
+prints the medians over --runs flows of the confirm_order handler time
+and of the time from the handler returning to the last admin receiving
+the notice. Runs against the database in .env, then deletes its rows
+and restores today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_admin_fanout.py [--admins 1,12,24] [--runs 3] [--rtt-ms 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.methods import SendMessage, TelegramMethod
+
+import bot as bot_module
+from config import settings
+from database.database import dispose_engine
+from scripts.order_flow import BOT_ID, FakeSession, cleanup, run_flow, today_stats
+from services.outbound import OutboundQueue
+from services.outbox import outbox_dispatcher
+
+# Chat IDs of the fake admins
+FIRST_ADMIN = 990_001_000
+
+
+class SlowSession(FakeSession):
+    """FakeSession taking a network round trip per call and noting admin deliveries"""
+    
+    def __init__(self, rtt: float):
+        super().__init__()
+        self.rtt = rtt
+        self.admin_delivered: Dict[int, float] = {}
+    
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        await asyncio.sleep(self.rtt)
+        result = await super().make_request(bot, method, timeout)
+        if isinstance(method, SendMessage) and method.chat_id in settings.admin_ids:
+            self.admin_delivered[method.chat_id] = time.perf_counter()
+        return result
+
+
+async def one_flow(dp, rtt: float) -> Dict[str, float]:
+    """Run the flow once, return handler and delivery times in ms"""
+    session = SlowSession(rtt)
+    bot = Bot(token=f"{BOT_ID}:BENCH", session=session, default=DefaultBotProperties(parse_mode="HTML"))
+    bot.session.middleware(OutboundQueue(
+        global_rate=settings.outbound_global_rate,
+        chat_rate=1000,
+        chat_burst=1000
+    ))
+    marks: Dict[str, float] = {}
+    previous = time.perf_counter()
+    
+    def on_step(label: str) -> None:
+        nonlocal previous
+        now = time.perf_counter()
+        marks[label] = (now - previous) * 1000
+        marks["returned"] = now
+        previous = now
+    
+    stats = await today_stats()
+    outbox_dispatcher.start(bot)
+    try:
+        await run_flow(dp, bot, on_step)
+        while len(session.admin_delivered) < len(settings.admin_ids):
+            await asyncio.sleep(0.005)
+    finally:
+        await outbox_dispatcher.stop()
+        await cleanup(stats)
+    return {
+        "handler": marks["confirm_order"],
+        "delivered": (max(session.admin_delivered.values()) - marks["returned"]) * 1000
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admins", default="1,12,24", help="Comma-separated admin counts")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--rtt-ms", type=float, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    
+    dp = bot_module.create_dispatcher()
+    print(f"Medians of {args.runs} flows, {args.rtt_ms:.0f} ms per API call:")
+    print("  admins   confirm_order handler   last admin notified after")
+    try:
+        for admins in (int(count) for count in args.admins.split(",")):
+            settings.admin_ids = [FIRST_ADMIN + admin for admin in range(admins)]
+            results: List[Dict[str, float]] = [await one_flow(dp, args.rtt_ms / 1000) for _ in range(args.runs)]
+            handler = statistics.median(result["handler"] for result in results)
+            delivered = statistics.median(result["delivered"] for result in results)
+            print(f"  {admins:6d}   {handler:15.0f} ms   {delivered:19.0f} ms")
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
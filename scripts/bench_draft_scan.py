@@ -0,0 +1,129 @@
+"""
+Idle Conversation Scan Benchmark
+================================
+Cost of the draft sweeper's keyset scan over fsm_states
+
+Inserts --rows conversations with a state, last active at random times
+over the last 30 hours, and walks them with PostgresStorage.scan_idle()
+in batches of DRAFT_SWEEP_BATCH, as the draft sweeper does. For
+comparison it also times one query filtering all idle rows at once.
+Prints the plan and server execution time of both (EXPLAIN ANALYZE) and
+the round trip measured by the client, which includes fetching and
+decoding the rows. Runs against the database in .env under bot
+ID BOT_ID and deletes its rows afterwards.
+
+Usage:
+    python scripts/bench_draft_scan.py [--rows 200000] [--batches 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from config import settings
+from database.database import dispose_engine, engine
+from database.fsm_storage import PostgresStorage
+
+# Bot ID of benchmark keys, never a real bot
+BOT_ID = 999999999
+
+IDLE_FILTER = (
+    "updated_at < now() - make_interval(mins => :idle_minutes) "
+    "AND updated_at >= now() - make_interval(hours => :ttl_hours) "
+    "AND state IS NOT NULL"
+)
+QUERIES = {
+    "keyset batch": (
+        f"SELECT storage_key, state, data, updated_at FROM fsm_states WHERE {IDLE_FILTER} "
+        "ORDER BY updated_at, storage_key LIMIT :batch"
+    ),
+    "all idle rows": f"SELECT storage_key, state, data, updated_at FROM fsm_states WHERE {IDLE_FILTER}",
+}
+
+
+async def insert_rows(rows: int) -> None:
+    """Insert benchmark conversations"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO fsm_states (storage_key, state, data, updated_at) "
+                "SELECT :bot || ':' || g || ':' || g || ':::default', 'OrderStates:size_selection', "
+                "'{\"language\": \"ru\"}', now() - random() * interval '30 hours' "
+                "FROM generate_series(1, :rows) g"
+            ),
+            {"bot": str(BOT_ID), "rows": rows}
+        )
+        await conn.execute(text("ANALYZE fsm_states"))
+
+
+async def explain(params: dict) -> None:
+    """Print the scan node and server execution time of both queries"""
+    async with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = (await conn.execute(
+                text(f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {sql}"), params
+            )).scalars().all()
+            scan = next(line.strip(" ->") for line in plan if "Scan" in line)
+            executed = next(line for line in plan if line.startswith("Execution Time"))
+            print(f"  {name:14s} {executed.split(': ')[1]:>10s}  {scan}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batches", type=int, default=200)
+    args = parser.parse_args()
+    
+    idle_for = timedelta(minutes=settings.draft_reminder_minutes or 60)
+    storage = PostgresStorage(ttl=timedelta(hours=settings.draft_ttl_hours))
+    params = {
+        "idle_minutes": int(idle_for.total_seconds() // 60),
+        "ttl_hours": settings.draft_ttl_hours,
+        "batch": settings.draft_sweep_batch
+    }
+    
+    try:
+        await insert_rows(args.rows)
+        print(f"{args.rows} conversations inserted, server execution:")
+        await explain(params)
+        
+        batch_times: List[float] = []
+        cursor = None
+        for _ in range(args.batches):
+            started = time.perf_counter()
+            batch = await storage.scan_idle(idle_for, settings.draft_sweep_batch, after=cursor)
+            batch_times.append((time.perf_counter() - started) * 1000)
+            if not batch:
+                break
+            cursor = batch[-1].cursor
+        
+        full_times: List[float] = []
+        async with engine.connect() as conn:
+            for _ in range(5):
+                started = time.perf_counter()
+                await conn.execute(text(QUERIES["all idle rows"]), params)
+                full_times.append((time.perf_counter() - started) * 1000)
+        
+        print("\nClient round trip:")
+        print(f"  scan_idle batch of {settings.draft_sweep_batch}: median {statistics.median(batch_times):.2f} ms over {len(batch_times)} batches")
+        print(f"  all idle rows at once: median {statistics.median(full_times):.1f} ms")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("DELETE FROM fsm_states WHERE storage_key LIKE :prefix"),
+                {"prefix": f"{BOT_ID}:%"}
+            )
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
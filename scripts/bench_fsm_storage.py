@@ -0,0 +1,135 @@
+"""
+FSM Storage Benchmark
+=====================
+get_data / update_data latency of the FSM storage backends
+
+Compares aiogram's MemoryStorage, TTLMemoryStorage and PostgresStorage
+(FSM_STORAGE=memory / postgres). For Postgres, update_data is also run
+the way aiogram's BaseStorage does it (get_data + set_data) to show what
+the single-statement merge saves. Postgres runs against the database in
+.env and removes its rows afterwards.
+
+Usage:
+    python scripts/bench_fsm_storage.py [--ops 2000] [--keys 200] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete
+
+from database.database import dispose_engine, engine
+from database.fsm_storage import PostgresStorage, TTLMemoryStorage
+from database.models import FSMRecord
+
+# Bot ID of benchmark keys, never a real bot
+BOT_ID = 999999999
+
+DRAFT = {
+    "language": "ru",
+    "service_type": "carpet",
+    "order_data": {"items_count": 2, "items": [{"size": "2x3"}, {"size": "3x4"}]},
+    "last_message_id": 1234
+}
+
+
+def storage_key(index: int) -> StorageKey:
+    """Benchmark conversation key"""
+    chat_id = 10_000 + index
+    return StorageKey(bot_id=BOT_ID, chat_id=chat_id, user_id=chat_id)
+
+
+async def measure(
+    operation: Callable[[StorageKey], Awaitable[object]],
+    ops: int,
+    keys: int,
+    concurrency: int
+) -> Tuple[List[float], float]:
+    """
+    Run operation on random keys from `concurrency` tasks
+    
+    Returns:
+        Per-call latencies and total run time in seconds
+    """
+    latencies: List[float] = []
+    
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            key = storage_key(random.randrange(keys))
+            started = time.perf_counter()
+            await operation(key)
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(ops // concurrency) for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def summary(latencies: List[float]) -> str:
+    """Percentiles line"""
+    latencies = sorted(latencies)
+    
+    def pick(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1e6
+    
+    return f"p50 {pick(0.5):8.1f} us  p99 {pick(0.99):8.1f} us  mean {statistics.mean(latencies) * 1e6:8.1f} us"
+
+
+async def bench_storage(name: str, storage: BaseStorage, args: argparse.Namespace) -> None:
+    """Print get_data and update_data latencies of one backend"""
+    for index in range(args.keys):
+        await storage.set_data(storage_key(index), dict(DRAFT))
+    
+    operations = {
+        "get_data": lambda key: storage.get_data(key),
+        "update_data": lambda key: storage.update_data(key, {"last_message_id": random.randrange(10**6)}),
+    }
+    if isinstance(storage, PostgresStorage):
+        operations["update_data (get + set)"] = lambda key: BaseStorage.update_data(
+            storage, key, {"last_message_id": random.randrange(10**6)}
+        )
+    
+    for concurrency in sorted({1, args.concurrency}):
+        for operation, call in operations.items():
+            # Warm-up: pool connections, prepared statements
+            await measure(call, min(200, args.ops), args.keys, concurrency)
+            latencies, elapsed = await measure(call, args.ops, args.keys, concurrency)
+            print(
+                f"{name:18s} {operation:24s} x{concurrency:<3d} {summary(latencies)}  "
+                f"{len(latencies) / elapsed:9.0f} ops/s"
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000, help="calls per operation")
+    parser.add_argument("--keys", type=int, default=200, help="conversations")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    
+    ttl = timedelta(hours=24)
+    await bench_storage("MemoryStorage", MemoryStorage(), args)
+    await bench_storage("TTLMemoryStorage", TTLMemoryStorage(ttl), args)
+    
+    postgres = PostgresStorage(ttl)
+    try:
+        await bench_storage("PostgresStorage", postgres, args)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(FSMRecord).where(FSMRecord.storage_key.like(f"{BOT_ID}:%")))
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Keyset Pages Benchmark
+======================
+Cost of /myorders pages from the newest to the oldest order
+
+Inserts --orders orders for the benchmark customer of
+scripts/order_flow.py, three at a time sharing created_at so the
+order_id tie-break matters, and walks the whole history with
+OrderRepository.list_user_orders: older pages to the end, and from each
+page one newer page back, which must equal the page before it. Checks
+that no order is missed or repeated and prints page times at the start
+and the end of the walk. Then prints the plan and server execution time
+(EXPLAIN ANALYZE) of the exact statements list_user_orders sends deep in
+the history, in both directions, next to the OFFSET query that reaches
+the same page. Runs against the database in .env, then deletes its rows
+and restores today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_keyset_pages.py [--orders 50000] [--page 10]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event, text
+
+from database.database import async_session_maker, dispose_engine, engine
+from database.repository import OrderPage, OrderRepository, UserRepository
+from scripts.order_flow import BENCH_CHAT, cleanup, today_stats
+
+OFFSET_QUERY = (
+    "SELECT order_id, order_number, status, service_type, created_at FROM orders "
+    "WHERE user_id = :user_id ORDER BY created_at DESC, order_id DESC OFFSET :offset LIMIT :limit"
+)
+
+captured: List[Tuple[str, tuple]] = []
+
+
+def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Keep statements sent by the engine"""
+    captured.append((statement, parameters))
+
+
+async def insert_orders(orders: int) -> List[int]:
+    """Insert benchmark orders, return their IDs newest first"""
+    async with async_session_maker() as session:
+        await UserRepository.upsert_many(session, [{
+            "user_id": BENCH_CHAT,
+            "telegram_username": None,
+            "first_name": "Bench",
+            "last_name": None,
+            "language_preference": "ru",
+            "last_interaction": datetime.now(timezone.utc)
+        }])
+        # A minute apart stays inside the months that have partitions
+        await session.execute(
+            text(
+                "INSERT INTO orders (user_id, service_type, language, items_count, items_details, "
+                "customer_name, phone_number, address_type, status, discount_amount, created_at) "
+                "SELECT :user_id, 'carpet', 'ru', 1, '[]', 'Bench', '+998901234567', 'manual', "
+                "'completed', 0, now() - (g / 3) * interval '1 minute' "
+                "FROM generate_series(1, :orders) g"
+            ),
+            {"user_id": BENCH_CHAT, "orders": orders}
+        )
+        await session.execute(text("ANALYZE orders"))
+        await session.commit()
+        result = await session.execute(
+            text("SELECT order_id FROM orders WHERE user_id = :user_id ORDER BY created_at DESC, order_id DESC"),
+            {"user_id": BENCH_CHAT}
+        )
+        return list(result.scalars())
+
+
+def ids(page: OrderPage) -> List[int]:
+    """Order IDs of a page"""
+    return [row.order_id for row in page.rows]
+
+
+async def walk(page_size: int) -> Tuple[List[int], List[float], int]:
+    """Walk all pages, return order IDs seen, older page times and page count"""
+    seen: List[int] = []
+    times: List[float] = []
+    async with async_session_maker() as session:
+        page = await OrderRepository.list_user_orders(session, BENCH_CHAT, page_size)
+        assert page.newer is None
+        seen += ids(page)
+        while page.older:
+            started = time.perf_counter()
+            older = await OrderRepository.list_user_orders(session, BENCH_CHAT, page_size, before=page.older)
+            times.append((time.perf_counter() - started) * 1000)
+            assert older.newer is not None
+            back = await OrderRepository.list_user_orders(session, BENCH_CHAT, page_size, after=older.newer)
+            assert ids(back) == ids(page), "newer page differs from the page before"
+            page = older
+            seen += ids(page)
+    return seen, times, len(times) + 1
+
+
+async def statement_of(page_size: int, before: Optional[str] = None, after: Optional[str] = None) -> Tuple[str, tuple]:
+    """The statement and parameters list_user_orders sends"""
+    captured.clear()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with async_session_maker() as session:
+            await OrderRepository.list_user_orders(session, BENCH_CHAT, page_size, before=before, after=after)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    return next(sent for sent in captured if "FROM orders" in sent[0])
+
+
+async def explain(label: str, statement: str, parameters) -> None:
+    """Print the first scan returning rows and server execution time of one statement"""
+    async with engine.connect() as conn:
+        explain_sql = f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {statement}"
+        if isinstance(parameters, dict):
+            result = await conn.execute(text(explain_sql), parameters)
+        else:
+            result = await conn.exec_driver_sql(explain_sql, parameters)
+        plan = result.scalars().all()
+    # Months with no rows for the page are scanned empty or not at all
+    scan = next(line.strip(" ->") for line in plan if "Scan" in line and "rows=0 " not in line and "never" not in line)
+    executed = next(line for line in plan if line.startswith("Execution Time"))
+    print(f"  {label:16s} {executed.split(': ')[1]:>10s}  {scan}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--page", type=int, default=10)
+    args = parser.parse_args()
+    
+    stats = await today_stats()
+    try:
+        expected = await insert_orders(args.orders)
+        seen, times, pages = await walk(args.page)
+        print(f"{args.orders} orders, {pages} pages, none missed or repeated: {seen == expected}")
+        print(f"  older page: first 10 {sum(times[:10]) / 10:.2f} ms, last 10 {sum(times[-10:]) / 10:.2f} ms")
+        
+        # The page 90% of the way into the history
+        offset = args.orders * 9 // 10
+        async with async_session_maker() as session:
+            deep = await OrderRepository.list_user_orders(session, BENCH_CHAT, args.page)
+            while deep.older and deep.rows[-1].order_id != expected[offset - 1]:
+                deep = await OrderRepository.list_user_orders(session, BENCH_CHAT, args.page, before=deep.older)
+        print(f"\nPage at order {offset}, server execution:")
+        await explain("keyset older", *await statement_of(args.page, before=deep.older))
+        await explain("keyset newer", *await statement_of(args.page, after=deep.rows[-1].cursor))
+        await explain(
+            f"OFFSET {offset}", OFFSET_QUERY,
+            {"user_id": BENCH_CHAT, "offset": offset, "limit": args.page + 1}
+        )
+    finally:
+        await cleanup(stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
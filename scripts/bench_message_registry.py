@@ -0,0 +1,119 @@
+"""
+Message Registry Memory Benchmark
+=================================
+Memory per active chat of the wizard message registry
+
+Fills a MemoryMessageRegistry with one record per chat, as render()
+stores them, and measures the memory held with tracemalloc. The result
+is compared with the estimate the registry publishes as
+messages.registry_bytes. It also measures the layout MessageManager used
+before the registry, rebuilt here: a chat -> message ID dict plus a
+chat -> rendered content dict holding each chat's text and keyboard.
+Finally it stores more chats than max_chats to show the bound holds.
+No database or Telegram access.
+
+Usage:
+    python scripts/bench_message_registry.py [--chats 100000] [--skip-previous]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from keyboards.inline import get_carpet_size_keyboard
+from localization.translations import get_text
+from services.message_manager import _markup_digest, _text_digest
+from services.message_registry import MemoryMessageRegistry, WizardMessage
+
+# Chat IDs of the benchmark, message IDs start at FIRST_MESSAGE
+FIRST_CHAT = 1_000_000_000
+FIRST_MESSAGE = 2_000_000
+OPTIONS = {"parse_mode": "HTML"}
+
+
+class RenderedMessage(NamedTuple):
+    """What a wizard message showed, as MessageManager kept it per chat"""
+    
+    text: str
+    options: Dict[str, Any]
+    reply_markup: Any
+
+
+def step_text(chat: int) -> str:
+    """Size step prompt, a new string per chat like a rendered one"""
+    return get_text("ru", "select_size_carpet", number=chat % 10 + 1, current=chat % 10 + 1, total=10)
+
+
+def measure(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Build a structure, return it and the bytes it holds"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    built = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return built, used
+
+
+def previous_layout(chats: int) -> Tuple[Dict[int, int], Dict[int, RenderedMessage]]:
+    """Message ID and rendered content dicts"""
+    user_messages: Dict[int, int] = {}
+    rendered: Dict[int, RenderedMessage] = {}
+    for chat in range(chats):
+        user_messages[FIRST_CHAT + chat] = FIRST_MESSAGE + chat
+        rendered[FIRST_CHAT + chat] = RenderedMessage(
+            step_text(chat), dict(OPTIONS), get_carpet_size_keyboard(chat % 10, "ru")
+        )
+    return user_messages, rendered
+
+
+def registry(chats: int) -> MemoryMessageRegistry:
+    """Registry records as render() stores them"""
+    records = MemoryMessageRegistry(max_chats=chats, ttl=timedelta(hours=72))
+    for chat in range(chats):
+        records.store(FIRST_CHAT + chat, WizardMessage(
+            FIRST_MESSAGE + chat,
+            text_digest=_text_digest(step_text(chat), OPTIONS),
+            markup_digest=_markup_digest(get_carpet_size_keyboard(chat % 10, "ru"))
+        ))
+    return records
+
+
+def report(label: str, used: int, chats: int) -> None:
+    """Print total and per chat memory"""
+    print(f"{label:36s} {used / 1e6:8.1f} MB  {used / chats:6.0f} B/chat")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=100_000)
+    parser.add_argument("--skip-previous", action="store_true", help="Skip the slow previous layout")
+    args = parser.parse_args()
+    print(f"Memory for {args.chats} active chats:")
+    
+    if not args.skip_previous:
+        previous, used = measure(lambda: previous_layout(args.chats))
+        report("message IDs + rendered content", used, args.chats)
+        del previous
+        _, used = measure(lambda: {FIRST_CHAT + chat: FIRST_MESSAGE + chat for chat in range(args.chats)})
+        report("message IDs only (int -> int dict)", used, args.chats)
+    
+    records, used = measure(lambda: registry(args.chats))
+    report("registry records", used, args.chats)
+    report("messages.registry_bytes estimate", records.bytes, args.chats)
+    
+    extra = args.chats // 20
+    for chat in range(args.chats, args.chats + extra):
+        records.store(FIRST_CHAT + chat, WizardMessage(FIRST_MESSAGE + chat))
+    print(f"\nAfter storing {extra} more chats the registry holds {len(records.records)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+My Orders Benchmark
+===================
+Latency and memory of one /myorders page, full ORM vs projected rows
+
+Creates --orders orders with 5 items each for the benchmark customer of
+scripts/order_flow.py and loads a 10-order page both ways:
+- full ORM: select(Order), as the list was loaded before
+  list_user_orders (the query of the removed get_user_orders);
+- projected: OrderRepository.list_user_orders.
+For each it prints the average latency, and with tracemalloc the memory
+and number of blocks the result keeps alive, plus the call's peak.
+Runs against the database in .env, then deletes its rows and restores
+today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_my_orders.py [--orders 10] [--calls 500]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import async_session_maker, dispose_engine
+from database.models import Order
+from database.partitions import order_partitions
+from database.repository import OrderRepository, UserRepository
+from scripts.order_flow import BENCH_CHAT, cleanup, today_stats
+
+PAGE = 10
+
+ORDER = {
+    "user_id": BENCH_CHAT,
+    "service_type": "carpet",
+    "language": "ru",
+    "items_count": 5,
+    "items_details": [{"size": f"{n}x3", "area_m2": 3 * n, "price": 15000 * n} for n in range(1, 6)],
+    "customer_name": "Bench Customer Name",
+    "phone_number": "+998901234567",
+    "address_type": "manual",
+    "address_text": "Tashkent, Chilonzor district, 12 kvartal, house 34, apt 56",
+    "customer_comment": "Please call before arriving " * 3,
+    "total_cost": 150000,
+    "discount_amount": 0,
+    "final_cost": 150000,
+    "status": "completed"
+}
+
+
+async def full_orm(session: AsyncSession) -> Any:
+    """Page of full orders"""
+    result = await session.execute(
+        select(Order)
+        .where(Order.user_id == BENCH_CHAT)
+        .order_by(Order.created_at.desc())
+        .limit(PAGE)
+    )
+    return list(result.scalars().all())
+
+
+async def projected(session: AsyncSession) -> Any:
+    """Page of list rows"""
+    return await OrderRepository.list_user_orders(session, BENCH_CHAT, PAGE)
+
+
+async def measure(label: str, load: Callable[[AsyncSession], Awaitable[Any]], calls: int) -> None:
+    """Print latency, retained memory and peak of one way of loading"""
+    async with async_session_maker() as session:
+        for _ in range(50):
+            await load(session)
+            session.expunge_all()
+        
+        started = time.perf_counter()
+        for _ in range(calls):
+            await load(session)
+            session.expunge_all()
+        latency = (time.perf_counter() - started) / calls
+        
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        current_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = await load(session)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+        del result
+    
+    print(
+        f"{label:10s} {latency * 1000:6.2f} ms  retained {(current - current_before) / 1024:5.1f} KiB "
+        f"in {blocks} blocks  peak {(peak - current_before) / 1024:6.1f} KiB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    
+    stats = await today_stats()
+    try:
+        async with async_session_maker() as session:
+            await UserRepository.upsert_many(session, [{
+                "user_id": BENCH_CHAT,
+                "telegram_username": None,
+                "first_name": "Bench",
+                "last_name": None,
+                "language_preference": "ru",
+                "last_interaction": datetime.now(timezone.utc)
+            }])
+            for _ in range(args.orders):
+                await OrderRepository.create(session, dict(ORDER), commit=False)
+            await session.commit()
+        await order_partitions.bounds("order_id", 0)
+        
+        print(f"Page of {PAGE} orders, average of {args.calls} calls:")
+        await measure("full ORM", full_orm, args.calls)
+        await measure("projected", projected, args.calls)
+    finally:
+        await cleanup(stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Order Cache Benchmark
+=====================
+Queries and latency of order lookups through order_cache
+
+Creates one order for the benchmark customer of scripts/order_flow.py
+and reports:
+- how many queries 100 concurrent cold lookups make (single-flight);
+- how many a lookup by number makes after a load by ID;
+- that a read after an accepted status change and commit sees it;
+- that changing a returned order's items_details does not change the
+  cached copy;
+- hit and miss latency, and what hydrating a hit costs compared with
+  Order(**values).
+Runs against the database in .env, then deletes its rows and restores
+today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_order_cache.py [--hits 20000] [--misses 500]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event
+
+from database.database import async_session_maker, dispose_engine, engine
+from database.models import Order
+from database.order_cache import OrderCache, order_cache
+from database.partitions import order_partitions
+from database.repository import OrderRepository, UserRepository
+from scripts.order_flow import BENCH_CHAT, cleanup, today_stats
+
+ORDER = {
+    "user_id": BENCH_CHAT,
+    "service_type": "carpet",
+    "language": "ru",
+    "items_count": 1,
+    "items_details": [{"size": "2x3", "area_m2": 6}],
+    "customer_name": "Bench",
+    "phone_number": "+998901234567",
+    "address_type": "manual",
+    "address_text": "Tashkent",
+    "total_cost": 90000,
+    "discount_amount": 0,
+    "final_cost": 90000,
+    "status": "pending"
+}
+
+statements = 0
+
+
+def count_statements(*args) -> None:
+    """Count statements sent by the engine"""
+    global statements
+    statements += 1
+
+
+async def lookup(order_id: int) -> Order:
+    """get_by_id in a session of its own, like a handler"""
+    async with async_session_maker() as session:
+        return await OrderRepository.get_by_id(session, order_id)
+
+
+async def main():
+    global statements
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=20_000)
+    parser.add_argument("--misses", type=int, default=500)
+    args = parser.parse_args()
+    
+    stats = await today_stats()
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        async with async_session_maker() as session:
+            await UserRepository.upsert_many(session, [{
+                "user_id": BENCH_CHAT,
+                "telegram_username": None,
+                "first_name": "Bench",
+                "last_name": None,
+                "language_preference": "ru",
+                "last_interaction": datetime.now(timezone.utc)
+            }])
+            order = await OrderRepository.create(session, dict(ORDER))
+        order_id, order_number = order.order_id, order.order_number
+        # Load partition ranges now, not inside the counted lookups
+        await order_partitions.bounds("order_id", 0)
+        
+        order_cache.clear()
+        statements = 0
+        found = await asyncio.gather(*(lookup(order_id) for _ in range(100)))
+        assert all(order.order_id == order_id for order in found)
+        print(f"100 concurrent cold lookups:        {statements} queries")
+        
+        statements = 0
+        async with async_session_maker() as session:
+            await OrderRepository.get_by_number(session, order_number)
+        print(f"Lookup by number after load by ID:  {statements} queries")
+        
+        async with async_session_maker() as session:
+            await OrderRepository.update_status(
+                session, order_id, "accepted", expected_status="pending", commit=False
+            )
+            await session.commit()
+        print(f"Status read after accept + commit:  {(await lookup(order_id)).status}")
+        
+        (await lookup(order_id)).items_details.append({"size": "changed"})
+        print(f"items_details after changing a hit: {(await lookup(order_id)).items_details}")
+        
+        async with async_session_maker() as session:
+            started = time.perf_counter()
+            for _ in range(args.hits):
+                await OrderRepository.get_by_id(session, order_id)
+            hit = (time.perf_counter() - started) / args.hits
+            
+            started = time.perf_counter()
+            for _ in range(args.misses):
+                order_cache.invalidate(order_id)
+                await OrderRepository.get_by_id(session, order_id)
+            miss = (time.perf_counter() - started) / args.misses
+        print(f"\nHit:  {hit * 1e6:7.1f} us")
+        print(f"Miss: {miss * 1e6:7.1f} us")
+        
+        values = OrderCache._snapshot(await lookup(order_id))
+        started = time.perf_counter()
+        for _ in range(args.hits):
+            OrderCache._hydrate(values)
+        hydrate = (time.perf_counter() - started) / args.hits
+        started = time.perf_counter()
+        for _ in range(args.hits):
+            Order(**values)
+        construct = (time.perf_counter() - started) / args.hits
+        print(f"Hydrating a hit: {hydrate * 1e6:.1f} us, Order(**values): {construct * 1e6:.1f} us")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statements)
+        order_cache.clear()
+        await cleanup(stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
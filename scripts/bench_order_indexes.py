@@ -0,0 +1,168 @@
+"""
+Order Index Benchmark
+=====================
+Hot order queries before and after the 0003 indexes
+
+Migrates an empty scratch database to revision 0002 and seeds it with
+--users users, --orders orders and one status history row per order.
+It then times the three queries 0003 adds indexes for ("my orders",
+admin status queues, history of an order) with random parameters. After
+that it upgrades to 0003, prints how long building the indexes took and
+times the queries again. The database is left at 0003 with the seeded
+rows - drop it afterwards.
+
+Usage:
+    python scripts/bench_order_indexes.py --database-url URL [--users 50000] [--orders 1000000] [--runs 200]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from config import settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SEED = [
+    """
+    INSERT INTO users (user_id, first_name, is_blocked)
+    SELECT g, 'User ' || g, false FROM generate_series(1, :users) g
+    """,
+    # 1% pending, 1% accepted, 1% in progress, the rest done
+    """
+    INSERT INTO orders (
+        order_number, user_id, service_type, language, items_count, items_details,
+        customer_name, phone_number, address_type, discount_amount, status, created_at
+    )
+    SELECT g, 1 + floor(random() * :users)::int, 'carpet', 'ru', 1, '[]',
+           'Customer', '+998900000000', 'manual', 0,
+           CASE WHEN r < 0.01 THEN 'pending' WHEN r < 0.02 THEN 'accepted'
+                WHEN r < 0.03 THEN 'in_progress' WHEN r < 0.9 THEN 'completed'
+                ELSE 'cancelled' END,
+           now() - random() * interval '365 days'
+    FROM (SELECT g, random() AS r FROM generate_series(1, :orders) g) seed
+    """,
+    """
+    INSERT INTO order_status_history (order_id, new_status, changed_at)
+    SELECT order_id, status, created_at FROM orders
+    """,
+    "ANALYZE users",
+    "ANALYZE orders",
+    "ANALYZE order_status_history",
+]
+
+
+def queries(users: int, orders: int) -> Dict[str, Tuple[str, Callable[[], dict]]]:
+    """Query name: (SQL, random parameters)"""
+    return {
+        "user_id=? ORDER BY created_at DESC L10": (
+            "SELECT * FROM orders WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 10",
+            lambda: {"user_id": random.randint(1, users)}
+        ),
+        "status=? ORDER BY created_at L20": (
+            "SELECT * FROM orders WHERE status = :status ORDER BY created_at LIMIT 20",
+            lambda: {"status": random.choice(["pending", "accepted", "in_progress"])}
+        ),
+        "history WHERE order_id=?": (
+            "SELECT * FROM order_status_history WHERE order_id = :order_id",
+            lambda: {"order_id": random.randint(1, orders)}
+        ),
+    }
+
+
+def use_database(url: str) -> None:
+    """Point settings, and so Alembic, at the scratch database"""
+    parsed = make_url(url)
+    settings.db_host = parsed.host or settings.db_host
+    settings.db_port = parsed.port or settings.db_port
+    settings.db_name = parsed.database
+    settings.db_user = parsed.username or settings.db_user
+    settings.db_password = parsed.password or settings.db_password
+
+
+async def check_empty(engine: AsyncEngine) -> None:
+    """Refuse to run on a database that already has tables"""
+    async with engine.connect() as conn:
+        tables = await conn.scalar(text(
+            "SELECT count(*) FROM information_schema.tables WHERE table_schema = 'public'"
+        ))
+    if tables:
+        sys.exit(f"{settings.db_name} is not empty, use a new scratch database")
+
+
+async def seed(engine: AsyncEngine, users: int, orders: int) -> None:
+    """Insert users, orders and history"""
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        for statement in SEED:
+            await conn.execute(text(statement), {"users": users, "orders": orders})
+    print(f"Seeded {users} users, {orders} orders and history in {time.perf_counter() - started:.1f} s")
+
+
+async def measure(engine: AsyncEngine, label: str, users: int, orders: int, runs: int) -> None:
+    """Print the scan each query uses and its median latency"""
+    print(f"\n{label}")
+    async with engine.connect() as conn:
+        for name, (sql, params) in queries(users, orders).items():
+            plan = (await conn.execute(text(f"EXPLAIN (COSTS OFF) {sql}"), params())).scalars().all()
+            scan = next(line.strip(" ->") for line in plan if "Scan" in line)
+            latencies: List[float] = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await conn.execute(text(sql), params())
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(f"  {name:40s} {statistics.median(latencies):8.2f} ms  {scan}")
+
+
+async def run(args: argparse.Namespace, step: str) -> None:
+    """One step on a fresh engine, Alembic runs between them"""
+    engine = create_async_engine(settings.database_url)
+    try:
+        if step == "check":
+            await check_empty(engine)
+        elif step == "seed":
+            await seed(engine, args.users, args.orders)
+        else:
+            await measure(engine, step, args.users, args.orders, args.runs)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Empty scratch database")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    use_database(args.database_url)
+    
+    alembic = Config(str(ROOT / "alembic.ini"))
+    alembic.set_main_option("script_location", str(ROOT / "alembic"))
+    
+    asyncio.run(run(args, "check"))
+    command.upgrade(alembic, "0002")
+    asyncio.run(run(args, "seed"))
+    asyncio.run(run(args, "Revision 0002 (no indexes)"))
+    
+    started = time.perf_counter()
+    command.upgrade(alembic, "0003")
+    print(f"\nUpgrade to 0003 (sequence and indexes) took {time.perf_counter() - started:.1f} s")
+    asyncio.run(run(args, "Revision 0003"))
+
+
+if __name__ == "__main__":
+    main()
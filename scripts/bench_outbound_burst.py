@@ -0,0 +1,142 @@
+"""
+Outbound Burst Benchmark
+========================
+A notification burst sent directly and through the outbound queue
+
+Sends a burst through a fake Telegram that answers 429 (retry after
+1 s) once 30 calls fall in any one-second window or 15 in any ten
+seconds to one chat, with --rtt-ms per call: --orders x --admins admin
+notifications in the admin lane, then --customers customer replies
+--customer-delay seconds later. Runs it once on a bare bot and once
+with OutboundQueue configured from the OUTBOUND_* settings, and prints
+delivered and lost calls, 429 responses, the total time and the p50 and
+max latency of each lane. No database or Telegram access.
+
+Usage:
+    python scripts/bench_outbound_burst.py [--orders 10] [--admins 15] [--customers 30]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Chat, Message
+
+from config import settings
+from services.outbound import PRIORITY_ADMIN, OutboundQueue, send_priority
+
+FIRST_ADMIN = 1000
+FIRST_CUSTOMER = 5000
+
+
+class RateLimitedTelegram(BaseSession):
+    """Fake Telegram enforcing the global and per-chat send limits"""
+    
+    def __init__(self, rtt: float):
+        super().__init__()
+        self.rtt = rtt
+        self.sent: Deque[float] = deque()
+        self.sent_to: Dict[int, Deque[float]] = defaultdict(deque)
+        self.delivered = 0
+        self.rejected = 0
+    
+    async def close(self) -> None:
+        pass
+    
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+    
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(self.rtt)
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] > 1:
+            self.sent.popleft()
+        chat = self.sent_to[method.chat_id]
+        while chat and now - chat[0] > 10:
+            chat.popleft()
+        if len(self.sent) >= 30 or len(chat) >= 15:
+            self.rejected += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=1)
+        self.sent.append(now)
+        chat.append(now)
+        self.delivered += 1
+        return Message(message_id=1, date=datetime.now(), chat=Chat(id=method.chat_id, type="private"), text="x")
+
+
+def percentiles(latencies: List[float]) -> str:
+    """p50 and max in ms"""
+    if not latencies:
+        return "-"
+    latencies = sorted(latencies)
+    return f"p50 {latencies[len(latencies) // 2] * 1000:5.0f} ms, max {latencies[-1] * 1000:5.0f} ms"
+
+
+async def burst(args: argparse.Namespace, queued: bool) -> None:
+    """Send one burst and print what arrived"""
+    session = RateLimitedTelegram(args.rtt_ms / 1000)
+    bot = Bot("42:TEST", session=session)
+    if queued:
+        bot.session.middleware(OutboundQueue(
+            global_rate=settings.outbound_global_rate,
+            chat_rate=settings.outbound_chat_rate,
+            chat_burst=settings.outbound_chat_burst,
+            group_per_minute=settings.outbound_group_per_minute,
+            max_retries=settings.outbound_max_retries
+        ))
+    latencies: Dict[str, List[float]] = {"admin": [], "customer": []}
+    lost = 0
+    
+    async def send(chat_id: int, lane: str) -> None:
+        nonlocal lost
+        started = time.monotonic()
+        try:
+            if lane == "admin":
+                with send_priority(PRIORITY_ADMIN):
+                    await bot.send_message(chat_id, "New order")
+            else:
+                await bot.send_message(chat_id, "Reply")
+            latencies[lane].append(time.monotonic() - started)
+        except TelegramRetryAfter:
+            lost += 1
+    
+    started = time.monotonic()
+    tasks = [
+        asyncio.create_task(send(FIRST_ADMIN + admin, "admin"))
+        for _ in range(args.orders) for admin in range(args.admins)
+    ]
+    await asyncio.sleep(args.customer_delay)
+    tasks += [asyncio.create_task(send(FIRST_CUSTOMER + customer, "customer")) for customer in range(args.customers)]
+    await asyncio.gather(*tasks)
+    
+    total = len(tasks)
+    print(f"{'with queue' if queued else 'direct':10s}  {session.delivered}/{total} delivered, {lost} lost, "
+          f"{session.rejected} x 429, {time.monotonic() - started:.1f} s total")
+    print(f"            customer replies {percentiles(latencies['customer'])}")
+    print(f"            admin fan-out    {percentiles(latencies['admin'])}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10)
+    parser.add_argument("--admins", type=int, default=15)
+    parser.add_argument("--customers", type=int, default=30)
+    parser.add_argument("--customer-delay", type=float, default=0.3)
+    parser.add_argument("--rtt-ms", type=float, default=20)
+    args = parser.parse_args()
+    
+    await burst(args, queued=False)
+    await burst(args, queued=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,240 @@
+"""
+Partitioned Orders Benchmark
+============================
+Monthly partitions of orders against one flat table
+
+Migrates an empty scratch database to head, creates the monthly
+partitions of the last --months months and seeds --users users and
+--orders orders spread evenly over them, order IDs growing with
+created_at as in production. orders_flat, a plain table with the same
+columns and indexes (LIKE orders INCLUDING ALL), gets a copy of the
+rows. Both are vacuumed and analyzed, then the script prints medians
+of --runs prepared statement round trips for:
+- a lookup by order ID, on the partitioned table with and without the
+  created_at bounds the repository adds (OrderPartitionMap);
+- the first "my orders" page and a page older than a random order of the
+  user, with and without the plain created_at bound list_user_orders adds;
+the sizes of the current month's indexes against the flat table's, and
+how long VACUUM takes after updating 20% of the current month's rows.
+The database is left with the seeded rows - drop it afterwards.
+
+Usage:
+    python scripts/bench_partitions.py --database-url URL [--users 200000] [--orders 10000000] [--months 24] [--runs 500]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from config import settings
+from database.partitions import PARTITIONED_TABLES, add_months, month_start, partition_name
+from scripts.bench_order_indexes import check_empty, use_database
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SEED = [
+    """
+    INSERT INTO users (user_id, first_name, is_blocked)
+    SELECT g, 'User ' || g, false FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO orders (
+        user_id, service_type, language, items_count, items_details,
+        customer_name, phone_number, address_type, discount_amount, status, created_at
+    )
+    SELECT 1 + floor(random() * :users)::int, 'carpet', 'ru', 1, '[]',
+           'Customer', '+998900000000', 'manual', 0, 'completed',
+           CAST(:start AS timestamptz) + (now() - CAST(:start AS timestamptz)) * ((g - 1) / CAST(:orders AS float8))
+    FROM generate_series(1, :orders) g
+    """,
+    "CREATE TABLE orders_flat (LIKE orders INCLUDING ALL)",
+    "INSERT INTO orders_flat SELECT * FROM orders ORDER BY order_id",
+]
+
+LIST_COLUMNS = "order_id, order_number, status, service_type, created_at"
+QUERIES = {
+    "lookup by ID, flat": "SELECT * FROM orders_flat WHERE order_id = :order_id",
+    "lookup by ID, partitioned": "SELECT * FROM orders WHERE order_id = :order_id",
+    "lookup by ID, partitioned + bounds": (
+        "SELECT * FROM orders WHERE order_id = :order_id "
+        "AND created_at >= :lower AND created_at < :upper"
+    ),
+    "first page, flat": (
+        f"SELECT {LIST_COLUMNS} FROM orders_flat WHERE user_id = :user_id "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11"
+    ),
+    "first page, partitioned": (
+        f"SELECT {LIST_COLUMNS} FROM orders WHERE user_id = :user_id "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11"
+    ),
+    "deep page, flat": (
+        f"SELECT {LIST_COLUMNS} FROM orders_flat WHERE user_id = :user_id "
+        "AND (created_at, order_id) < (:created_at, :order_id) "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11"
+    ),
+    "deep page, partitioned": (
+        f"SELECT {LIST_COLUMNS} FROM orders WHERE user_id = :user_id "
+        "AND (created_at, order_id) < (:created_at, :order_id) "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11"
+    ),
+    "deep page, partitioned + bound": (
+        f"SELECT {LIST_COLUMNS} FROM orders WHERE user_id = :user_id "
+        "AND (created_at, order_id) < (:created_at, :order_id) AND created_at <= :created_at "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11"
+    ),
+}
+
+
+async def create_partitions(conn: AsyncConnection, first: datetime, last: datetime) -> None:
+    """Create the missing monthly partitions from first to last month"""
+    for table in PARTITIONED_TABLES:
+        month = first
+        while month <= last:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            month = add_months(month, 1)
+
+
+async def seed(engine: AsyncEngine, args: argparse.Namespace, start: datetime) -> None:
+    """Create partitions, insert users and orders and copy them to orders_flat"""
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await create_partitions(conn, start, month_start(datetime.now(timezone.utc)))
+        params = {"users": args.users, "orders": args.orders, "start": start}
+        for statement in SEED:
+            await conn.execute(text(statement), params)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("users", "orders", "orders_flat"):
+            await conn.execute(text(f"VACUUM ANALYZE {table}"))
+    print(f"Seeded {args.users} users and {args.orders} orders over {args.months} months "
+          f"in {time.perf_counter() - started:.0f} s")
+
+
+async def sample(conn: AsyncConnection, count: int) -> List[Dict]:
+    """Random orders to look up and page from"""
+    result = await conn.execute(
+        text("SELECT order_id, user_id, created_at FROM orders_flat ORDER BY random() LIMIT :count"),
+        {"count": count}
+    )
+    orders = []
+    for order_id, user_id, created_at in result:
+        lower = month_start(created_at)
+        orders.append({
+            "order_id": order_id,
+            "user_id": user_id,
+            "created_at": created_at,
+            "lower": lower,
+            "upper": add_months(lower, 1)
+        })
+    return orders
+
+
+async def measure(engine: AsyncEngine, runs: int) -> None:
+    """Print the median round trip of every query"""
+    print(f"\nMedian of {runs} runs:")
+    async with engine.connect() as conn:
+        orders = await sample(conn, runs)
+        for name, sql in QUERIES.items():
+            statement = text(sql)
+            # Past asyncpg's statement cache warm-up and PostgreSQL's 5 custom plans
+            for order in orders[:10]:
+                await conn.execute(statement, order)
+            latencies: List[float] = []
+            for order in orders:
+                started = time.perf_counter()
+                await conn.execute(statement, order)
+                latencies.append((time.perf_counter() - started) * 1e6)
+            print(f"  {name:36s} {statistics.median(latencies):8.0f} us")
+
+
+async def index_sizes(conn: AsyncConnection, table: str) -> List[Tuple[str, int]]:
+    """Names and sizes of a table's indexes"""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, pg_relation_size(i.indexrelid) FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = CAST(:table AS regclass) ORDER BY c.relname"
+        ),
+        {"table": table}
+    )
+    return list(result.all())
+
+
+async def compare_hot_month(engine: AsyncEngine) -> None:
+    """Index sizes and VACUUM of the current month against orders_flat"""
+    hot_month = month_start(datetime.now(timezone.utc))
+    hot = partition_name("orders", hot_month)
+    async with engine.connect() as conn:
+        print(f"\nIndexes of {hot} against orders_flat:")
+        for (name, size), (flat_name, flat_size) in zip(
+            await index_sizes(conn, hot), await index_sizes(conn, "orders_flat")
+        ):
+            print(f"  {name:50s} {size / 2**20:7.1f} MB   {flat_name:44s} {flat_size / 2**20:7.1f} MB")
+    
+    print("\nVACUUM after updating 20% of the current month:")
+    for table in (hot, "orders_flat"):
+        async with engine.begin() as conn:
+            await conn.execute(text(f"ALTER TABLE {table} SET (autovacuum_enabled = false)"))
+            updated = await conn.execute(
+                text(f"UPDATE {table} SET admin_notes = 'bench' WHERE created_at >= :hot AND order_id % 5 = 0"),
+                {"hot": hot_month}
+            )
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            started = time.perf_counter()
+            await conn.execute(text(f"VACUUM {table}"))
+            print(f"  {table:24s} {updated.rowcount} rows updated, VACUUM {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+async def run(args: argparse.Namespace, step: str) -> None:
+    """One step on a fresh engine, Alembic runs between them"""
+    engine = create_async_engine(settings.database_url)
+    try:
+        if step == "check":
+            await check_empty(engine)
+        elif step == "seed":
+            start = add_months(month_start(datetime.now(timezone.utc)), 1 - args.months)
+            await seed(engine, args, start)
+        else:
+            await measure(engine, args.runs)
+            await compare_hot_month(engine)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Empty scratch database")
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--orders", type=int, default=10_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+    use_database(args.database_url)
+    
+    alembic = Config(str(ROOT / "alembic.ini"))
+    alembic.set_main_option("script_location", str(ROOT / "alembic"))
+    
+    asyncio.run(run(args, "check"))
+    command.upgrade(alembic, "head")
+    asyncio.run(run(args, "seed"))
+    asyncio.run(run(args, "measure"))
+
+
+if __name__ == "__main__":
+    main()
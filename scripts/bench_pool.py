@@ -0,0 +1,83 @@
+"""
+Connection Pool Benchmark
+=========================
+Session + order lookup latency with NullPool vs the warmed queue pool
+
+Runs OrderRepository.get_by_id in short sequential sessions, the way
+handlers use the database, once on an engine with NullPool and
+pre-ping (the setup before the queue pool) and once on the bot's
+engine after warm_pool(). Uses the database in .env.
+
+Usage:
+    python scripts/bench_pool.py [--sessions 300]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from database.database import dispose_engine, engine, warm_pool
+from database.models import Order
+from database.order_cache import order_cache
+from database.repository import OrderRepository
+
+
+async def measure(target: AsyncEngine, sessions: int, order_id: int) -> List[float]:
+    """
+    Open a session and look up one order, `sessions` times in a row
+    
+    Returns:
+        Per-session latencies in seconds
+    """
+    maker = async_sessionmaker(target, class_=AsyncSession, expire_on_commit=False)
+    latencies = []
+    for _ in range(sessions):
+        # Every lookup must reach the database
+        order_cache.invalidate(order_id)
+        started = time.perf_counter()
+        async with maker() as session:
+            await OrderRepository.get_by_id(session, order_id)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summary(latencies: List[float]) -> str:
+    """Percentiles line"""
+    latencies = sorted(latencies)
+    
+    def pick(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    
+    return f"p50 {pick(0.5):6.2f} ms  p99 {pick(0.99):6.2f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300)
+    args = parser.parse_args()
+    
+    async with engine.connect() as conn:
+        order_id = (await conn.execute(select(Order.order_id).limit(1))).scalar() or 0
+    await dispose_engine()
+    
+    unpooled = create_async_engine(settings.database_url, poolclass=NullPool, pool_pre_ping=True)
+    print(f"NullPool + pre_ping  {summary(await measure(unpooled, args.sessions, order_id))}")
+    await unpooled.dispose()
+    
+    await warm_pool()
+    print(f"warmed QueuePool     {summary(await measure(engine, args.sessions, order_id))}")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
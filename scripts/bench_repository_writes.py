@@ -0,0 +1,145 @@
+"""
+Repository Write Benchmark
+==========================
+Statements and latency per repository write
+
+Records the statements each call sends (engine cursor and transaction
+events) and its latency, for the writes handlers make on every order:
+user upsert, order insert, status change and feedback. Runs against the
+database in .env as user BENCH_USER, then deletes its rows and restores
+today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_repository_writes.py [--calls 200]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, event, func, insert, select
+
+from database.database import async_session_maker, dispose_engine, engine
+from database.models import DailyStat, Order, OrderStatusHistory, User
+from database.partitions import order_partitions
+from database.repository import OrderRepository, UserRepository
+
+BENCH_USER = 990_000_777
+
+ORDER = {
+    "user_id": BENCH_USER,
+    "service_type": "carpet",
+    "language": "ru",
+    "items_count": 1,
+    "items_details": [{"size": "2x3"}],
+    "total_area_m2": 6,
+    "customer_name": "Bench",
+    "phone_number": "+998901234567",
+    "address_type": "manual",
+    "address_text": "Tashkent",
+    "total_cost": 150000,
+    "discount_amount": 0,
+    "final_cost": 150000,
+    "status": "pending"
+}
+
+statements: List[str] = []
+
+
+def record_statements() -> None:
+    """Collect the first keyword of every statement, plus BEGIN and COMMIT"""
+    target = engine.sync_engine
+    event.listen(target, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+    event.listen(target, "begin", lambda conn: statements.append("BEGIN"))
+    event.listen(target, "commit", lambda conn: statements.append("COMMIT"))
+
+
+async def measure(
+    label: str,
+    call: Callable[[object, int], Awaitable[object]],
+    calls: int
+) -> list:
+    """
+    Run call in a fresh session `calls` times, print statements and latency
+    
+    Returns:
+        Call results
+    """
+    latencies: List[float] = []
+    results = []
+    sent: Tuple[str, ...] = ()
+    for index in range(calls):
+        statements.clear()
+        started = time.perf_counter()
+        async with async_session_maker() as session:
+            results.append(await call(session, index))
+        latencies.append(time.perf_counter() - started)
+        sent = sent or tuple(statements)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{label:24s} {' '.join(sent):40s} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    
+    async with engine.connect() as conn:
+        today_stats = [
+            dict(row._mapping) for row in await conn.execute(
+                select(DailyStat.__table__).where(DailyStat.stat_date == func.current_date())
+            )
+        ]
+    # Load partition ranges now, not inside the first measured call
+    await order_partitions.bounds("order_id", 0)
+    record_statements()
+    
+    try:
+        await measure(
+            "create_or_update",
+            lambda session, index: UserRepository.create_or_update(
+                session, BENCH_USER, "bench", "Bench", None, "ru"
+            ),
+            args.calls
+        )
+        orders = await measure(
+            "OrderRepository.create",
+            lambda session, index: OrderRepository.create(session, dict(ORDER)),
+            args.calls
+        )
+        await measure(
+            "update_status",
+            lambda session, index: OrderRepository.update_status(
+                session, orders[index].order_id, "cancelled", expected_status="pending"
+            ),
+            args.calls
+        )
+        await measure(
+            "save_feedback_by_number",
+            lambda session, index: OrderRepository.save_feedback_by_number(
+                session, orders[index].order_number, 5, "great"
+            ),
+            args.calls
+        )
+    finally:
+        async with engine.begin() as conn:
+            user_orders = select(Order.order_id).where(Order.user_id == BENCH_USER)
+            await conn.execute(delete(OrderStatusHistory).where(OrderStatusHistory.order_id.in_(user_orders)))
+            await conn.execute(delete(Order).where(Order.user_id == BENCH_USER))
+            await conn.execute(delete(User).where(User.user_id == BENCH_USER))
+            await conn.execute(delete(DailyStat).where(DailyStat.stat_date == func.current_date()))
+            if today_stats:
+                await conn.execute(insert(DailyStat), today_stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
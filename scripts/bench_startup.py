@@ -0,0 +1,111 @@
+"""
+Startup Benchmark
+=================
+Time from process launch to the first handled update
+
+Launches a fresh interpreter --runs times. Each one imports the bot, runs
+on_startup against the database in .env, feeds one /start update
+through the dispatcher with the fake Telegram session from
+scripts/order_flow.py and shuts down. Reports the medians of the SQL
+statements and time of init_db's schema check and pricing seed (cold
+pool, up to the pool warm-up), of the whole on_startup and of launch to
+first update. The
+benchmark chat's rows are removed after every run and today's
+daily_stats restored - use a development database.
+
+Usage:
+    python scripts/bench_startup.py [--runs 15]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def child() -> None:
+    """One launch, prints 'READY <epoch> <schema statements> <schema ms> <on_startup ms>'"""
+    import bot as bot_module
+    from aiogram.types import Update
+    from sqlalchemy import event
+    
+    from database import database as db
+    from database.database import dispose_engine, engine
+    from scripts.order_flow import cleanup, customer_message, make_bot, today_stats
+    
+    logging.disable(logging.CRITICAL)
+    statements = 0
+    
+    def count(*args) -> None:
+        nonlocal statements
+        statements += 1
+    
+    init_db, warm_pool = bot_module.init_db, db.warm_pool
+    init = {}
+    
+    async def timed_init_db() -> None:
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        init["started"] = time.perf_counter()
+        await init_db()
+    
+    async def stop_counting() -> None:
+        # init_db ends with the pool warm-up, it is timed with on_startup
+        init["ms"] = (time.perf_counter() - init["started"]) * 1000
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+        await warm_pool()
+    
+    bot_module.init_db = timed_init_db
+    db.warm_pool = stop_counting
+    bot = make_bot()
+    dp = bot_module.create_dispatcher()
+    
+    started = time.perf_counter()
+    await bot_module.on_startup(bot, dispatcher=dp)
+    startup_ms = (time.perf_counter() - started) * 1000
+    await dp.feed_update(bot, Update(update_id=1, message=customer_message("/start")))
+    print(f"READY {time.time():.6f} {statements} {init['ms']:.2f} {startup_ms:.2f}", flush=True)
+    
+    stats = await today_stats()
+    await bot_module.on_shutdown(bot, dispatcher=dp)
+    await cleanup(stats)
+    await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        asyncio.run(child())
+        return
+    
+    results = []
+    for _ in range(args.runs):
+        launched = time.time()
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"],
+            capture_output=True, text=True, check=True
+        ).stdout
+        ready = next(line for line in output.splitlines() if line.startswith("READY")).split()
+        results.append((
+            int(ready[2]), float(ready[3]), float(ready[4]), (float(ready[1]) - launched) * 1000
+        ))
+    
+    statements, init_ms, startup_ms, first_update_ms = zip(*results)
+    print(f"Runs: {args.runs}, medians")
+    print(f"  schema check and seed SQL       {statistics.median(statements):8.0f}")
+    print(f"  schema check and seed           {statistics.median(init_ms):8.1f} ms")
+    print(f"  on_startup incl. pool warm-up   {statistics.median(startup_ms):8.1f} ms")
+    print(f"  process launch -> first update  {statistics.median(first_update_ms):8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Stats Rollups Benchmark
+=======================
+daily_stats increments of order changes and cost of the /stats report
+
+Creates a benchmark admin and, for the benchmark customer of
+scripts/order_flow.py, runs each kind of change that updates the
+daily_stats rollups:
+- the customer's first and second upsert (only the first is a new user);
+- a carpet order and a sofa order;
+- accept, start and complete the carpet order, complete it again
+  (rejected) and cancel the sofa order;
+- rate the carpet order 3, then 5, and the cancelled sofa order.
+Prints the change of every daily_stats row against the expected one,
+then the time to build the /stats report from the rollups and to serve
+it from memory. Runs against the database in .env, then deletes its
+rows and restores today's daily_stats - use a development database.
+
+Usage:
+    python scripts/bench_stats.py [--builds 200] [--hits 20000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, func, select
+
+from database.database import async_session_maker, dispose_engine
+from database.models import Admin, DailyStat
+from database.repository import OrderRepository, UserRepository
+from scripts.order_flow import BENCH_CHAT, cleanup, today_stats
+from services.stats_report import StatsReport
+
+# Admin ID of the benchmark, never a real operator
+ADMIN_ID = 990_000_777
+COUNTERS = (
+    "total_orders", "accepted_orders", "completed_orders", "cancelled_orders",
+    "total_revenue", "rating_sum", "rating_count", "new_users"
+)
+
+# Changes main() makes, by (service_type, admin_id); orders are
+# counted without an admin, ratings go to the admin who accepted
+EXPECTED = {
+    ("", 0): {"new_users": 1.0},
+    ("carpet", 0): {"total_orders": 1.0},
+    ("carpet", ADMIN_ID): {
+        "accepted_orders": 1.0, "completed_orders": 1.0, "total_revenue": 150000.0,
+        "rating_sum": 5.0, "rating_count": 1.0
+    },
+    ("sofa", 0): {"total_orders": 1.0, "rating_sum": 4.0, "rating_count": 1.0},
+    ("sofa", ADMIN_ID): {"cancelled_orders": 1.0}
+}
+
+ORDER = {
+    "user_id": BENCH_CHAT,
+    "service_type": "carpet",
+    "language": "ru",
+    "items_count": 1,
+    "items_details": [{"size": "2x3", "area_m2": 6}],
+    "customer_name": "Bench",
+    "phone_number": "+998901234567",
+    "address_type": "manual",
+    "address_text": "Tashkent",
+    "total_cost": 150000,
+    "discount_amount": 0,
+    "final_cost": 150000
+}
+
+
+async def counters() -> Dict[Tuple[str, int], Dict[str, float]]:
+    """Today's daily_stats counters by (service_type, admin_id)"""
+    async with async_session_maker() as session:
+        result = await session.execute(select(DailyStat).where(DailyStat.stat_date == func.current_date()))
+        return {
+            (stat.service_type, stat.admin_id): {name: float(getattr(stat, name)) for name in COUNTERS}
+            for stat in result.scalars()
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--builds", type=int, default=200)
+    parser.add_argument("--hits", type=int, default=20_000)
+    args = parser.parse_args()
+    
+    stats = await today_stats()
+    before = await counters()
+    try:
+        async with async_session_maker() as session:
+            session.add(Admin(admin_id=ADMIN_ID, full_name="Bench", role="operator"))
+            await session.commit()
+            
+            user = {
+                "user_id": BENCH_CHAT,
+                "telegram_username": None,
+                "first_name": "Bench",
+                "last_name": None,
+                "language_preference": "ru",
+                "last_interaction": datetime.now(timezone.utc)
+            }
+            await UserRepository.upsert_many(session, [user])
+            await UserRepository.upsert_many(session, [user])
+            carpet = await OrderRepository.create(session, dict(ORDER))
+            sofa = await OrderRepository.create(session, dict(ORDER, service_type="sofa"))
+            
+            for status, expected in (("accepted", "pending"), ("in_progress", "accepted"), ("completed", "in_progress")):
+                await OrderRepository.update_status(session, carpet.order_id, status, ADMIN_ID, expected_status=expected)
+            repeated = await OrderRepository.update_status(
+                session, carpet.order_id, "completed", ADMIN_ID, expected_status="in_progress"
+            )
+            await OrderRepository.update_status(session, sofa.order_id, "cancelled", ADMIN_ID)
+            await OrderRepository.save_feedback_by_number(session, carpet.order_number, 3)
+            await OrderRepository.save_feedback_by_number(session, carpet.order_number, 5)
+            await OrderRepository.save_feedback(session, sofa.order_id, 4)
+        
+        after = await counters()
+        print(f"Repeated completion: {repeated.outcome}")
+        print("daily_stats changes:")
+        for key in sorted(set(before) | set(after), key=str):
+            old = before.get(key, dict.fromkeys(COUNTERS, 0.0))
+            new = after.get(key, dict.fromkeys(COUNTERS, 0.0))
+            changed = {name: new[name] - old[name] for name in COUNTERS if new[name] != old[name]}
+            if changed or key in EXPECTED:
+                verdict = "ok" if changed == EXPECTED.get(key, {}) else f"expected {EXPECTED.get(key, {})}"
+                print(f"  {key}: {changed} {verdict}")
+        
+        async with async_session_maker() as session:
+            report = StatsReport(ttl=0)
+            started = time.perf_counter()
+            for _ in range(args.builds):
+                await report.render(session)
+            build = (time.perf_counter() - started) / args.builds
+            
+            report = StatsReport(ttl=3600)
+            await report.render(session)
+            started = time.perf_counter()
+            for _ in range(args.hits):
+                await report.render(session)
+            hit = (time.perf_counter() - started) / args.hits
+        print(f"\n/stats report: build {build * 1000:.2f} ms, cached {hit * 1e6:.1f} us")
+    finally:
+        await cleanup(stats)
+        async with async_session_maker() as session:
+            await session.execute(delete(Admin).where(Admin.admin_id == ADMIN_ID))
+            await session.commit()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+"""
+Update Delivery Benchmark
+=========================
+Polling vs webhook latency against a local fake Bot API server
+
+Every update is stamped when the fake server makes it available and
+again when the bot's reply (sendMessage) reaches the server, so the
+latency covers delivery, dispatch and the reply call. The handler only
+echoes, keeping the measurement on the delivery path. --delay-ms adds
+a one-way network delay to every request and webhook push.
+
+Usage:
+    python scripts/bench_update_delivery.py [--updates 2000] [--rate 200] [--delay-ms 0]
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import ClientSession, web
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+TOKEN = "42:BENCH"
+API_PORT = 18081
+WEBHOOK_PORT = 18082
+SECRET = "bench-secret"
+CHATS = 50
+
+
+class FakeBotAPI:
+    """Bot API server holding updates for getUpdates or pushing them to a webhook"""
+    
+    def __init__(self, delay: float, max_connections: int = 40):
+        self.delay = delay
+        self.max_connections = max_connections
+        self.webhook = False
+        self.queued: List[dict] = []
+        self.available = asyncio.Event()
+        self.sent_at: Dict[int, float] = {}
+        self.replied_at: Dict[int, float] = {}
+        self.done = asyncio.Event()
+        self.expected = 0
+        self._message_ids = itertools.count(1)
+        self._push_slots = asyncio.Semaphore(max_connections)
+        self.http: Optional[ClientSession] = None
+    
+    def app(self) -> web.Application:
+        """Application serving /bot<token>/<method>"""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        """Answer one Bot API call"""
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        await asyncio.sleep(self.delay)
+        if method == "getUpdates":
+            result = await self.get_updates(int(data.get("offset", 0)), float(data.get("timeout", 0)))
+        elif method == "sendMessage":
+            update_id = int(data["text"])
+            self.replied_at[update_id] = time.perf_counter()
+            if len(self.replied_at) >= self.expected:
+                self.done.set()
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data["text"]
+            }
+        elif method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        else:
+            result = True
+        await asyncio.sleep(self.delay)
+        return web.json_response({"ok": True, "result": result})
+    
+    async def get_updates(self, offset: int, timeout: float) -> List[dict]:
+        """Long poll: answer as soon as an update with id >= offset exists"""
+        self.queued = [update for update in self.queued if update["update_id"] >= offset]
+        if not self.queued:
+            self.available.clear()
+            try:
+                await asyncio.wait_for(self.available.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch, self.queued = self.queued[:100], self.queued[100:]
+        return batch
+    
+    def publish(self, update: dict) -> None:
+        """Make an update available, stamping its start time"""
+        self.sent_at[update["update_id"]] = time.perf_counter()
+        if self.webhook:
+            asyncio.create_task(self.push(update))
+        else:
+            self.queued.append(update)
+            self.available.set()
+    
+    async def push(self, update: dict) -> None:
+        """Deliver one update like Telegram does, at most max_connections at once"""
+        async with self._push_slots:
+            await asyncio.sleep(self.delay)
+            async with self.http.post(
+                f"http://127.0.0.1:{WEBHOOK_PORT}/webhook",
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            ) as response:
+                await response.read()
+
+
+def make_update(update_id: int) -> dict:
+    """Text message carrying its update ID, spread over CHATS chats"""
+    chat_id = 1000 + update_id % CHATS
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "user"},
+            "text": str(update_id)
+        }
+    }
+
+
+def make_dispatcher() -> Dispatcher:
+    """Dispatcher echoing every message"""
+    router = Router()
+    
+    @router.message()
+    async def echo(message: Message):
+        await message.answer(message.text)
+    
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def run_mode(mode: str, updates: int, rate: float, delay: float) -> List[float]:
+    """
+    Deliver updates in one mode
+    
+    Args:
+        mode: 'polling' or 'webhook'
+        updates: Number of updates
+        rate: Updates published per second
+        delay: One-way network delay in seconds
+        
+    Returns:
+        Per-update latencies in seconds
+    """
+    api = FakeBotAPI(delay)
+    api.webhook = mode == "webhook"
+    api.expected = updates
+    api.http = ClientSession()
+    api_runner = web.AppRunner(api.app())
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", API_PORT).start()
+    
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+    dp = make_dispatcher()
+    webhook_runner = None
+    if mode == "webhook":
+        app = web.Application()
+        SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=SECRET).register(app, path="/webhook")
+        webhook_runner = web.AppRunner(app)
+        await webhook_runner.setup()
+        await web.TCPSite(webhook_runner, "127.0.0.1", WEBHOOK_PORT).start()
+        receiver = None
+    else:
+        receiver = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=10))
+        await asyncio.sleep(0.5)
+    
+    for update_id in range(1, updates + 1):
+        api.publish(make_update(update_id))
+        await asyncio.sleep(1 / rate)
+    await asyncio.wait_for(api.done.wait(), 60)
+    # Let the last replies get their responses before tearing down
+    await asyncio.sleep(2 * delay + 0.2)
+    
+    if receiver:
+        await dp.stop_polling()
+        await receiver
+    if webhook_runner:
+        await webhook_runner.cleanup()
+    await bot.session.close()
+    await api.http.close()
+    await api_runner.cleanup()
+    return [api.replied_at[i] - api.sent_at[i] for i in api.replied_at]
+
+
+def summary(latencies: List[float]) -> str:
+    """Percentiles line"""
+    latencies = sorted(latencies)
+    
+    def pick(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    return (
+        f"p50 {pick(0.5):6.2f} ms  p95 {pick(0.95):6.2f} ms  "
+        f"p99 {pick(0.99):6.2f} ms  mean {statistics.mean(latencies) * 1000:6.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="updates per second")
+    parser.add_argument("--delay-ms", type=float, default=0, help="one-way network delay")
+    args = parser.parse_args()
+    
+    print(f"{args.updates} updates at {args.rate:g}/s, {CHATS} chats, one-way delay {args.delay_ms:g} ms")
+    for mode in ("polling", "webhook"):
+        latencies = await run_mode(mode, args.updates, args.rate, args.delay_ms / 1000)
+        print(f"{mode:8s} {summary(latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
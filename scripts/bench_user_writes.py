@@ -0,0 +1,113 @@
+"""
+User Write Benchmark
+====================
+Statements and time for users table writes, per update vs buffered
+
+Sends --rounds updates from each of --users benchmark users, once the
+way handlers wrote before the write buffer (UserRepository.
+create_or_update in a session of its own for every update) and once
+through a UserWriteBuffer configured from the USER_WRITE_* settings,
+closed at the end as on shutdown. Prints the statements each sent and
+the time until everything was written. Runs against the database in
+.env, then deletes its users and restores today's daily_stats - use a
+development database.
+
+Usage:
+    python scripts/bench_user_writes.py [--users 1000] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.types import User as TelegramUser
+from sqlalchemy import event, text
+
+from config import settings
+from database.database import async_session_maker, dispose_engine, engine
+from database.repository import UserRepository
+from scripts.order_flow import cleanup, today_stats
+from services.user_buffer import UserWriteBuffer
+
+# User IDs of the benchmark, never real users
+FIRST_USER = 990_100_000
+
+statements = 0
+
+
+def count_statements(*args) -> None:
+    """Count statements sent by the engine"""
+    global statements
+    statements += 1
+
+
+async def delete_users(count: int) -> None:
+    """Remove the benchmark users"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("DELETE FROM users WHERE user_id >= :first AND user_id < :last"),
+            {"first": FIRST_USER, "last": FIRST_USER + count}
+        )
+
+
+async def per_update(users: List[TelegramUser], rounds: int) -> None:
+    """One upsert per update"""
+    for _ in range(rounds):
+        for user in users:
+            async with async_session_maker() as session:
+                await UserRepository.create_or_update(
+                    session, user.id, user.username, user.first_name, user.last_name, "ru"
+                )
+
+
+async def buffered(users: List[TelegramUser], rounds: int) -> None:
+    """Updates touching the write buffer"""
+    buffer = UserWriteBuffer(
+        delay=settings.user_write_delay,
+        max_pending=settings.user_write_batch,
+        max_attempts=settings.user_write_max_attempts
+    )
+    for _ in range(rounds):
+        for user in users:
+            buffer.touch(user)
+            # Updates are handled one event loop step apart
+            await asyncio.sleep(0)
+    await buffer.close()
+
+
+async def main():
+    global statements
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    
+    users = [
+        TelegramUser(id=FIRST_USER + n, is_bot=False, first_name=f"User {n}", username=f"bench_{n}")
+        for n in range(args.users)
+    ]
+    updates = args.users * args.rounds
+    stats = await today_stats()
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        for label, write in (("per-update upserts", per_update), ("buffered", buffered)):
+            await delete_users(args.users)
+            statements = 0
+            started = time.perf_counter()
+            await write(users, args.rounds)
+            elapsed = time.perf_counter() - started
+            print(f"{label:20s} {updates} updates, {statements} statements, {elapsed:.2f} s")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statements)
+        await delete_users(args.users)
+        await cleanup(stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
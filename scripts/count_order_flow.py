@@ -0,0 +1,114 @@
+"""
+Order Flow Cost Report
+======================
+What one carpet order costs, per update of the order flow
+
+Runs the 15-update order flow from scripts/order_flow.py through the
+dispatcher and prints, per update and in total, the Bot API calls, the
+FSM storage operations and the database sessions handlers opened. API
+calls are counted by the fake session, storage operations by wrapping
+the backend's methods, sessions by the db.sessions_opened counter.
+Storage operations of the wizard message registry (MESSAGE_REGISTRY=fsm)
+go to the same backend and are listed apart from conversation state.
+answerCallbackQuery is listed but left out of the API call totals, every
+button tap needs exactly one. The order is written to the database in
+.env and the rows of the benchmark chat are removed afterwards.
+
+Usage:
+    python scripts/count_order_flow.py [--storage postgres]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.fsm.storage.base import BaseStorage
+
+import bot as bot_module
+from database.database import dispose_engine
+from database.fsm_storage import create_storage
+from services.message_registry import REGISTRY_DESTINY
+from scripts.order_flow import cleanup, make_bot, run_flow, today_stats
+from utils.metrics import metrics
+
+STORAGE_METHODS = (
+    "get_state", "get_data", "set_state", "set_data", "update_data", "get_record", "set_record"
+)
+
+storage_ops: Counter = Counter()
+registry_ops: Counter = Counter()
+
+
+def count_storage(storage: BaseStorage) -> BaseStorage:
+    """Count calls of the storage's read and write methods"""
+    def counted(name: str, method):
+        async def call(key, *args, **kwargs):
+            ops = registry_ops if key.destiny == REGISTRY_DESTINY else storage_ops
+            ops[name] += 1
+            return await method(key, *args, **kwargs)
+        return call
+    
+    for name in STORAGE_METHODS:
+        if hasattr(storage, name):
+            setattr(storage, name, counted(name, getattr(storage, name)))
+    return storage
+
+
+def describe(counts: Dict[str, int]) -> str:
+    """'3 (2 get_data, 1 set_data)' for non-zero counts"""
+    parts = ", ".join(f"{value} {name}" for name, value in sorted(counts.items()) if value)
+    return f"{sum(counts.values())} ({parts})" if parts else "0"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage", choices=("memory", "postgres"), default="postgres")
+    args = parser.parse_args()
+    # Handler logs would bury the report
+    logging.disable(logging.INFO)
+    
+    stats = await today_stats()
+    dp = bot_module.create_dispatcher(storage=count_storage(create_storage(args.storage)))
+    bot = make_bot()
+    # Calls made when the dispatcher or bot start up are not part of the order
+    bot.session.calls.clear()
+    seen_calls, seen_ops, seen_registry = Counter(), Counter(), Counter()
+    sessions_before = metrics.counters.get("db.sessions_opened", 0)
+    sessions_seen = sessions_before
+    
+    def on_step(label: str) -> None:
+        nonlocal sessions_seen
+        calls, ops = bot.session.calls - seen_calls, storage_ops - seen_ops
+        registry = registry_ops - seen_registry
+        seen_calls.update(calls)
+        seen_ops.update(ops)
+        seen_registry.update(registry)
+        sessions = metrics.counters.get("db.sessions_opened", 0)
+        print(f"{label}")
+        print(f"    api      {describe(calls)}")
+        print(f"    storage  {describe(ops)}")
+        print(f"    registry {describe(registry)}")
+        print(f"    sessions {sessions - sessions_seen}")
+        sessions_seen = sessions
+    
+    try:
+        await run_flow(dp, bot, on_step)
+        calls = dict(bot.session.calls)
+        answers = calls.pop("AnswerCallbackQuery", 0)
+        print(f"\nBot API calls: {describe(calls)}, plus {answers} answerCallbackQuery")
+        print(f"Storage operations: {describe(storage_ops)}")
+        print(f"Message registry storage operations: {describe(registry_ops)}")
+        print(f"Database sessions opened: {sessions_seen - sessions_before}")
+    finally:
+        await cleanup(stats)
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+"""
+Order Flow Driver
+=================
+Runs the carpet order wizard through the dispatcher without Telegram
+
+Shared by the scripts that count what one order costs. The flow is the
+15 updates a customer sends for a two-carpet order: /start, language,
+service, order now, quantity, two sizes with one custom, manual address,
+name, phone, comment and confirm. Buttons are tapped on the latest bot
+message, like a real client does. Bot API calls go to FakeSession, which
+counts them per method. The order is written to the database in .env as
+chat BENCH_CHAT; cleanup() deletes its rows and restores today's
+daily_stats.
+"""
+
+import itertools
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, GetMe, SendMessage, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from sqlalchemy import String, cast, delete, func, insert, select, text
+
+from database.database import engine
+from database.models import DailyStat, Order, OrderStatusHistory, OutboxMessage
+from services.user_buffer import user_buffer
+
+# Chat and user of the benchmark customer, never a real one
+BENCH_CHAT = 990_000_888
+# Bot ID of the fake token
+BOT_ID = 42
+
+CUSTOMER = User(id=BENCH_CHAT, is_bot=False, first_name="Bench", username="bench")
+
+_message_ids = itertools.count(1000)
+
+
+class FakeSession(BaseSession):
+    """Bot session answering every call locally and counting it per method"""
+    
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.last_message: Dict[int, int] = {}  # chat_id: message_id of the latest bot message
+    
+    async def close(self) -> None:
+        pass
+    
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+    
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, GetMe):
+            return User(id=BOT_ID, is_bot=True, first_name="bench", username="bench_bot")
+        if isinstance(method, SendMessage):
+            message = _message(method.chat_id, next(_message_ids), method.text).as_(bot)
+            self.last_message[method.chat_id] = message.message_id
+            return message
+        if isinstance(method, EditMessageText):
+            return _message(method.chat_id, method.message_id, method.text).as_(bot)
+        return True
+
+
+def _message(chat_id: int, message_id: int, text: str, from_user: Optional[User] = None) -> Message:
+    """Private chat message"""
+    return Message(
+        message_id=message_id,
+        date=datetime.now(),
+        chat=Chat(id=chat_id, type="private"),
+        from_user=from_user,
+        text=text
+    )
+
+
+def customer_message(text: str) -> Message:
+    """Message sent by the benchmark customer"""
+    return _message(BENCH_CHAT, next(_message_ids), text, CUSTOMER)
+
+
+def customer_tap(data: str) -> CallbackQuery:
+    """Button tap by the benchmark customer"""
+    return CallbackQuery(
+        id=str(next(_message_ids)),
+        from_user=CUSTOMER,
+        chat_instance="bench",
+        message=_message(BENCH_CHAT, next(_message_ids), "bench", CUSTOMER),
+        data=data
+    )
+
+
+FLOW: List[Tuple[str, Callable[[], Union[Message, CallbackQuery]]]] = [
+    ("/start", lambda: customer_message("/start")),
+    ("lang_ru", lambda: customer_tap("lang_ru")),
+    ("service_carpet", lambda: customer_tap("service_carpet")),
+    ("order_now", lambda: customer_tap("order_now")),
+    ("qty_2", lambda: customer_tap("qty_2")),
+    ("size_0_2x3", lambda: customer_tap("size_0_2x3")),
+    ("size_1_custom", lambda: customer_tap("size_1_custom")),
+    ("custom size", lambda: customer_message("3x4")),
+    ("address_manual", lambda: customer_tap("address_manual")),
+    ("address text", lambda: customer_message("Tashkent, Chilanzar 5, kv 12")),
+    ("name", lambda: customer_message("Bench Customer")),
+    ("phone", lambda: customer_message("+998901234567")),
+    ("add_comment", lambda: customer_tap("add_comment")),
+    ("comment", lambda: customer_message("Please call before")),
+    ("confirm_order", lambda: customer_tap("confirm_order")),
+]
+
+
+def make_bot() -> Bot:
+    """Bot talking to a new FakeSession"""
+    return Bot(token=f"{BOT_ID}:BENCH", session=FakeSession(), default=DefaultBotProperties(parse_mode="HTML"))
+
+
+async def run_flow(
+    dp: Dispatcher,
+    bot: Bot,
+    on_step: Optional[Callable[[str], None]] = None
+) -> None:
+    """
+    Feed the order flow to the dispatcher
+    
+    Args:
+        dp: Dispatcher built by bot.create_dispatcher
+        bot: Bot from make_bot
+        on_step: Called with the step label after each update
+    """
+    for update_id, (label, build) in enumerate(FLOW, start=1):
+        event = build()
+        if isinstance(event, CallbackQuery):
+            last_message = bot.session.last_message.get(BENCH_CHAT)
+            if last_message is not None:
+                event = event.model_copy(update={
+                    "message": event.message.model_copy(update={"message_id": last_message})
+                })
+            update = Update(update_id=update_id, callback_query=event)
+        else:
+            update = Update(update_id=update_id, message=event)
+        await dp.feed_update(bot, update)
+        if on_step is not None:
+            on_step(label)
+
+
+async def today_stats() -> List[Dict[str, Any]]:
+    """Today's daily_stats rows, to be passed to cleanup()"""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(DailyStat.__table__).where(DailyStat.stat_date == func.current_date())
+        )
+        return [dict(row._mapping) for row in result]
+
+
+async def cleanup(stats: List[Dict[str, Any]]) -> None:
+    """
+    Delete everything the flow wrote and restore daily_stats
+    
+    Args:
+        stats: today_stats() taken before the flow ran
+    """
+    await user_buffer.close()
+    async with engine.begin() as conn:
+        order_ids = select(Order.order_id).where(Order.user_id == BENCH_CHAT)
+        await conn.execute(
+            delete(OutboxMessage).where(
+                OutboxMessage.idempotency_key.like("order:%"),
+                func.split_part(OutboxMessage.idempotency_key, ":", 2).in_(
+                    select(cast(Order.order_id, String)).where(Order.user_id == BENCH_CHAT)
+                )
+            )
+        )
+        await conn.execute(delete(OrderStatusHistory).where(OrderStatusHistory.order_id.in_(order_ids)))
+        # Orders go with the user
+        await conn.execute(text("DELETE FROM users WHERE user_id = :chat"), {"chat": BENCH_CHAT})
+        await conn.execute(
+            text("DELETE FROM fsm_states WHERE storage_key LIKE :prefix"),
+            {"prefix": f"{BOT_ID}:{BENCH_CHAT}:%"}
+        )
+        await conn.execute(delete(DailyStat).where(DailyStat.stat_date == func.current_date()))
+        if stats:
+            await conn.execute(insert(DailyStat), stats)
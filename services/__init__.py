@@ -5,7 +5,35 @@ Export all services
 """
 
 from services.message_manager import message_manager, MessageManager
+from services.message_registry import (
+    MessageRegistry,
+    MemoryMessageRegistry,
+    StorageMessageRegistry,
+    WizardMessage,
+    create_message_registry
+)
+from services.outbound import (
+    OutboundQueue,
+    send_priority,
+    PRIORITY_CUSTOMER,
+    PRIORITY_ADMIN,
+    PRIORITY_BROADCAST
+)
+from services.outbox import (
+    OutboxDispatcher,
+    outbox_dispatcher,
+    NOTIFY_ADMINS_NEW_ORDER,
+    NOTIFY_CUSTOMER_ACCEPTED,
+    NOTIFY_CUSTOMER_IN_PROGRESS,
+    NOTIFY_CUSTOMER_COMPLETED
+)
+from services.draft_sweeper import DraftSweeper, create_draft_sweeper
+from services.user_buffer import UserWriteBuffer, user_buffer
+from services.stats_report import StatsReport, stats_report
+from services.partition_maintainer import PartitionMaintainer, partition_maintainer
 from services.admin_notifications import (
+    send_to_admins,
+    wait_pending_notifications,
     notify_admins_new_order,
     notify_customer_order_accepted,
     notify_customer_order_in_progress,
@@ -16,6 +44,32 @@ from services.admin_notifications import (
 __all__ = [
     'message_manager',
     'MessageManager',
+    'MessageRegistry',
+    'MemoryMessageRegistry',
+    'StorageMessageRegistry',
+    'WizardMessage',
+    'create_message_registry',
+    'OutboundQueue',
+    'send_priority',
+    'PRIORITY_CUSTOMER',
+    'PRIORITY_ADMIN',
+    'PRIORITY_BROADCAST',
+    'OutboxDispatcher',
+    'outbox_dispatcher',
+    'NOTIFY_ADMINS_NEW_ORDER',
+    'NOTIFY_CUSTOMER_ACCEPTED',
+    'NOTIFY_CUSTOMER_IN_PROGRESS',
+    'NOTIFY_CUSTOMER_COMPLETED',
+    'DraftSweeper',
+    'create_draft_sweeper',
+    'UserWriteBuffer',
+    'user_buffer',
+    'StatsReport',
+    'stats_report',
+    'PartitionMaintainer',
+    'partition_maintainer',
+    'send_to_admins',
+    'wait_pending_notifications',
     'notify_admins_new_order',
     'notify_customer_order_accepted',
     'notify_customer_order_in_progress',
@@ -4,54 +4,124 @@ Admin Notification Service
 Handles sending notifications to admins
 """
 
-from typing import List
+import asyncio
+from typing import Dict, List, Optional, Set
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 from database.models import Order
 from utils.formatters import format_price
 from keyboards.inline import get_admin_order_keyboard
+from services.outbound import PRIORITY_ADMIN, send_priority
 from config import settings
-from datetime import datetime
+from utils.metrics import metrics
+from datetime import datetime, timedelta, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Detached fan-outs still running, referenced until they finish
+_pending_fan_outs: Set[asyncio.Task] = set()
 
-async def notify_admins_new_order(
+
+async def send_to_admins(
     bot: Bot,
-    order: Order,
-    order_data: dict
-) -> None:
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    admin_ids: Optional[List[int]] = None
+) -> Dict[int, bool]:
     """
-    Notify all admins about new order
+    Send message to all admins concurrently
+    
+    At most ADMIN_FANOUT_CONCURRENCY sends are in flight at once, all in
+    the admin lane of the outbound queue.
     
     Args:
         bot: Bot instance
-        order: Order model instance
-        order_data: Order details dictionary
-    """
-    try:
-        # Format admin message
-        message = _format_admin_order_message(order, order_data)
+        text: Message text (HTML)
+        reply_markup: Optional keyboard
+        admin_ids: Recipients (all configured admins if None)
         
-        # Get keyboard
-        keyboard = get_admin_order_keyboard(str(order.order_id))
+    Returns:
+        Dictionary admin_id: whether the message was delivered
         
-        # Send to all admins
-        for admin_id in settings.admin_ids:
+    Metrics:
+        notifications.admin_sent: delivered admin messages
+        notifications.admin_failed: admin messages that could not be sent
+    """
+    if admin_ids is None:
+        admin_ids = settings.admin_ids
+    semaphore = asyncio.Semaphore(settings.admin_fanout_concurrency)
+    
+    async def send(admin_id: int) -> bool:
+        async with semaphore:
             try:
                 await bot.send_message(
                     chat_id=admin_id,
-                    text=message,
-                    reply_markup=keyboard,
+                    text=text,
+                    reply_markup=reply_markup,
                     parse_mode='HTML'
                 )
-                logger.info(f"✅ Notified admin {admin_id} about order #{order.order_number}")
             except Exception as e:
                 logger.error(f"❌ Failed to notify admin {admin_id}: {e}")
+                metrics.increment("notifications.admin_failed")
+                return False
+            metrics.increment("notifications.admin_sent")
+            return True
+    
+    # gather() copies the context, so every send runs in the admin lane
+    with send_priority(PRIORITY_ADMIN):
+        results = await asyncio.gather(*(send(admin_id) for admin_id in admin_ids))
+    
+    return dict(zip(admin_ids, results))
+
+
+def _detach(coro) -> asyncio.Task:
+    """Run fan-out in background so the calling handler does not wait"""
+    task = asyncio.create_task(coro)
+    _pending_fan_outs.add(task)
+    task.add_done_callback(_pending_fan_outs.discard)
+    return task
+
+
+async def wait_pending_notifications() -> None:
+    """
+    Wait for detached admin notifications to finish
+    
+    Call this on shutdown before closing the bot session
+    """
+    if _pending_fan_outs:
+        await asyncio.gather(*_pending_fan_outs, return_exceptions=True)
+
+
+async def notify_admins_new_order(
+    bot: Bot,
+    order: Order,
+    order_data: dict,
+    admin_ids: Optional[List[int]] = None
+) -> Dict[int, bool]:
+    """
+    Notify all admins about new order
     
-    except Exception as e:
-        logger.error(f"Error in notify_admins_new_order: {e}", exc_info=True)
+    Args:
+        bot: Bot instance
+        order: Order model instance
+        order_data: Order details dictionary
+        admin_ids: Recipients (all configured admins if None)
+        
+    Returns:
+        Dictionary admin_id: whether the message was delivered
+    """
+    # Format admin message
+    message = _format_admin_order_message(order, order_data)
+    
+    # Get keyboard
+    keyboard = get_admin_order_keyboard(str(order.order_id))
+    
+    results = await send_to_admins(bot, message, reply_markup=keyboard, admin_ids=admin_ids)
+    delivered = sum(results.values())
+    logger.info(f"✅ Notified {delivered}/{len(results)} admins about order #{order.order_number}")
+    
+    return results
 
 
 def _format_admin_order_message(order: Order, order_data: dict) -> str:
@@ -96,8 +166,11 @@ def _format_admin_order_message(order: Order, order_data: dict) -> str:
     # Username
     username = order_data.get('username', 'не указан')
     
-    # Current time
-    current_time = datetime.now().strftime("%d.%m.%Y, %H:%M")
+    # Order time, not send time - the outbox may deliver it on a retry
+    created_at = order.created_at or datetime.now(timezone.utc)
+    order_time = created_at.astimezone().strftime("%d.%m.%Y, %H:%M")
+    if datetime.now(timezone.utc) - created_at < timedelta(minutes=5):
+        order_time += " (только что)"
     
     message = f"""🆕 <b>НОВЫЙ ЗАКАЗ #{order.order_number}</b>
 
@@ -131,7 +204,7 @@ User ID: <code>{order.user_id}</code>
 
 ━━━━━━━━━━━━━━━━━━━━━
 ⏰ <b>ВРЕМЯ ЗАКАЗА</b>
-{current_time} (только что)
+{order_time}
 
 ━━━━━━━━━━━━━━━━━━━━━
 📊 <b>СТАТУС:</b> ⏳ Ожидает принятия
@@ -145,11 +218,14 @@ async def notify_customer_order_accepted(
     user_id: int,
     order_number: int,
     admin_name: str,
-    language: str
+    language: str,
+    accepted_at: Optional[str] = None
 ) -> None:
-    """Notify customer that order was accepted"""
+    """Notify customer that order was accepted, send errors are raised"""
     
-    current_time = datetime.now().strftime("%H:%M")
+    # Acceptance time (ISO 8601) rather than send time, the outbox may retry
+    accepted = datetime.fromisoformat(accepted_at) if accepted_at else datetime.now(timezone.utc)
+    current_time = accepted.astimezone().strftime("%H:%M")
     
     if language == 'ru':
         message = f"""✅ <b>ВАШ ЗАКАЗ ПРИНЯТ!</b>
@@ -176,15 +252,12 @@ Qo'ng'iroqni kuting! 📞
 Operator: {admin_name}
 Vaqt: {current_time}"""
     
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=message,
-            parse_mode='HTML'
-        )
-        logger.info(f"✅ Notified customer {user_id} about order #{order_number} acceptance")
-    except Exception as e:
-        logger.error(f"❌ Failed to notify customer {user_id}: {e}")
+    await bot.send_message(
+        chat_id=user_id,
+        text=message,
+        parse_mode='HTML'
+    )
+    logger.info(f"✅ Notified customer {user_id} about order #{order_number} acceptance")
 
 
 async def notify_customer_order_in_progress(
@@ -193,7 +266,7 @@ async def notify_customer_order_in_progress(
     order_number: int,
     language: str
 ) -> None:
-    """Notify customer that order is in progress"""
+    """Notify customer that order is in progress, send errors are raised"""
     
     from datetime import timedelta
     estimated = (datetime.now() + timedelta(days=1)).strftime("%d.%m.%Y")
@@ -217,15 +290,12 @@ Tayyor bo'lgach xabar beramiz.
 
 Taxminiy tayyor bo'lish vaqti: {estimated}"""
     
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=message,
-            parse_mode='HTML'
-        )
-        logger.info(f"✅ Notified customer {user_id} about order #{order_number} in progress")
-    except Exception as e:
-        logger.error(f"❌ Failed to notify customer {user_id}: {e}")
+    await bot.send_message(
+        chat_id=user_id,
+        text=message,
+        parse_mode='HTML'
+    )
+    logger.info(f"✅ Notified customer {user_id} about order #{order_number} in progress")
 
 
 async def notify_customer_order_completed(
@@ -234,7 +304,7 @@ async def notify_customer_order_completed(
     order_number: int,
     language: str
 ) -> None:
-    """Notify customer that order is completed and request feedback"""
+    """Notify customer that order is completed and request feedback, send errors are raised"""
     
     from keyboards.inline import get_rating_keyboard
     
@@ -273,16 +343,13 @@ Fikr-mulohazangizni kutamiz! ⭐"""
     
     keyboard = get_rating_keyboard(order_number, language)
     
-    try:
-        await bot.send_message(
-            chat_id=user_id,
-            text=message,
-            reply_markup=keyboard,
-            parse_mode='HTML'
-        )
-        logger.info(f"✅ Notified customer {user_id} about order #{order_number} completion")
-    except Exception as e:
-        logger.error(f"❌ Failed to notify customer {user_id}: {e}")
+    await bot.send_message(
+        chat_id=user_id,
+        text=message,
+        reply_markup=keyboard,
+        parse_mode='HTML'
+    )
+    logger.info(f"✅ Notified customer {user_id} about order #{order_number} completion")
 
 
 async def notify_admins_feedback_received(
@@ -294,7 +361,7 @@ async def notify_admins_feedback_received(
     rating: int,
     comment: str
 ) -> None:
-    """Notify admins about new customer feedback"""
+    """Notify admins about new customer feedback, delivery runs in background"""
     
     stars = "⭐" * rating
     current_time = datetime.now().strftime("%d.%m.%Y, %H:%M")
@@ -313,12 +380,4 @@ User ID: <code>{user_id}</code>
 Дата: {current_time}
 """
     
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=message,
-                parse_mode='HTML'
-            )
-        except Exception as e:
-            logger.error(f"Failed to notify admin {admin_id} about feedback: {e}")
\ No newline at end of file
+    _detach(send_to_admins(bot, message))
\ No newline at end of file
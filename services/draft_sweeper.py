@@ -0,0 +1,212 @@
+"""
+Draft Sweeper Service
+=====================
+Reminds customers about unfinished orders and cleans up abandoned ones
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import Any, List, Optional
+from aiogram import Bot
+from config import settings
+from database.fsm_storage import ExpiringStorage, IdleConversation
+from localization.translations import get_text
+from services.message_manager import message_manager
+from services.outbound import send_priority, PRIORITY_BROADCAST
+from utils.metrics import metrics
+from utils.states import OrderStates, FeedbackStates
+import logging
+
+logger = logging.getLogger(__name__)
+
+# States of customer conversations, cleared once abandoned
+CUSTOMER_STATES = frozenset(
+    OrderStates.__all_states_names__ + FeedbackStates.__all_states_names__
+)
+
+# States of an order draft, worth a reminder
+DRAFT_STATES = frozenset(OrderStates.__all_states_names__) - {
+    OrderStates.waiting_admin_message.state
+}
+
+
+class DraftSweeper:
+    """
+    Background task that times out idle customer conversations
+    
+    A draft idle for reminder_after gets one reminder message, a customer
+    conversation idle for abandon_after is cleared and its wizard prompt
+    and reminder are deleted. Idle conversations are read from the
+    storage's last-activity index in batches, each pass continuing after
+    the last conversation it saw, so a tick only reads conversations that
+    went idle since the previous one. Reminders are sent in the broadcast
+    lane of the outbound queue, behind customer replies.
+    
+    Metrics:
+        drafts.reminded: reminders sent
+        drafts.reminder_failed: reminders that could not be sent
+        drafts.abandoned: conversations cleared after abandon_after
+    """
+    
+    def __init__(
+        self,
+        storage: ExpiringStorage,
+        reminder_after: Optional[timedelta],
+        abandon_after: timedelta,
+        interval: float = 60,
+        batch_size: int = 100
+    ):
+        self.storage = storage
+        self.reminder_after = reminder_after
+        self.abandon_after = abandon_after
+        self.interval = interval
+        self.batch_size = batch_size
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reminder_cursor: Any = None
+        self._abandon_cursor: Any = None
+    
+    def start(self, bot: Bot) -> None:
+        """
+        Start sweeping in background
+        
+        Args:
+            bot: Bot used for reminders and deletions
+        """
+        if self._task is not None:
+            return
+        self._bot = bot
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Draft sweeper started")
+    
+    async def stop(self) -> None:
+        """Stop sweeper"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def sweep(self) -> bool:
+        """
+        Run one batch of both passes
+        
+        Returns:
+            Whether a pass filled its batch, so more may be waiting
+        """
+        # Abandoned conversations go first, they must not get a reminder
+        if await self._abandon() >= self.batch_size:
+            return True
+        if self.reminder_after:
+            return await self._remind() >= self.batch_size
+        return False
+    
+    async def _run(self) -> None:
+        """Sweeper task body"""
+        while True:
+            try:
+                more = await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Draft sweeper error: {e}", exc_info=True)
+                more = False
+            
+            if more:
+                continue
+            await asyncio.sleep(self.interval)
+    
+    async def _remind(self) -> int:
+        """Send reminders for one batch of idle drafts"""
+        batch = await self.storage.scan_idle(self.reminder_after, self.batch_size, self._reminder_cursor)
+        if not batch:
+            return 0
+        self._reminder_cursor = batch[-1].cursor
+        
+        due = [
+            conversation for conversation in batch
+            if conversation.state in DRAFT_STATES
+            and conversation.data.get('order_data')
+            and not conversation.data.get('order_confirmed')
+            and 'draft_reminder_message_id' not in conversation.data
+        ]
+        with send_priority(PRIORITY_BROADCAST):
+            await asyncio.gather(*(self._send_reminder(conversation) for conversation in due))
+        return len(batch)
+    
+    async def _send_reminder(self, conversation: IdleConversation) -> None:
+        """Send reminder and mark the draft as reminded"""
+        chat_id = conversation.key.chat_id
+        language = conversation.data.get('language', 'ru')
+        message_id = None
+        try:
+            message = await self._bot.send_message(
+                chat_id,
+                get_text(language, 'draft_reminder'),
+                parse_mode='HTML'
+            )
+            message_id = message.message_id
+            metrics.increment("drafts.reminded")
+        except Exception as e:
+            metrics.increment("drafts.reminder_failed")
+            logger.warning(f"Could not remind user {chat_id} about the draft: {e}")
+        
+        # Marked even when sending failed (bot blocked), never retried.
+        # Updating the draft counts as activity, so the abandon timeout
+        # runs from the reminder.
+        await self.storage.update_data(conversation.key, {'draft_reminder_message_id': message_id})
+    
+    async def _abandon(self) -> int:
+        """Clear one batch of abandoned conversations"""
+        batch = await self.storage.scan_idle(self.abandon_after, self.batch_size, self._abandon_cursor)
+        if not batch:
+            return 0
+        self._abandon_cursor = batch[-1].cursor
+        
+        abandoned: List[IdleConversation] = []
+        for conversation in batch:
+            if conversation.state not in CUSTOMER_STATES:
+                continue
+            # Skipped if the customer came back since the scan
+            if await self.storage.delete_if_idle(conversation.key, self.abandon_after):
+                abandoned.append(conversation)
+        
+        for conversation in abandoned:
+            chat_id = conversation.key.chat_id
+            await message_manager.delete_last_message(self._bot, chat_id)
+            reminder_id = conversation.data.get('draft_reminder_message_id')
+            if reminder_id:
+                message_manager.delete_message_by_id(self._bot, chat_id, reminder_id)
+        await asyncio.gather(*(
+            message_manager.flush(conversation.key.chat_id) for conversation in abandoned
+        ))
+        
+        if abandoned:
+            metrics.increment("drafts.abandoned", len(abandoned))
+            logger.info(f"Cleared {len(abandoned)} abandoned conversations")
+        return len(batch)
+
+
+def create_draft_sweeper(storage: ExpiringStorage) -> DraftSweeper:
+    """
+    Create draft sweeper configured in settings
+    
+    Args:
+        storage: FSM storage holding the conversations
+        
+    Returns:
+        Sweeper instance
+    """
+    return DraftSweeper(
+        storage,
+        reminder_after=(
+            timedelta(minutes=settings.draft_reminder_minutes)
+            if settings.draft_reminder_minutes else None
+        ),
+        abandon_after=timedelta(hours=settings.draft_ttl_hours),
+        interval=settings.draft_sweep_interval,
+        batch_size=settings.draft_sweep_batch
+    )
@@ -1,27 +1,72 @@
 """
 Message Manager Service
 =======================
-Manages message deletion for clean UI
+Keeps one wizard message per chat and renders steps into it
 """
 
-from typing import Optional, Dict
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
 from aiogram import Bot
-from aiogram.types import Message
+from aiogram.types import InlineKeyboardMarkup, Message
 from aiogram.exceptions import TelegramBadRequest
+from config import settings
+from services.message_registry import MessageRegistry, WizardMessage, create_message_registry
+from utils.metrics import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _editable(reply_markup: Any) -> bool:
+    """Whether a message with this markup can be edited, or this markup edited in"""
+    return reply_markup is None or isinstance(reply_markup, InlineKeyboardMarkup)
+
+
+def _text_digest(text: str, options: Dict[str, Any]) -> int:
+    """Digest of message text and its formatting arguments"""
+    return hash((text, repr(sorted(options.items()))))
+
+
+def _markup_digest(reply_markup: Any) -> int:
+    """Digest of message keyboard"""
+    if reply_markup is None:
+        return 0
+    return hash(reply_markup.model_dump_json())
+
+
 class MessageManager:
     """
-    Message manager for handling message deletion
+    Message manager for the wizard message of each chat
     
-    Stores message IDs and provides clean deletion
+    Every wizard step is rendered into a single message per chat: it is
+    edited in place, only its keyboard is replaced when the text did not
+    change, and a new message is sent only when the old one cannot be
+    edited (reply keyboards, deleted or too old messages). Sends, edits
+    and deletes are paced by the bot's OutboundQueue like every other call.
+    
+    Which message is the wizard message of a chat is kept in a
+    MessageRegistry: bounded in memory, or persisted next to the FSM
+    state (see create_message_registry).
+    
+    Deletions are collected per chat and sent as one deleteMessages call
+    when the update has been handled (see MessageCleanupMiddleware) or
+    flush_delay seconds after the first one, whichever comes first.
+    
+    Metrics:
+        messages.deleted: messages deleted
+        messages.delete_failed: messages that could not be deleted
+        messages.delete_calls_saved: API calls saved by batching
     """
     
-    def __init__(self):
-        self.user_messages: Dict[int, int] = {}  # user_id: message_id
+    # deleteMessages accepts at most this many IDs
+    DELETE_BATCH_SIZE = 100
+    
+    def __init__(self, registry: Optional[MessageRegistry] = None, flush_delay: float = 0.3):
+        self.registry = registry or create_message_registry(backend="memory")
+        self.flush_delay = flush_delay
+        self._deletions: Dict[int, Tuple[Bot, List[int]]] = {}  # chat_id: bot and messages to delete
+        self._flush_timers: Dict[int, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
     
     async def delete_last_message(self, bot: Bot, user_id: int) -> None:
         """
@@ -31,16 +76,11 @@ class MessageManager:
             bot: Bot instance
             user_id: User's Telegram ID
         """
-        message_id = self.user_messages.get(user_id)
+        record = await self.registry.get(bot, user_id)
         
-        if message_id:
-            try:
-                await bot.delete_message(chat_id=user_id, message_id=message_id)
-                del self.user_messages[user_id]
-            except TelegramBadRequest as e:
-                logger.debug(f"Could not delete message {message_id} for user {user_id}: {e}")
-            except Exception as e:
-                logger.error(f"Error deleting message: {e}")
+        if record is not None:
+            await self.registry.delete(bot, user_id)
+            self._queue_deletion(bot, user_id, record.message_id)
     
     async def delete_message(self, message: Message) -> None:
         """
@@ -49,12 +89,80 @@ class MessageManager:
         Args:
             message: Message to delete
         """
-        try:
-            await message.delete()
-        except TelegramBadRequest as e:
-            logger.debug(f"Could not delete message: {e}")
-        except Exception as e:
-            logger.error(f"Error deleting message: {e}")
+        self._queue_deletion(message.bot, message.chat.id, message.message_id)
+    
+    def delete_message_by_id(self, bot: Bot, chat_id: int, message_id: int) -> None:
+        """
+        Delete a message known only by its ID
+        
+        Args:
+            bot: Bot instance
+            chat_id: Chat ID
+            message_id: Message ID
+        """
+        self._queue_deletion(bot, chat_id, message_id)
+    
+    async def flush(self, chat_id: int) -> None:
+        """
+        Delete the chat's queued messages now
+        
+        Args:
+            chat_id: Chat ID
+        """
+        timer = self._flush_timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        queued = self._deletions.pop(chat_id, None)
+        if queued is None:
+            return
+        
+        bot, message_ids = queued
+        for start in range(0, len(message_ids), self.DELETE_BATCH_SIZE):
+            batch = message_ids[start:start + self.DELETE_BATCH_SIZE]
+            try:
+                if len(batch) == 1:
+                    # Single deletion reports a missing message, deleteMessages skips it
+                    await bot.delete_message(chat_id=chat_id, message_id=batch[0])
+                else:
+                    await bot.delete_messages(chat_id=chat_id, message_ids=batch)
+                metrics.increment("messages.deleted", len(batch))
+                metrics.increment("messages.delete_calls_saved", len(batch) - 1)
+            except TelegramBadRequest as e:
+                metrics.increment("messages.delete_failed", len(batch))
+                logger.debug(f"Could not delete messages {batch} for user {chat_id}: {e}")
+            except Exception as e:
+                metrics.increment("messages.delete_failed", len(batch))
+                logger.error(f"Error deleting messages: {e}")
+    
+    async def flush_all(self) -> None:
+        """
+        Delete all queued messages
+        
+        Call this on shutdown before closing the bot session
+        """
+        await asyncio.gather(*(self.flush(chat_id) for chat_id in list(self._deletions)))
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+    
+    def _queue_deletion(self, bot: Bot, chat_id: int, message_id: int) -> None:
+        """Add message to the chat's next deletion batch"""
+        queued = self._deletions.get(chat_id)
+        if queued is None:
+            self._deletions[chat_id] = (bot, [message_id])
+            self._flush_timers[chat_id] = asyncio.get_running_loop().call_later(
+                self.flush_delay,
+                self._flush_in_background,
+                chat_id
+            )
+        elif message_id not in queued[1]:
+            queued[1].append(message_id)
+    
+    def _flush_in_background(self, chat_id: int) -> None:
+        """Flush timer callback"""
+        self._flush_timers.pop(chat_id, None)
+        task = asyncio.create_task(self.flush(chat_id))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
     
     async def send_and_store(
         self,
@@ -75,17 +183,129 @@ class MessageManager:
         Returns:
             Sent message
         """
-        # Delete previous message
-        await self.delete_last_message(bot, chat_id)
-        
+        previous = await self.registry.get(bot, chat_id)
+        return await self._replace(bot, chat_id, previous, text, **kwargs)
+    
+    async def _replace(
+        self,
+        bot: Bot,
+        chat_id: int,
+        previous: Optional[WizardMessage],
+        text: str,
+        **kwargs
+    ) -> Message:
+        """Send new wizard message and delete the previous one"""
         # Send new message
         message = await bot.send_message(chat_id=chat_id, text=text, **kwargs)
         
         # Store message ID
-        self.user_messages[chat_id] = message.message_id
+        reply_markup = kwargs.get('reply_markup')
+        options = {key: value for key, value in kwargs.items() if key != 'reply_markup'}
+        await self.registry.set(bot, chat_id, WizardMessage(
+            message.message_id,
+            editable=_editable(reply_markup),
+            text_digest=_text_digest(text, options),
+            markup_digest=_markup_digest(reply_markup)
+        ))
+        
+        # Delete previous message
+        if previous is not None:
+            self._queue_deletion(bot, chat_id, previous.message_id)
         
         return message
     
+    async def render(
+        self,
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        reply_markup: Any = None,
+        **kwargs
+    ) -> int:
+        """
+        Show a wizard step, editing the chat's wizard message when possible
+        
+        Args:
+            bot: Bot instance
+            chat_id: Chat ID
+            text: Message text
+            reply_markup: Keyboard, reply keyboards always need a new message
+            **kwargs: Formatting arguments accepted by both send_message
+                and edit_message_text (parse_mode, ...)
+                
+        Returns:
+            ID of the wizard message
+        """
+        record = await self.registry.get(bot, chat_id)
+        text_digest = _text_digest(text, kwargs)
+        markup_digest = _markup_digest(reply_markup)
+        
+        if record is not None and record.editable and _editable(reply_markup):
+            edited = True
+            try:
+                if record.text_digest == text_digest:
+                    if record.markup_digest != markup_digest:
+                        await bot.edit_message_reply_markup(
+                            chat_id=chat_id,
+                            message_id=record.message_id,
+                            reply_markup=reply_markup
+                        )
+                else:
+                    await bot.edit_message_text(
+                        chat_id=chat_id,
+                        message_id=record.message_id,
+                        text=text,
+                        reply_markup=reply_markup,
+                        **kwargs
+                    )
+            except TelegramBadRequest as e:
+                if "message is not modified" not in e.message:
+                    logger.debug(f"Could not edit message {record.message_id} for user {chat_id}: {e}")
+                    edited = False
+            
+            if edited:
+                if record.text_digest != text_digest or record.markup_digest != markup_digest:
+                    await self.registry.set(bot, chat_id, WizardMessage(
+                        record.message_id,
+                        text_digest=text_digest,
+                        markup_digest=markup_digest
+                    ))
+                return record.message_id
+        
+        message = await self._replace(bot, chat_id, record, text, reply_markup=reply_markup, **kwargs)
+        return message.message_id
+    
+    async def track(self, message: Message) -> None:
+        """
+        Make message the chat's wizard message, e.g. the one a button was tapped on
+        
+        The wizard message it replaces is deleted.
+        
+        Args:
+            message: Bot message to render the next steps into
+        """
+        chat_id = message.chat.id
+        queued = self._deletions.get(chat_id)
+        if queued is not None and message.message_id in queued[1]:
+            # Tapped again before its deletion went out
+            queued[1].remove(message.message_id)
+        
+        record = await self.registry.get(message.bot, chat_id)
+        if record is None or record.message_id != message.message_id:
+            await self.registry.set(message.bot, chat_id, WizardMessage(message.message_id))
+            if record is not None:
+                self._queue_deletion(message.bot, chat_id, record.message_id)
+    
+    async def forget(self, bot: Bot, chat_id: int) -> None:
+        """
+        Stop rendering into the chat's wizard message, leaving it in the chat
+        
+        Args:
+            bot: Bot instance
+            chat_id: Chat ID
+        """
+        await self.registry.delete(bot, chat_id)
+    
     async def edit_or_send(
         self,
         bot: Bot,
@@ -95,7 +315,7 @@ class MessageManager:
         **kwargs
     ) -> Message:
         """
-        Edit existing message or send new one
+        Edit given message or send new one
         
         Args:
             bot: Bot instance
@@ -109,13 +329,12 @@ class MessageManager:
         """
         if message_id:
             try:
-                await bot.edit_message_text(
+                return await bot.edit_message_text(
                     chat_id=chat_id,
                     message_id=message_id,
                     text=text,
                     **kwargs
                 )
-                return await bot.get_message(chat_id, message_id)
             except TelegramBadRequest:
                 # If edit fails, send new message
                 pass
@@ -124,4 +343,4 @@ class MessageManager:
 
 
 # Global message manager instance
-message_manager = MessageManager()
\ No newline at end of file
+message_manager = MessageManager(flush_delay=settings.message_delete_delay)
\ No newline at end of file
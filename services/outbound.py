@@ -0,0 +1,276 @@
+"""
+Outbound Queue Service
+======================
+Rate-limits and retries every Telegram API call the bot makes
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.exceptions import TelegramRetryAfter, TelegramServerError
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    DeleteMessage,
+    DeleteMessages,
+    GetUpdates,
+    Response,
+    SendChatAction,
+    TelegramMethod
+)
+from aiogram.methods.base import TelegramType
+from utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, lower is sent first
+PRIORITY_CUSTOMER = 0   # replies to the user who sent the update
+PRIORITY_ADMIN = 1      # admin notifications and fan-out
+PRIORITY_BROADCAST = 2  # bulk messages to many users
+
+_priority: ContextVar[int] = ContextVar("outbound_priority", default=PRIORITY_CUSTOMER)
+
+# Not counted against any limit
+_UNLIMITED_METHODS = (GetUpdates, AnswerCallbackQuery)
+
+# Counted against the global limit only
+_CHAT_EXEMPT_METHODS = (DeleteMessage, DeleteMessages, SendChatAction)
+
+
+@contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """
+    Send API calls made inside the block in the given lane
+    
+    Usage:
+        with send_priority(PRIORITY_ADMIN):
+            await bot.send_message(admin_id, text)
+    
+    Args:
+        priority: PRIORITY_CUSTOMER, PRIORITY_ADMIN or PRIORITY_BROADCAST
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket that can also be blocked until a point in time"""
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+    
+    def delay(self, now: float) -> float:
+        """
+        Get seconds until a token is available
+        
+        Args:
+            now: Current monotonic time
+            
+        Returns:
+            0 if a token can be taken right now
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def take(self) -> None:
+        """Consume one token"""
+        self.tokens -= 1
+    
+    def block(self, seconds: float) -> None:
+        """Hand out no tokens for the given time"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+    
+    def is_idle(self, now: float) -> bool:
+        """Whether the bucket is full again, so forgetting it changes nothing"""
+        return self.delay(now) == 0 and self.tokens >= self.capacity
+
+
+class OutboundQueue(BaseRequestMiddleware):
+    """
+    Bot session middleware that paces outgoing API calls
+    
+    Every call addressed to a chat waits for a token from that chat's
+    bucket and then from the global bucket. Calls waiting for a global
+    token are released by priority lane, so customer replies overtake
+    admin fan-out and broadcasts. 429 responses block the chat (for calls
+    without a chat, the global bucket and so every call) for retry_after
+    seconds and the call is retried, 5xx responses are retried with
+    exponential backoff.
+    
+    Usage:
+        bot.session.middleware(OutboundQueue(global_rate=30))
+        
+    Metrics:
+        outbound.sent: API calls passed through the limiter
+        outbound.retry_after: 429 responses received
+        outbound.retries: calls repeated after 429 or 5xx
+        outbound.queued: calls waiting for a global token
+        outbound.wait_seconds: time spent waiting for tokens
+    """
+    
+    # Chat buckets are pruned once this many exist
+    PRUNE_THRESHOLD = 1024
+    
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: int = 5,
+        group_per_minute: int = 20,
+        max_retries: int = 3,
+        backoff: float = 0.5
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # No burst allowance: calls are spaced evenly, so no one-second
+        # window ever holds more than global_rate of them
+        self._global = TokenBucket(global_rate, 1)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._prune_at = self.PRUNE_THRESHOLD
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+    
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        """
+        Send API call once the rate limits allow it
+        
+        Args:
+            make_request: Next middleware or the actual request
+            bot: Bot instance
+            method: API method
+            
+        Returns:
+            API response
+        """
+        if isinstance(method, _UNLIMITED_METHODS):
+            return await make_request(bot, method)
+        
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(chat_id, int) or isinstance(method, _CHAT_EXEMPT_METHODS):
+            chat_id = None
+        priority = _priority.get()
+        
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            if chat_id is not None:
+                await self._acquire_chat(chat_id)
+            await self._acquire_global(priority)
+            metrics.observe("outbound.wait_seconds", time.monotonic() - started)
+            metrics.increment("outbound.sent")
+            
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                metrics.increment("outbound.retry_after")
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(
+                    f"Flood limit on {type(method).__name__} to chat {chat_id}, "
+                    f"retrying in {e.retry_after}s"
+                )
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).block(e.retry_after)
+                else:
+                    # Not tied to a chat, so the bot as a whole is over the limit
+                    self._global.block(e.retry_after)
+            except TelegramServerError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"Telegram error on {type(method).__name__}: {e}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+            
+            attempt += 1
+            metrics.increment("outbound.retries")
+    
+    async def _acquire_chat(self, chat_id: int) -> None:
+        """Wait for a token from the chat's bucket"""
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            delay = bucket.delay(time.monotonic())
+            if delay <= 0:
+                bucket.take()
+                return
+            await asyncio.sleep(delay)
+    
+    async def _acquire_global(self, priority: int) -> None:
+        """Wait for a global token in the priority lane"""
+        if not self._waiting and self._global.delay(time.monotonic()) <= 0:
+            self._global.take()
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        metrics.set_gauge("outbound.queued", len(self._waiting))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._release_loop())
+        await future
+    
+    async def _release_loop(self) -> None:
+        """Hand out global tokens to waiting calls, highest priority first"""
+        while self._waiting:
+            delay = self._global.delay(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            metrics.set_gauge("outbound.queued", len(self._waiting))
+            if future.done():
+                # Caller was cancelled while waiting
+                continue
+            self._global.take()
+            future.set_result(None)
+    
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Get or create the bucket of a chat"""
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self._prune_at:
+                self._prune()
+            if chat_id < 0:
+                # Groups and channels
+                bucket = TokenBucket(self.group_per_minute / 60, self.group_per_minute)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+    
+    def _prune(self) -> None:
+        """Forget buckets of chats that have been quiet long enough to refill"""
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.is_idle(now)]:
+            del self._chats[chat_id]
+        self._prune_at = max(self.PRUNE_THRESHOLD, 2 * len(self._chats))
@@ -0,0 +1,277 @@
+"""
+Notification Outbox Service
+===========================
+Delivers notifications queued in the notification_outbox table
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database.database import async_session_maker
+from database.models import OutboxMessage
+from database.repository import OrderRepository, OutboxRepository
+from services.admin_notifications import (
+    notify_admins_new_order,
+    notify_customer_order_accepted,
+    notify_customer_order_in_progress,
+    notify_customer_order_completed
+)
+from utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Notification kinds
+NOTIFY_ADMINS_NEW_ORDER = "admins_new_order"
+NOTIFY_CUSTOMER_ACCEPTED = "customer_order_accepted"
+NOTIFY_CUSTOMER_IN_PROGRESS = "customer_order_in_progress"
+NOTIFY_CUSTOMER_COMPLETED = "customer_order_completed"
+
+
+class DeliveryError(Exception):
+    """
+    Delivery failed
+    
+    Args:
+        message: Error description
+        payload: Payload to retry with (unchanged if None)
+        permanent: Retrying cannot help, move to the dead state
+    """
+    
+    def __init__(self, message: str, payload: Optional[dict] = None, permanent: bool = False):
+        super().__init__(message)
+        self.payload = payload
+        self.permanent = permanent
+
+
+async def _deliver_admins_new_order(bot: Bot, payload: dict) -> None:
+    """Send new order to admins, retrying only the ones not reached"""
+    async with async_session_maker() as session:
+        order = await OrderRepository.get_by_id(session, payload["order_id"])
+    if order is None:
+        raise DeliveryError(f"order {payload['order_id']} not found", permanent=True)
+    
+    results = await notify_admins_new_order(bot, order, payload, admin_ids=payload.get("admin_ids"))
+    failed = [admin_id for admin_id, delivered in results.items() if not delivered]
+    if failed:
+        raise DeliveryError(
+            f"{len(failed)} of {len(results)} admins not reached",
+            payload={**payload, "admin_ids": failed}
+        )
+
+
+async def _deliver_customer_accepted(bot: Bot, payload: dict) -> None:
+    """Tell customer the order was accepted"""
+    await notify_customer_order_accepted(bot, **payload)
+
+
+async def _deliver_customer_in_progress(bot: Bot, payload: dict) -> None:
+    """Tell customer the order is in progress"""
+    await notify_customer_order_in_progress(bot, **payload)
+
+
+async def _deliver_customer_completed(bot: Bot, payload: dict) -> None:
+    """Tell customer the order is ready and ask for feedback"""
+    await notify_customer_order_completed(bot, **payload)
+
+
+# Notification kind: coroutine sending it, raises when delivery failed
+DELIVERY_HANDLERS: Dict[str, Callable[[Bot, dict], Awaitable[None]]] = {
+    NOTIFY_ADMINS_NEW_ORDER: _deliver_admins_new_order,
+    NOTIFY_CUSTOMER_ACCEPTED: _deliver_customer_accepted,
+    NOTIFY_CUSTOMER_IN_PROGRESS: _deliver_customer_in_progress,
+    NOTIFY_CUSTOMER_COMPLETED: _deliver_customer_completed
+}
+
+
+class OutboxDispatcher:
+    """
+    Background task that drains the notification outbox
+    
+    Messages are claimed in batches with FOR UPDATE SKIP LOCKED, so any
+    number of processes can run a dispatcher. Delivery is at-least-once:
+    a claimed message is retried after its lease runs out unless it was
+    reported as sent. Failed messages are retried with exponential
+    backoff and moved to the dead state after max_attempts or on errors
+    that cannot succeed later (bot blocked, chat not found).
+    
+    Metrics:
+        outbox.sent: delivered messages
+        outbox.failed: failed delivery attempts
+        outbox.dead: messages moved to the dead state
+        outbox.lag_seconds: time from queueing to delivery
+        outbox.pending: messages waiting for delivery
+        outbox.oldest_pending_seconds: age of the oldest waiting message
+        outbox.dead_total: messages in the dead state
+    """
+    
+    # Backoff after failed attempt N: BACKOFF_BASE * 2 ** (N - 1), capped
+    BACKOFF_BASE = 5
+    BACKOFF_MAX = 3600
+    # Seconds a claimed batch is hidden from other dispatchers
+    LEASE = 120
+    # Seconds between backlog statistics and purging delivered messages
+    STATS_INTERVAL = 60
+    
+    def __init__(
+        self,
+        batch_size: int = 20,
+        poll_interval: float = 5,
+        max_attempts: int = 8,
+        retention: timedelta = timedelta(days=7)
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stats_at = 0.0
+    
+    def start(self, bot: Bot) -> None:
+        """
+        Start draining the outbox in background
+        
+        Args:
+            bot: Bot used for delivery
+        """
+        if self._task is not None:
+            return
+        self._bot = bot
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Outbox dispatcher started")
+    
+    async def stop(self) -> None:
+        """Stop dispatcher, a batch cut short is delivered again after its lease"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    def wake(self) -> None:
+        """Deliver now instead of at the next poll - call after committing"""
+        self._wakeup.set()
+    
+    async def drain(self) -> int:
+        """
+        Deliver one batch of due messages
+        
+        Returns:
+            Number of messages claimed
+        """
+        async with async_session_maker() as session:
+            messages = await OutboxRepository.claim_due(session, self.batch_size, self.LEASE)
+        if not messages:
+            return 0
+        
+        results = await asyncio.gather(*(self._deliver(message) for message in messages))
+        
+        sent = [message for message, error in zip(messages, results) if error is None]
+        async with async_session_maker() as session:
+            if sent:
+                await OutboxRepository.mark_sent(session, [message.id for message in sent])
+            for message, error in zip(messages, results):
+                if error is not None:
+                    await self._record_failure(session, message, error)
+        
+        now = datetime.now(timezone.utc)
+        for message in sent:
+            metrics.observe("outbox.lag_seconds", (now - message.created_at).total_seconds())
+        metrics.increment("outbox.sent", len(sent))
+        
+        return len(messages)
+    
+    async def _run(self) -> None:
+        """Dispatcher task body"""
+        while True:
+            # Cleared before draining, so a wake() during the batch is kept
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain()
+                if time.monotonic() >= self._stats_at:
+                    await self._refresh_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox dispatcher error: {e}", exc_info=True)
+                claimed = 0
+            
+            if claimed >= self.batch_size:
+                # More may be due right away
+                continue
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _deliver(self, message: OutboxMessage) -> Optional[Exception]:
+        """Run delivery handler, returning the error instead of raising it"""
+        handler = DELIVERY_HANDLERS.get(message.kind)
+        try:
+            if handler is None:
+                raise DeliveryError(f"unknown kind {message.kind}", permanent=True)
+            await handler(self._bot, message.payload)
+        except Exception as e:
+            return e
+        return None
+    
+    async def _record_failure(
+        self,
+        session: AsyncSession,
+        message: OutboxMessage,
+        error: Exception
+    ) -> None:
+        """Schedule retry or move message to the dead state"""
+        metrics.increment("outbox.failed")
+        permanent = (
+            isinstance(error, (TelegramForbiddenError, TelegramBadRequest))
+            or isinstance(error, DeliveryError) and error.permanent
+        )
+        
+        if permanent or message.attempts >= self.max_attempts:
+            retry_in = None
+            metrics.increment("outbox.dead")
+            logger.error(
+                f"❌ Outbox message {message.id} ({message.kind}) dead after "
+                f"{message.attempts} attempts: {error}"
+            )
+        else:
+            retry_in = min(self.BACKOFF_BASE * 2 ** (message.attempts - 1), self.BACKOFF_MAX)
+            logger.warning(
+                f"Outbox message {message.id} ({message.kind}) failed: {error}, "
+                f"retry in {retry_in}s"
+            )
+        
+        payload = error.payload if isinstance(error, DeliveryError) else None
+        await OutboxRepository.mark_failed(session, message.id, str(error), retry_in, payload)
+    
+    async def _refresh_stats(self) -> None:
+        """Publish backlog gauges and purge old delivered messages"""
+        self._stats_at = time.monotonic() + self.STATS_INTERVAL
+        async with async_session_maker() as session:
+            stats = await OutboxRepository.get_stats(session)
+            await OutboxRepository.purge_sent(session, self.retention)
+        
+        metrics.set_gauge("outbox.pending", stats["pending"])
+        metrics.set_gauge("outbox.oldest_pending_seconds", stats["oldest_pending_seconds"])
+        metrics.set_gauge("outbox.dead_total", stats["dead"])
+
+
+# Global outbox dispatcher instance
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.outbox_batch_size,
+    poll_interval=settings.outbox_poll_interval,
+    max_attempts=settings.outbox_max_attempts,
+    retention=timedelta(days=settings.outbox_retention_days)
+)
@@ -0,0 +1,77 @@
+"""
+Partition Maintainer Service
+============================
+Creates upcoming monthly partitions and archives expired ones
+"""
+
+import asyncio
+from typing import Optional
+from config import settings
+from database.partitions import archive_partitions, ensure_partitions, order_partitions
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionMaintainer:
+    """
+    Background task keeping orders and order_status_history partitioned
+    
+    Every `interval` seconds makes sure partitions exist from the current
+    month to `months_ahead` months ahead, so inserts never hit a missing
+    partition, and detaches partitions older than `keep_months` into the
+    archive schema (0 keeps everything attached). Runs once right at
+    start, covering a bot that was down over a month boundary.
+    """
+    
+    def __init__(self, months_ahead: int = 3, keep_months: int = 24, interval: float = 3600):
+        self.months_ahead = months_ahead
+        self.keep_months = keep_months
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start maintenance in background"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Partition maintainer started")
+    
+    async def stop(self) -> None:
+        """Stop maintainer"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def run_once(self) -> None:
+        """Create missing partitions, then archive expired ones"""
+        created = await ensure_partitions(self.months_ahead)
+        archived = []
+        if self.keep_months > 0:
+            archived = await archive_partitions(self.keep_months)
+        if created or archived:
+            order_partitions.invalidate()
+    
+    async def _run(self) -> None:
+        """Maintainer task body"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Partition maintenance error: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+# Global partition maintainer instance
+partition_maintainer = PartitionMaintainer(
+    months_ahead=settings.partition_months_ahead,
+    keep_months=settings.partition_keep_months,
+    interval=settings.partition_maintenance_interval
+)
@@ -0,0 +1,186 @@
+"""
+Stats Report Service
+====================
+Renders the admin /stats report from daily_stats rollups
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database.models import DailyStat
+from database.repository import StatsRepository
+from utils.metrics import metrics
+from utils.pricing import format_price
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Report periods: title, days including today
+PERIODS = (("Сегодня", 1), ("7 дней", 7), ("30 дней", 30))
+
+SERVICE_NAMES = {
+    "carpet": "Химчистка ковров",
+    "sofa": "Чистка мебели"
+}
+
+
+class StatTotals:
+    """Counters summed over rollup rows"""
+    
+    __slots__ = (
+        "orders", "accepted", "completed", "cancelled",
+        "revenue", "rating_sum", "rating_count", "new_users"
+    )
+    
+    def __init__(self):
+        self.orders = 0
+        self.accepted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.revenue = 0.0
+        self.rating_sum = 0
+        self.rating_count = 0
+        self.new_users = 0
+    
+    def add(self, stat: DailyStat) -> None:
+        """
+        Add one rollup row
+        
+        Args:
+            stat: daily_stats row
+        """
+        self.orders += stat.total_orders
+        self.accepted += stat.accepted_orders
+        self.completed += stat.completed_orders
+        self.cancelled += stat.cancelled_orders
+        self.revenue += float(stat.total_revenue)
+        self.rating_sum += stat.rating_sum
+        self.rating_count += stat.rating_count
+        self.new_users += stat.new_users
+    
+    @property
+    def rating(self) -> str:
+        """Average rating with the number of ratings"""
+        if not self.rating_count:
+            return "—"
+        return f"{self.rating_sum / self.rating_count:.2f} ({self.rating_count})"
+
+
+def render_stats(rows: Iterable[Tuple[DailyStat, Optional[str]]], today: date) -> str:
+    """
+    Format the report
+    
+    Args:
+        rows: Rollup rows of the longest period with operator names
+        today: Last day of every period
+        
+    Returns:
+        HTML message text
+    """
+    periods = [
+        (title, today - timedelta(days=days - 1), StatTotals())
+        for title, days in PERIODS
+    ]
+    services: Dict[str, StatTotals] = {}
+    operators: Dict[int, Tuple[str, StatTotals]] = {}
+    
+    for stat, admin_name in rows:
+        for _, since, totals in periods:
+            if stat.stat_date >= since:
+                totals.add(stat)
+        if stat.service_type:
+            services.setdefault(stat.service_type, StatTotals()).add(stat)
+        if stat.admin_id:
+            name = admin_name or str(stat.admin_id)
+            operators.setdefault(stat.admin_id, (name, StatTotals()))[1].add(stat)
+    
+    lines: List[str] = ["📊 <b>СТАТИСТИКА</b>"]
+    for title, _, totals in periods:
+        lines += [
+            "",
+            f"<b>{title}</b>",
+            f"Заказов: {totals.orders} · принято: {totals.accepted}",
+            f"Выполнено: {totals.completed} · отменено: {totals.cancelled}",
+            f"Выручка: {format_price(totals.revenue)} сум",
+            f"Рейтинг: {totals.rating}",
+            f"Новых клиентов: {totals.new_users}"
+        ]
+    
+    lines += ["", f"<b>По услугам ({PERIODS[-1][0]})</b>"]
+    for service_type, totals in sorted(services.items()):
+        lines.append(
+            f"• {SERVICE_NAMES.get(service_type, service_type)}: "
+            f"заказов {totals.orders}, выполнено {totals.completed}, "
+            f"{format_price(totals.revenue)} сум"
+        )
+    if not services:
+        lines.append("Нет данных")
+    
+    lines += ["", f"<b>Операторы ({PERIODS[-1][0]})</b>"]
+    ranked = sorted(operators.values(), key=lambda item: item[1].completed, reverse=True)
+    for name, totals in ranked:
+        lines.append(
+            f"• {name}: принято {totals.accepted}, выполнено {totals.completed}, "
+            f"{format_price(totals.revenue)} сум, рейтинг {totals.rating}"
+        )
+    if not operators:
+        lines.append("Нет данных")
+    
+    lines += ["", f"<i>Обновлено: {datetime.now().strftime('%d.%m.%Y, %H:%M')}</i>"]
+    return "\n".join(lines)
+
+
+class StatsReport:
+    """
+    /stats report rendered at most once per `ttl` seconds
+    
+    Reads only daily_stats (at most days × services × operators rows),
+    never orders. Admins asking while the report is being built wait
+    for that one instead of querying again.
+    
+    Metrics:
+        stats.cache_hits: reports served from memory
+        stats.cache_misses: reports built from the database
+    """
+    
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._text: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def render(self, session: AsyncSession) -> str:
+        """
+        Get the report, building it if the cached one expired
+        
+        Args:
+            session: Database session
+            
+        Returns:
+            HTML message text
+        """
+        if self._text is not None and time.monotonic() < self._expires_at:
+            metrics.increment("stats.cache_hits")
+            return self._text
+        
+        async with self._lock:
+            if self._text is not None and time.monotonic() < self._expires_at:
+                metrics.increment("stats.cache_hits")
+                return self._text
+            
+            metrics.increment("stats.cache_misses")
+            today = date.today()
+            rows = await StatsRepository.get_daily(
+                session,
+                today - timedelta(days=PERIODS[-1][1] - 1)
+            )
+            self._text = render_stats(rows, today)
+            self._expires_at = time.monotonic() + self.ttl
+            return self._text
+
+
+# Global stats report instance
+stats_report = StatsReport(ttl=settings.stats_cache_ttl)
@@ -0,0 +1,267 @@
+"""
+User Write Buffer Service
+=========================
+Collects user profile and activity changes into batched upserts
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from aiogram.types import User as TelegramUser
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from config import settings
+from database.database import async_session_maker
+from database.repository import UserRepository
+from utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the database cannot be reached, not that a row is bad
+_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, OSError)
+
+
+class UserWriteError(Exception):
+    """User's pending changes could not be written"""
+
+
+class PendingUser:
+    """Changes of one user waiting to be written"""
+    
+    __slots__ = ("username", "first_name", "last_name", "language", "seen_at", "attempts")
+    
+    def __init__(self):
+        self.username: Optional[str] = None
+        self.first_name: Optional[str] = None
+        self.last_name: Optional[str] = None
+        self.language: Optional[str] = None  # None keeps the stored language
+        self.seen_at = datetime.now(timezone.utc)
+        self.attempts = 0  # Failed writes of this user's row
+    
+    def merge(self, older: "PendingUser") -> None:
+        """
+        Fill in a language only set by an older, unwritten change
+        
+        Failed attempts carry over, so a row that keeps failing is
+        dropped even while the user stays active.
+        
+        Args:
+            older: Change this one replaces
+        """
+        if self.language is None:
+            self.language = older.language
+        self.attempts = max(self.attempts, older.attempts)
+
+
+class UserWriteBuffer:
+    """
+    Write-behind buffer for the users table
+    
+    Profile changes (language selection) and activity (any update) only
+    touch an in-memory entry per user. Entries are written as one
+    multi-row INSERT ... ON CONFLICT after `delay` seconds, or right away
+    once `max_pending` users are waiting, and on shutdown. However many
+    updates a user sends in between, they cost one row in one statement.
+    
+    When a batch fails, its rows are written one at a time so a single
+    bad row cannot hold back the others. Rows that still fail are kept
+    and retried with the next write, and dropped after `max_attempts`.
+    While the database is unreachable nothing is dropped, the entries
+    simply wait.
+    
+    Call persist() before writing rows that reference the user.
+    
+    Metrics:
+        users.pending: users waiting to be written
+        users.written: user rows written
+        users.writes_coalesced: changes merged into an already pending entry
+        users.write_failed: failed writes, batches and single rows
+        users.write_dropped: user rows given up after max_attempts
+    """
+    
+    def __init__(self, delay: float = 1.0, max_pending: int = 500, max_attempts: int = 5):
+        self.delay = delay
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: Dict[int, PendingUser] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+    
+    def touch(self, user: TelegramUser) -> None:
+        """
+        Record activity, refreshing the user's Telegram profile
+        
+        Args:
+            user: Telegram user who sent the update
+        """
+        self._record(user, None)
+    
+    def update_profile(self, user: TelegramUser, language: str) -> None:
+        """
+        Record profile change
+        
+        Args:
+            user: Telegram user
+            language: Selected language
+        """
+        self._record(user, language)
+    
+    async def persist(self, user_id: int) -> None:
+        """
+        Write the user's pending changes now
+        
+        Args:
+            user_id: User's Telegram ID
+            
+        Raises:
+            UserWriteError: The user's row could not be written
+        """
+        if user_id in self._pending or self._lock.locked():
+            if user_id in await self.flush():
+                raise UserWriteError(f"user {user_id} could not be written")
+    
+    async def flush(self) -> Set[int]:
+        """
+        Write all pending changes
+        
+        Returns:
+            IDs of users whose changes were not written
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        async with self._lock:
+            if not self._pending:
+                return set()
+            batch, self._pending = self._pending, {}
+            metrics.set_gauge("users.pending", 0)
+            
+            rows = [
+                {
+                    "user_id": user_id,
+                    "telegram_username": entry.username,
+                    "first_name": entry.first_name,
+                    "last_name": entry.last_name,
+                    "language_preference": entry.language,
+                    "last_interaction": entry.seen_at
+                }
+                # Same lock order in every process, concurrent writes cannot deadlock
+                for user_id, entry in sorted(batch.items())
+            ]
+            if len(rows) > 1:
+                try:
+                    await self._write(rows)
+                    metrics.increment("users.written", len(rows))
+                    return set()
+                except Exception as e:
+                    metrics.increment("users.write_failed")
+                    logger.error(f"Error writing {len(rows)} users, retrying one at a time: {e}")
+            return await self._write_singly(batch, rows)
+    
+    async def close(self) -> None:
+        """
+        Write everything still pending
+        
+        Call this on shutdown before disposing the database engine
+        """
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+    
+    def _record(self, user: TelegramUser, language: Optional[str]) -> None:
+        """Replace the user's pending entry"""
+        entry = PendingUser()
+        entry.username = user.username
+        entry.first_name = user.first_name
+        entry.last_name = user.last_name
+        entry.language = language
+        
+        older = self._pending.pop(user.id, None)
+        if older is not None:
+            entry.merge(older)
+            metrics.increment("users.writes_coalesced")
+        self._pending[user.id] = entry
+        metrics.set_gauge("users.pending", len(self._pending))
+        
+        if len(self._pending) >= self.max_pending:
+            self._flush_in_background()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay,
+                self._flush_in_background
+            )
+    
+    async def _write(self, rows: List[dict]) -> None:
+        """Upsert rows in statements of at most max_pending rows"""
+        async with async_session_maker() as session:
+            for start in range(0, len(rows), self.max_pending):
+                await UserRepository.upsert_many(session, rows[start:start + self.max_pending])
+    
+    async def _write_singly(self, batch: Dict[int, PendingUser], rows: List[dict]) -> Set[int]:
+        """
+        Write rows one at a time, keeping or dropping the ones that fail
+        
+        Args:
+            batch: Entries being written
+            rows: Their rows, in lock order
+            
+        Returns:
+            IDs of users whose changes were not written
+        """
+        failed: Set[int] = set()
+        for index, row in enumerate(rows):
+            user_id = row["user_id"]
+            try:
+                await self._write([row])
+                metrics.increment("users.written")
+            except _UNAVAILABLE_ERRORS as e:
+                # No row is at fault, keep everything left without counting an attempt
+                metrics.increment("users.write_failed")
+                logger.error(f"Error writing users, database unavailable: {e}")
+                remaining = {pending["user_id"]: batch[pending["user_id"]] for pending in rows[index:]}
+                self._requeue(remaining)
+                return failed | set(remaining)
+            except Exception as e:
+                metrics.increment("users.write_failed")
+                failed.add(user_id)
+                entry = batch[user_id]
+                entry.attempts += 1
+                if entry.attempts >= self.max_attempts:
+                    metrics.increment("users.write_dropped")
+                    logger.error(f"❌ Dropping changes of user {user_id} after {entry.attempts} attempts: {e}")
+                else:
+                    logger.warning(f"Error writing user {user_id} (attempt {entry.attempts}): {e}")
+                    self._requeue({user_id: entry})
+        return failed
+    
+    def _requeue(self, batch: Dict[int, PendingUser]) -> None:
+        """Put back entries of a failed write, newer changes win"""
+        for user_id, entry in batch.items():
+            newer = self._pending.get(user_id)
+            if newer is None:
+                self._pending[user_id] = entry
+            else:
+                newer.merge(entry)
+        metrics.set_gauge("users.pending", len(self._pending))
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay,
+                self._flush_in_background
+            )
+    
+    def _flush_in_background(self) -> None:
+        """Timer and size trigger callback"""
+        self._timer = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+
+# Global user write buffer instance
+user_buffer = UserWriteBuffer(
+    delay=settings.user_write_delay,
+    max_pending=settings.user_write_batch,
+    max_attempts=settings.user_write_max_attempts
+)
@@ -0,0 +1,357 @@
+"""
+Multi-Process Supervisor
+========================
+Runs several bot worker processes and routes updates by chat_id
+
+Usage:
+    python supervisor.py
+
+The supervisor receives updates (long polling or webhook, see BOT_MODE),
+runs startup/shutdown hooks once and forwards every update to worker
+`chat_id % WORKER_COUNT`, so all updates of one chat keep landing on the
+same worker in arrival order.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+from contextlib import suppress
+from typing import Any, Dict, List, Optional, Set
+from aiohttp import ClientError, ClientSession, ClientTimeout, web
+from aiogram import Bot
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+import bot as bot_module
+from config import settings
+from database.fsm_storage import create_storage
+from utils.metrics import metrics
+
+logger = logging.getLogger("supervisor")
+
+
+def resolve_chat_id(raw_update: Dict[str, Any]) -> int:
+    """
+    Get chat ID (or user ID for chatless updates) of a raw update
+    
+    Reads the JSON directly instead of building the Update model, with
+    the same result as aiogram's UserContextMiddleware: the event's chat
+    (a callback query's message chat, a poll answer's voter_chat),
+    otherwise its sender.
+    
+    Args:
+        raw_update: Update as received from Telegram
+        
+    Returns:
+        Chat or user ID, 0 if the update has neither
+    """
+    for key, event in raw_update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat") or event.get("voter_chat")
+        if chat:
+            return chat["id"]
+        user = event.get("from") or event.get("user")
+        if user:
+            return user["id"]
+        return 0
+    return 0
+
+
+class WorkerRouter:
+    """
+    Forwards updates to worker processes
+    
+    Keeps one FIFO queue per worker so updates reach each worker in the
+    order they were received. While a worker is unreachable or restarting
+    (connection errors, 502/503/504) its updates wait; an update the
+    worker rejects with any other status is retried MAX_ATTEMPTS times
+    and then dropped, so it cannot hold back the updates behind it.
+    
+    Updates count as delivered once their worker accepted them or they
+    were dropped; polling only confirms delivered updates to Telegram.
+    
+    Metrics:
+        updates.forward_dropped: updates given up after MAX_ATTEMPTS
+    """
+    
+    # Worker is (re)starting or overloaded, retry until it accepts
+    RETRY_STATUSES = frozenset({502, 503, 504})
+    
+    # Attempts for an update the worker rejected
+    MAX_ATTEMPTS = 3
+    
+    def __init__(self, worker_count: int, secret_token: str):
+        self.worker_count = worker_count
+        self.secret_token = secret_token
+        self.queues: List[asyncio.Queue] = [asyncio.Queue() for _ in range(worker_count)]
+        self.delivered = 0  # Updates delivered so far
+        self._undelivered: Set[int] = set()  # IDs of queued updates
+        self._delivery = asyncio.Event()
+        self._senders: List[asyncio.Task] = []
+        self._http: Optional[ClientSession] = None
+    
+    async def start(self) -> None:
+        """Start one sender task per worker"""
+        self._http = ClientSession(timeout=ClientTimeout(total=10))
+        self._senders = [
+            asyncio.create_task(self._sender(index))
+            for index in range(self.worker_count)
+        ]
+    
+    async def stop(self) -> None:
+        """Stop sender tasks and close HTTP session"""
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        if self._http:
+            await self._http.close()
+    
+    def route(self, raw_update: Dict[str, Any]) -> None:
+        """
+        Queue raw update for the worker owning its chat
+        
+        Args:
+            raw_update: Update as received from Telegram
+        """
+        self._enqueue(resolve_chat_id(raw_update), raw_update)
+    
+    def route_update(self, update: Update) -> None:
+        """
+        Queue update already parsed by aiogram (polling)
+        
+        Args:
+            update: Update from getUpdates
+        """
+        event_context = UserContextMiddleware.resolve_event_context(update)
+        if event_context.chat:
+            chat_id = event_context.chat.id
+        elif event_context.user:
+            chat_id = event_context.user.id
+        else:
+            chat_id = 0
+        self._enqueue(chat_id, update.model_dump(mode="json", by_alias=True, exclude_unset=True))
+    
+    def confirmed_offset(self, last_routed: int) -> int:
+        """
+        getUpdates offset confirming only delivered updates
+        
+        Args:
+            last_routed: Highest update ID routed so far
+            
+        Returns:
+            Lowest update ID still queued, or the one after last_routed
+        """
+        return min(self._undelivered, default=last_routed + 1)
+    
+    async def wait_delivery(self, seen: int, timeout: float) -> None:
+        """
+        Wait until more than `seen` updates are delivered
+        
+        Args:
+            seen: Value of `delivered` the caller already knows
+            timeout: Seconds to wait at most
+        """
+        if self.delivered != seen:
+            return
+        self._delivery.clear()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._delivery.wait(), timeout)
+    
+    def _enqueue(self, chat_id: int, raw_update: Dict[str, Any]) -> None:
+        """Put update on the queue of the worker owning chat_id"""
+        self._undelivered.add(raw_update["update_id"])
+        self.queues[chat_id % self.worker_count].put_nowait(raw_update)
+    
+    def _mark_delivered(self, update_id: int) -> None:
+        """Update was accepted or dropped"""
+        self._undelivered.discard(update_id)
+        self.delivered += 1
+        self._delivery.set()
+    
+    async def _sender(self, index: int) -> None:
+        """Deliver queued updates to one worker in order"""
+        url = f"http://127.0.0.1:{settings.worker_base_port + index}/update"
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self.secret_token}
+        queue = self.queues[index]
+        
+        while True:
+            raw_update = await queue.get()
+            
+            rejected = 0
+            while True:
+                try:
+                    async with self._http.post(url, json=raw_update, headers=headers) as response:
+                        status = response.status
+                except (ClientError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Worker {index} unavailable: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                
+                if status == 200:
+                    break
+                if status not in self.RETRY_STATUSES:
+                    rejected += 1
+                    if rejected >= self.MAX_ATTEMPTS:
+                        metrics.increment("updates.forward_dropped")
+                        logger.error(
+                            f"Worker {index} rejected update {raw_update.get('update_id')} "
+                            f"with {status} {rejected} times, dropping it"
+                        )
+                        break
+                logger.warning(f"Worker {index} answered {status}")
+                await asyncio.sleep(1)
+            
+            self._mark_delivered(raw_update["update_id"])
+
+
+def start_worker(index: int, secret_token: str) -> multiprocessing.Process:
+    """Spawn worker process"""
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=bot_module.worker_main,
+        args=(index, secret_token),
+        name=f"bot-worker-{index}"
+    )
+    process.start()
+    logger.info(f"Worker {index} started (pid {process.pid})")
+    return process
+
+
+async def watch_workers(workers: List[multiprocessing.Process], secret_token: str) -> None:
+    """Restart workers that exited unexpectedly"""
+    while True:
+        await asyncio.sleep(5)
+        for index, process in enumerate(workers):
+            if not process.is_alive():
+                logger.error(f"Worker {index} exited with code {process.exitcode}, restarting")
+                workers[index] = start_worker(index, secret_token)
+
+
+def stop_workers(workers: List[multiprocessing.Process]) -> None:
+    """Ask workers to shut down gracefully and wait for them"""
+    for process in workers:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGINT)
+    for process in workers:
+        process.join(timeout=30)
+        if process.is_alive():
+            process.terminate()
+
+
+async def poll_updates(bot: Bot, router: WorkerRouter, allowed_updates: List[str]) -> None:
+    """
+    Receive updates with long polling and route them
+    
+    The offset only confirms updates the workers have taken, so updates
+    still queued when the supervisor stops are fetched again on the next
+    start. Updates fetched again while still queued are skipped.
+    """
+    await bot.delete_webhook()
+    offset = None
+    last_routed: Optional[int] = None
+    
+    logger.info("Starting polling...")
+    while True:
+        if last_routed is not None:
+            offset = router.confirmed_offset(last_routed)
+        seen = router.delivered
+        try:
+            updates = await bot.get_updates(
+                offset=offset,
+                timeout=30,
+                allowed_updates=allowed_updates
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch updates: {e}")
+            await asyncio.sleep(1)
+            continue
+        
+        fresh = [update for update in updates if last_routed is None or update.update_id > last_routed]
+        for update in fresh:
+            router.route_update(update)
+        if fresh:
+            last_routed = fresh[-1].update_id
+        elif updates:
+            # Only updates still queued came back, long polling would return at once
+            await router.wait_delivery(seen, timeout=1)
+
+
+async def serve_webhook(bot: Bot, router: WorkerRouter, allowed_updates: List[str]) -> None:
+    """Receive updates on the public webhook and route them"""
+    if not settings.webhook_base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+    
+    secret_token = settings.webhook_secret or secrets.token_urlsafe(32)
+    
+    async def handle_update(request: web.Request) -> web.Response:
+        if request.headers.get("X-Telegram-Bot-Api-Secret-Token", "") != secret_token:
+            return web.Response(body="Unauthorized", status=401)
+        router.route(await request.json())
+        return web.json_response({})
+    
+    app = web.Application()
+    app.router.add_post(settings.webhook_path, handle_update)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    
+    try:
+        await site.start()
+        await bot.set_webhook(
+            url=settings.webhook_url,
+            secret_token=secret_token,
+            max_connections=settings.webhook_max_connections,
+            allowed_updates=allowed_updates
+        )
+        logger.info(f"Webhook set to {settings.webhook_url}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+async def main():
+    """Run supervisor until interrupted"""
+    
+    # Sends alongside the workers, so it keeps to a share of the limit too
+    bot = bot_module.create_bot(rate_share=bot_module.process_rate_share())
+    
+    # Used for hooks and allowed update types, never receives updates
+    dp = bot_module.create_dispatcher(storage=create_storage("postgres"))
+    
+    # Startup hooks (database init, FSM purging, admin notices) run only here
+    await bot_module.on_startup(bot, dispatcher=dp)
+    
+    secret_token = secrets.token_urlsafe(32)
+    workers = [start_worker(index, secret_token) for index in range(settings.worker_count)]
+    
+    router = WorkerRouter(settings.worker_count, secret_token)
+    await router.start()
+    watcher = asyncio.create_task(watch_workers(workers, secret_token))
+    
+    allowed_updates = dp.resolve_used_update_types()
+    
+    try:
+        if settings.bot_mode == "webhook":
+            await serve_webhook(bot, router, allowed_updates)
+        else:
+            await poll_updates(bot, router, allowed_updates)
+    except Exception as e:
+        logger.error(f"Fatal error: {e}", exc_info=True)
+    finally:
+        watcher.cancel()
+        await router.stop()
+        stop_workers(workers)
+        await bot_module.on_shutdown(bot, dispatcher=dp)
+        await bot.session.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Supervisor stopped")
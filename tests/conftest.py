@@ -0,0 +1,113 @@
+"""
+Test Fixtures
+=============
+Database fixtures, tests using them are skipped without a test database
+
+Tests never touch the databases in .env. They write to the database in
+TEST_DATABASE_URL and read from TEST_REPLICA_DATABASE_URL as the
+replica, both migrated to head. The replica must be a separate database
+that is not replicated from the first one, it stands for a replica that
+has not caught up yet. The replica uses the primary's user and password.
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+TEST_REPLICA_DATABASE_URL = os.environ.get("TEST_REPLICA_DATABASE_URL")
+# The development database from .env, tests refuse to run against it
+ENV_DATABASE_URL = settings.database_url
+
+
+def _use_test_databases() -> None:
+    """Point settings at the test databases, before any engine is created"""
+    settings.db_replica_host = None
+    if TEST_DATABASE_URL:
+        url = make_url(TEST_DATABASE_URL)
+        settings.db_host = url.host or settings.db_host
+        settings.db_port = url.port or settings.db_port
+        settings.db_name = url.database
+        settings.db_user = url.username or settings.db_user
+        settings.db_password = url.password or settings.db_password
+    if TEST_REPLICA_DATABASE_URL:
+        url = make_url(TEST_REPLICA_DATABASE_URL)
+        settings.db_replica_host = url.host or "localhost"
+        settings.db_replica_port = url.port
+        settings.db_replica_name = url.database
+
+
+_use_test_databases()
+
+from database import database as db
+
+
+def _reachable(url: str) -> bool:
+    """Whether a database accepts connections"""
+    async def probe() -> None:
+        engine = create_async_engine(url, poolclass=NullPool)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+    
+    try:
+        asyncio.run(probe())
+    except (DBAPIError, OSError):
+        return False
+    return True
+
+
+@pytest.fixture(scope="session")
+def primary_url() -> str:
+    """URL of the test database"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    if settings.database_url == ENV_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL must not be the database in .env")
+    if not _reachable(settings.database_url):
+        pytest.skip("database is not available")
+    return settings.database_url
+
+
+@pytest.fixture(scope="session")
+def replica_url(primary_url: str) -> str:
+    """URL of the test replica, a separate database from the primary"""
+    if not TEST_REPLICA_DATABASE_URL:
+        pytest.skip("TEST_REPLICA_DATABASE_URL is not set")
+    url = settings.replica_database_url
+    if url == primary_url:
+        pytest.skip("TEST_REPLICA_DATABASE_URL must be a separate database")
+    if not _reachable(url):
+        pytest.skip("replica is not available")
+    return url
+
+
+@pytest.fixture
+def run_db(primary_url: str) -> Callable[[Awaitable[Any]], Any]:
+    """Run a coroutine in a new event loop, disposing the engines afterwards"""
+    def run(coro: Awaitable[Any]) -> Any:
+        async def main() -> Any:
+            try:
+                return await coro
+            finally:
+                await db.dispose_engine()
+        
+        return asyncio.run(main())
+    
+    return run
@@ -0,0 +1,122 @@
+"""
+Partition Archive Tests
+=======================
+archive_partitions keeps history while its orders stay attached
+
+These create, detach and drop partitions, so like every database test
+they only run against TEST_DATABASE_URL (see conftest).
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from database.database import engine
+from database.partitions import ARCHIVE_SCHEMA, archive_partitions, ensure_partitions, list_partitions
+from utils.metrics import metrics
+
+USER_ID = 990_000_654
+
+# Months far before any real data: January keeps an open order that
+# changed status in February, February's and March's orders are done
+OPEN_MONTH = datetime(2001, 1, 1, tzinfo=timezone.utc)
+CHANGED_MONTH = datetime(2001, 2, 1, tzinfo=timezone.utc)
+DONE_MONTH = datetime(2001, 3, 1, tzinfo=timezone.utc)
+NOW = datetime(2001, 4, 15, tzinfo=timezone.utc)
+
+TEST_PARTITIONS = [
+    f"{table}_y2001m{month:02d}"
+    for table in ("orders", "order_status_history")
+    for month in (1, 2, 3)
+]
+
+
+async def add_order(status: str, created_at: datetime) -> int:
+    """Insert an order and its status history row, return its ID"""
+    async with engine.begin() as conn:
+        order_id = await conn.scalar(
+            text(
+                "INSERT INTO orders (user_id, service_type, language, items_count, items_details, "
+                "customer_name, phone_number, address_type, discount_amount, status, created_at) "
+                "VALUES (:user_id, 'carpet', 'ru', 1, '[]', 'Test', '+998900000000', 'manual', 0, "
+                ":status, :created_at) RETURNING order_id"
+            ),
+            {"user_id": USER_ID, "status": status, "created_at": created_at}
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO order_status_history (order_id, new_status, changed_at) "
+                "VALUES (:order_id, :status, :changed_at)"
+            ),
+            {"order_id": order_id, "status": status, "changed_at": created_at}
+        )
+    return order_id
+
+
+async def add_history(order_id: int, status: str, changed_at: datetime) -> None:
+    """Insert a status change of an order"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO order_status_history (order_id, new_status, changed_at) "
+                "VALUES (:order_id, :status, :changed_at)"
+            ),
+            {"order_id": order_id, "status": status, "changed_at": changed_at}
+        )
+
+
+async def drop_test_partitions() -> None:
+    """Remove test partitions wherever they are, and the test user"""
+    async with engine.begin() as conn:
+        for name in TEST_PARTITIONS:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            await conn.execute(text(f"DROP TABLE IF EXISTS {ARCHIVE_SCHEMA}.{name}"))
+        await conn.execute(text("DELETE FROM users WHERE user_id = :user_id"), {"user_id": USER_ID})
+
+
+@pytest.fixture
+def clean_partitions(run_db):
+    """Drop the test partitions and user before and after the test"""
+    async def partitioned() -> bool:
+        async with engine.connect() as conn:
+            return bool(await list_partitions(conn, "orders"))
+    
+    if not run_db(partitioned()):
+        pytest.skip("orders is not partitioned")
+    run_db(drop_test_partitions())
+    yield
+    run_db(drop_test_partitions())
+
+
+def test_history_kept_with_open_orders(run_db, clean_partitions):
+    skipped = metrics.counters.get("partitions.archive_skipped", 0)
+    
+    async def scenario():
+        await ensure_partitions(2, now=OPEN_MONTH)
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("INSERT INTO users (user_id, first_name, is_blocked) VALUES (:user_id, 'Test', false)"),
+                {"user_id": USER_ID}
+            )
+        open_order = await add_order("pending", OPEN_MONTH.replace(day=10))
+        await add_history(open_order, "accepted", CHANGED_MONTH.replace(day=10))
+        await add_order("completed", CHANGED_MONTH.replace(day=10))
+        await add_order("completed", DONE_MONTH.replace(day=10))
+        
+        archived = await archive_partitions(0, now=NOW)
+        async with engine.connect() as conn:
+            attached = {
+                name
+                for table in ("orders", "order_status_history")
+                for name, _ in await list_partitions(conn, table)
+            }
+        return archived, attached
+    
+    archived, attached = run_db(scenario())
+    assert archived == ["orders_y2001m02", "orders_y2001m03", "order_status_history_y2001m03"]
+    # February's history holds a change of the open January order
+    assert {
+        "orders_y2001m01", "order_status_history_y2001m01", "order_status_history_y2001m02"
+    } <= attached
+    assert metrics.counters.get("partitions.archive_skipped", 0) == skipped + 1
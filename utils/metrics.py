@@ -0,0 +1,106 @@
+"""
+Runtime Metrics
+===============
+In-process counters, gauges and timings for monitoring
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    Lightweight metrics registry
+    
+    Counters only grow, gauges hold the latest value and timings keep
+    count, total and max of observed values. Collectors are called before
+    every snapshot to refresh gauges that are cheaper to read on demand.
+    """
+    
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, list] = {}  # name: [count, total, max]
+        self.collectors: List[Callable[[], None]] = []
+        self._reporter: Optional[asyncio.Task] = None
+    
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increase counter by value"""
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set gauge to current value"""
+        self.gauges[name] = value
+    
+    def observe(self, name: str, value: float) -> None:
+        """Record a single timing observation (seconds)"""
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, value, value]
+            return
+        timing[0] += 1
+        timing[1] += value
+        if value > timing[2]:
+            timing[2] = value
+    
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register callback that refreshes gauges before each snapshot"""
+        self.collectors.append(collector)
+    
+    def snapshot(self) -> dict:
+        """
+        Get current values of all metrics
+        
+        Returns:
+            Dictionary with counters, gauges and timings
+        """
+        for collector in self.collectors:
+            collector()
+        
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timings": {
+                name: {
+                    "count": count,
+                    "avg": total / count if count else 0.0,
+                    "max": max_value
+                }
+                for name, (count, total, max_value) in self.timings.items()
+            }
+        }
+    
+    def start_reporter(self, interval: int) -> None:
+        """
+        Periodically write snapshot to the log
+        
+        Args:
+            interval: Seconds between reports (0 disables reporting)
+        """
+        if interval <= 0 or self._reporter is not None:
+            return
+        self._reporter = asyncio.create_task(self._report_loop(interval))
+    
+    async def stop_reporter(self) -> None:
+        """Stop periodic reporting and log final snapshot"""
+        if self._reporter is not None:
+            self._reporter.cancel()
+            try:
+                await self._reporter
+            except asyncio.CancelledError:
+                pass
+            self._reporter = None
+        logger.info(f"📊 Metrics: {self.snapshot()}")
+    
+    async def _report_loop(self, interval: int) -> None:
+        """Reporter task body"""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"📊 Metrics: {self.snapshot()}")
+
+
+# Global metrics instance
+metrics = Metrics()